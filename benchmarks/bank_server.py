@@ -0,0 +1,193 @@
+"""
+Local HTTP server for synthetic question banks.
+
+Serves banks shaped like questions.json ([{"ID": ..., "Question": ...}])
+at /banks/<size>.json, optionally with ?seed=<n>. Questions come in
+families of paraphrases with a little HTML mixed in, so retrieval, LLM
+adjudication and grouping all have real work to do. Responses carry an
+ETag and honour If-None-Match.
+
+Usage:
+    python -m benchmarks.bank_server --port 8081
+    curl http://127.0.0.1:8081/banks/5000.json
+"""
+import argparse
+import hashlib
+import http.server
+import json
+import random
+import socketserver
+import threading
+import time
+import urllib.parse
+
+SUBJECTS = [
+    "a python list", "a dictionary", "a tuple", "a virtual environment", "a git branch", "a docker image",
+    "a sql index", "a rest api", "a unit test", "a binary tree", "a linked list", "a hash map",
+    "a css grid", "a react component", "a kubernetes pod", "a bash script", "a json file", "a csv file",
+    "a regular expression", "a database migration", "a cron job", "an http request", "a web socket",
+    "a thread pool", "a memory leak", "a null pointer", "a recursive function", "a sorting algorithm",
+]
+ACTIONS = [
+    "create", "delete", "sort", "reverse", "copy", "debug", "optimize", "serialize", "validate", "merge",
+    "split", "profile", "deploy", "test", "cache", "index", "rename", "compress", "encrypt", "monitor",
+]
+QUALIFIERS = [
+    "", "quickly", "safely", "in production", "on windows", "on linux", "without losing data",
+    "for beginners", "at scale", "in a loop", "from the command line", "in python 3",
+]
+TEMPLATES = [
+    "How do I {action} {subject} {qualifier}?",
+    "What is the best way to {action} {subject} {qualifier}?",
+    "How can you {action} {subject} {qualifier}?",
+    "Explain how to {action} {subject} {qualifier}.",
+    "What steps are needed to {action} {subject} {qualifier}?",
+]
+MARKUP = ["{}", "{}", "{}", "<p>{}</p>", "{}&nbsp;", "<b>{}</b><br/>"]
+
+
+def generate_bank(size, seed=0, max_family_size=4):
+    """
+    Generates a deterministic synthetic question bank.
+
+    Args:
+        size: Number of questions.
+        seed: Seed for the generator; the same (size, seed) always gives the same bank.
+        max_family_size: Largest number of paraphrases of one question.
+
+    Returns:
+        A list of {"ID": int, "Question": str} dicts.
+    """
+    rng = random.Random(seed)
+    questions = []
+    while len(questions) < size:
+        subject = rng.choice(SUBJECTS)
+        action = rng.choice(ACTIONS)
+        qualifier = rng.choice(QUALIFIERS)
+        for template in rng.sample(TEMPLATES, rng.randint(1, max_family_size)):
+            if len(questions) >= size:
+                break
+            text = " ".join(template.format(action=action, subject=subject, qualifier=qualifier).split())
+            text = text.replace(" ?", "?").replace(" .", ".")
+            questions.append({"ID": len(questions) + 1, "Question": rng.choice(MARKUP).format(text)})
+    return questions
+
+
+def generate_queries(count, seed=0):
+    """
+    Generates new questions to check against a bank from generate_bank.
+
+    Roughly half paraphrase questions the bank may contain and half are
+    unrelated, so both the match and no-match paths are exercised.
+    """
+    rng = random.Random(seed + 1000003)
+    queries = []
+    for i in range(count):
+        if i % 2 == 0:
+            template = rng.choice(TEMPLATES)
+            text = template.format(action=rng.choice(ACTIONS), subject=rng.choice(SUBJECTS),
+                                   qualifier=rng.choice(QUALIFIERS))
+        else:
+            text = f"What is the history of {rng.choice(SUBJECTS)} number {rng.randint(1, 10 ** 6)}?"
+        queries.append(" ".join(text.split()).replace(" ?", "?").replace(" .", "."))
+    return queries
+
+
+class BankServer:
+    """
+    Serves synthetic banks from a background thread.
+
+    Args:
+        host: Interface to bind.
+        port: Port to bind; 0 picks a free port.
+        latency: Seconds to sleep before each full response.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._bodies = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def bank_url(self, size, seed=0):
+        return f"{self.base_url}/banks/{size}.json?seed={seed}"
+
+    def _body(self, size, seed):
+        with self._lock:
+            key = (size, seed)
+            if key not in self._bodies:
+                body = json.dumps(generate_bank(size, seed), indent=2).encode("utf-8")
+                self._bodies[key] = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            return self._bodies[key]
+
+    def _handle(self, handler):
+        with self._lock:
+            self.requests += 1
+        parsed = urllib.parse.urlparse(handler.path)
+        name = parsed.path.rsplit("/", 1)[-1]
+        if not parsed.path.startswith("/banks/") or not name.endswith(".json") or not name[:-5].isdigit():
+            handler.send_error(404)
+            return
+        seed = int(urllib.parse.parse_qs(parsed.query).get("seed", ["0"])[0])
+        body, etag = self._body(int(name[:-5]), seed)
+
+        if handler.headers.get("If-None-Match") == etag:
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.end_headers()
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("ETag", etag)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="bank-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to delay each full response")
+    args = parser.parse_args()
+
+    server = BankServer(args.host, args.port, args.latency)
+    print(f"Serving synthetic question banks at {server.base_url}/banks/<size>.json")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Time and peak memory of the tiled all-pairs neighbour search against the
+dense N x N similarity matrix.
+
+Peak memory is the Python-heap high-water mark from tracemalloc (numpy
+allocations included) in this process; with --workers above 1 each worker
+additionally holds one tile. The dense baseline is skipped when its matrix
+would exceed --dense-limit-mb.
+
+Usage:
+    python -m benchmarks.bench_all_pairs --size 20000 --budgets 64,256 --workers 1,4
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.utils import all_pairs
+from src.utils.faiss_utils import SimpleVectorIndex, top_k
+from benchmarks.bench_ann_index import synthetic_embeddings
+
+
+def dense_neighbours(embeddings, threshold, k):
+    scores = embeddings @ embeddings.T
+    np.fill_diagonal(scores, -np.inf)
+    scores[scores < threshold] = -np.inf
+    return top_k(scores, k)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def edges(graph):
+    rows, neighbours, _ = all_pairs.neighbour_pairs(*graph)
+    return set(zip(rows.tolist(), neighbours.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--budgets", default="64,256", help="memory budgets in MB")
+    parser.add_argument("--workers", default="1", help="worker process counts")
+    parser.add_argument("--dense-limit-mb", type=float, default=2048)
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--noise", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    embeddings = SimpleVectorIndex(
+        synthetic_embeddings(args.size, args.dim, args.topics, args.noise, rng)).normalized_embeddings
+    print(f"N={args.size} d={args.dim} k={args.k} threshold={args.threshold}")
+    print(f"{'method':<24} {'tile':>6} {'seconds':>9} {'peak MB':>9} {'edges':>9} {'agree':>7}")
+
+    reference = None
+    if args.size * args.size * 4 / 2 ** 20 <= args.dense_limit_mb:
+        graph, elapsed, peak = measure(lambda: dense_neighbours(embeddings, args.threshold, args.k))
+        graph[1][np.isneginf(graph[0])] = -1
+        reference = edges(graph)
+        print(f"{'dense':<24} {'-':>6} {elapsed:>9.2f} {peak:>9.1f} {len(reference):>9} {'-':>7}")
+
+    # Every input runs through the pool when more than one worker is asked for.
+    all_pairs.ALL_PAIRS_PARALLEL_MIN_ROWS = 0
+    for budget in [float(b) for b in args.budgets.split(",")]:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            tile = all_pairs.tile_size_for_budget(args.size, args.dim, args.k, workers, budget * 2 ** 20)
+            graph, elapsed, peak = measure(lambda: all_pairs.all_pairs_neighbours(
+                embeddings, args.threshold, args.k, memory_budget=budget * 2 ** 20, workers=workers))
+            found = edges(graph)
+            agree = f"{len(found & reference) / max(1, len(found | reference)):.3f}" if reference is not None else "-"
+            name = f"tiled {budget:.0f}MB x{workers}"
+            print(f"{name:<24} {tile:>6} {elapsed:>9.2f} {peak:>9.1f} {len(found):>9} {agree:>7}")
+
+
+if __name__ == "__main__":
+    main()
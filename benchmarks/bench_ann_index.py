@@ -0,0 +1,73 @@
+"""
+Recall@k versus latency of IVFIndex against the exact SimpleVectorIndex.
+
+Synthetic banks are drawn as noisy copies of random topic vectors, so that
+near neighbours exist the way paraphrased questions do.
+
+Usage:
+    python -m benchmarks.bench_ann_index --size 200000 --nprobe 1,4,16,64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.utils.ann_index import IVFIndex
+from src.utils.faiss_utils import SimpleVectorIndex
+
+
+def synthetic_embeddings(n, dim, topics, noise, rng):
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, n)
+    return centers[labels] + noise * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def recall_at_k(approximate, exact):
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+    return hits / exact.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=0, help="0 picks 4 * sqrt(N)")
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32,64")
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--noise", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    embeddings = synthetic_embeddings(args.size, args.dim, args.topics, args.noise, rng)
+    queries = synthetic_embeddings(args.queries, args.dim, args.topics, args.noise, np.random.default_rng(args.seed))
+
+    exact = SimpleVectorIndex(embeddings)
+    start = time.perf_counter()
+    ivf = IVFIndex(exact.normalized_embeddings, nlist=args.nlist or None)
+    build_time = time.perf_counter() - start
+    print(f"N={args.size} d={args.dim} nlist={ivf.nlist} build={build_time:.2f}s")
+
+    start = time.perf_counter()
+    _, exact_ids = exact.search(queries, args.k)
+    exact_time = (time.perf_counter() - start) / args.queries
+    _, exact_single = exact.search(queries[:1], args.k)
+    start = time.perf_counter()
+    for query in queries[:50]:
+        exact.search(query, args.k)
+    exact_single_time = (time.perf_counter() - start) / 50
+
+    print(f"{'index':<14} {'recall@' + str(args.k):>10} {'ms/query':>10}")
+    print(f"{'exact (batch)':<14} {1.0:>10.3f} {exact_time * 1e3:>10.3f}")
+    print(f"{'exact (1q)':<14} {1.0:>10.3f} {exact_single_time * 1e3:>10.3f}")
+    for nprobe in [int(p) for p in args.nprobe.split(",")]:
+        start = time.perf_counter()
+        _, ivf_ids = ivf.search(queries, args.k, nprobe=nprobe)
+        elapsed = (time.perf_counter() - start) / args.queries
+        print(f"{'ivf nprobe=' + str(nprobe):<14} {recall_at_k(ivf_ids, exact_ids):>10.3f} {elapsed * 1e3:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Equivalence check and throughput benchmark for clean_html.
+
+Every generated sample is cleaned with both the original BeautifulSoup-only
+implementation and the current clean_html; any difference is reported and
+the script exits with status 1.
+
+Usage:
+    python -m benchmarks.bench_clean_html --samples 20000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import warnings
+
+from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
+
+from src.utils import text_utils
+from src.utils.text_utils import clean_html
+
+FRAGMENTS = [
+    "What is the capital of France?", "Explain loops in Python", "x = 3", "a < b", "a<b", "5 <= 6",
+    "a & b", "&amp;", "&lt;b&gt;", "&nbsp;", "&nbsp", "&copy ", "&unknown;", "&ampx", "&AMP;",
+    "&#65;", "&#x42;", "&#0;", "&#128;", "&#129;", "&#xD800;", "&#x110000;", "&#65a;", "&lt3",
+    "<p>", "</p>", "<br>", "<br/>", "<br />", "<b>", "</b>", "<P>", "</p >", "<span style=\"color:red\">",
+    "<a href='x.html'>", "</a>", "<img src=x>", "<p title='a>b'>", "<b\nclass=x>", "<1>", "< p>",
+    "<!-- note -->", "<![CDATA[x]]>", "<?php echo 1 ?>", "<!DOCTYPE html>", "<script>var x = '<b>';</script>",
+    "<style>p { color: red }</style>", "<template>t</template>", "<textarea><b>x</b></textarea>",
+    "\r\n", "\n", "\t", "  ", "é", " ", "\x00", "<p", "&", "&#", "<", ">", "\"", "'",
+]
+
+
+def legacy_clean_html(text):
+    return BeautifulSoup(text or "", "html.parser").get_text()
+
+
+def generate_samples(count, seed=0):
+    rng = random.Random(seed)
+    samples = []
+    try:
+        with open("questions.json", encoding="utf-8") as f:
+            samples.extend(q.get("Question") or "" for q in json.load(f))
+    except OSError:
+        pass
+    while len(samples) < count:
+        samples.append("".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 8))))
+    return samples
+
+
+def check_equivalence(samples):
+    mismatches = []
+    for sample in samples:
+        expected = legacy_clean_html(sample)
+        actual = clean_html(sample)
+        if expected != actual:
+            mismatches.append((sample, expected, actual))
+    return mismatches
+
+
+def throughput(fn, samples):
+    start = time.perf_counter()
+    for sample in samples:
+        fn(sample)
+    return len(samples) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
+
+    samples = generate_samples(args.samples, args.seed)
+    plain = [s for s in samples if "<" not in s and "&" not in s] or samples
+    simple = [f"<p>{s}&nbsp;<br/></p>" for s in plain]
+    checked = samples + simple
+    mismatches = check_equivalence(checked)
+    print(f"equivalence: {len(checked) - len(mismatches)}/{len(checked)} samples identical")
+    for sample, expected, actual in mismatches[:20]:
+        print(f"  input={sample!r} expected={expected!r} actual={actual!r}")
+
+    text_utils._clean_markup.cache_clear()
+    print(f"{'workload':<24} {'legacy/s':>12} {'clean_html/s':>14}")
+    print(f"{'plain text':<24} {throughput(legacy_clean_html, plain):>12.0f} {throughput(clean_html, plain):>14.0f}")
+    print(f"{'simple markup':<24} {throughput(legacy_clean_html, simple):>12.0f} {throughput(clean_html, simple):>14.0f}")
+    text_utils._clean_markup.cache_clear()
+    legacy_rate = throughput(legacy_clean_html, samples)
+    cold_rate = throughput(clean_html, samples)
+    warm_rate = throughput(clean_html, samples)
+    print(f"{'mixed (cold cache)':<24} {legacy_rate:>12.0f} {cold_rate:>14.0f}")
+    print(f"{'mixed (memoized)':<24} {legacy_rate:>12.0f} {warm_rate:>14.0f}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
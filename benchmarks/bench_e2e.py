@@ -0,0 +1,286 @@
+"""
+Offline end-to-end benchmark of the question endpoints.
+
+Runs the real Flask app in-process against a local synthetic bank server
+(benchmarks.bank_server) and a deterministic fake Gemini API
+(benchmarks.fake_gemini), so it needs neither network access nor an API
+key. Three phases are measured on a fresh cache directory:
+
+    cold   - the first /check-question, which fetches, embeds and indexes the bank
+    check  - --requests /check-question calls at --concurrency
+    group  - --group-requests /group_similar_questions calls
+
+Each phase reports throughput and p50/p95/p99 latency overall and per stage
+(bank fetch, query embedding, index search, clustering, grouping and the
+fake Gemini calls). Pass --output to save the results as JSON and
+--baseline to compare against a saved run; the script exits with status 1
+if any phase's p95 regresses by more than --tolerance.
+
+Usage:
+    python -m benchmarks.bench_e2e --bank-size 5000 --requests 200 --concurrency 8
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks import fake_gemini
+from benchmarks.bank_server import BankServer, generate_queries
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StageRecorder:
+    """
+    Collects per-stage durations from wrapped functions, from any thread.
+    """
+
+    def __init__(self):
+        self._samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    def wrap(self, stage, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+    def drain(self):
+        with self._lock:
+            samples, self._samples = dict(self._samples), defaultdict(list)
+        return samples
+
+
+def summarize(samples, elapsed=None):
+    """
+    Returns count, throughput and latency percentiles in milliseconds.
+    """
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    summary = {
+        "count": int(len(values)),
+        "mean_ms": float(values.mean()) if len(values) else 0.0,
+        "p50_ms": float(np.percentile(values, 50)) if len(values) else 0.0,
+        "p95_ms": float(np.percentile(values, 95)) if len(values) else 0.0,
+        "p99_ms": float(np.percentile(values, 99)) if len(values) else 0.0,
+        "max_ms": float(values.max()) if len(values) else 0.0,
+    }
+    if elapsed:
+        summary["throughput_rps"] = len(values) / elapsed
+    return summary
+
+
+def instrument(recorder, fake):
+    """
+    Wraps the app's stage boundaries and the fake API with timers.
+    """
+    from src.api import question_routes
+    from src.services import grouping_service
+    from src.services.group_state import group_state_store
+    from src.services.question_bank import question_bank_cache
+    from src.utils.ann_index import IVFIndex
+    from src.utils.faiss_utils import SimpleVectorIndex
+
+    fake.embed_content = recorder.wrap("gemini.embed_content", fake.embed_content)
+    fake.generate_content = recorder.wrap("gemini.generate_content", fake.generate_content)
+    question_bank_cache.get = recorder.wrap("bank.fetch", question_bank_cache.get)
+    question_routes.embed_texts = recorder.wrap("query.embed", question_routes.embed_texts)
+    group_state_store.group_questions = recorder.wrap("group.total", group_state_store.group_questions)
+    grouping_service.similarity_pairs = recorder.wrap("group.cluster", grouping_service.similarity_pairs)
+    for index_class in (SimpleVectorIndex, IVFIndex):
+        index_class.search = recorder.wrap("index.search", index_class.search)
+
+
+def create_client(verbose=False):
+    from src import create_app
+
+    app = create_app()
+    if not verbose:
+        from src.utils import logger_config
+        router = logger_config._listener.handlers[0]
+        router.default = [h for h in router.default if type(h) is not logging.StreamHandler]
+    for limiter in app.extensions.get("limiter", ()):
+        limiter.enabled = False
+
+    client = app.test_client()
+    username = os.getenv("ADMIN_USERNAME", "admin")
+    password = os.getenv("ADMIN_PASSWORD", "password")
+    response = client.post("/login", json={"username": username, "password": password})
+    if response.status_code != 200:
+        raise SystemExit(f"Login failed with status {response.status_code}: {response.get_data(as_text=True)}")
+    return app, {"Authorization": f"Bearer {response.json['access_token']}"}
+
+
+def run_phase(name, app, headers, path, payloads, concurrency, recorder):
+    """
+    Posts every payload to path and returns the phase summary.
+    """
+    latencies = []
+    statuses = defaultdict(int)
+    lock = threading.Lock()
+    local = threading.local()
+
+    def send(payload):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        start = time.perf_counter()
+        response = local.client.post(path, json=payload, headers=headers)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[response.status_code] += 1
+
+    recorder.drain()
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(send, payloads))
+    else:
+        for payload in payloads:
+            send(payload)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "phase": name,
+        "path": path,
+        "concurrency": concurrency,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "overall": summarize(latencies, elapsed),
+        "stages": {stage: summarize(samples) for stage, samples in sorted(recorder.drain().items())},
+    }
+
+
+def print_phase(result):
+    overall = result["overall"]
+    statuses = ", ".join(f"{code}: {count}" for code, count in result["statuses"].items())
+    print(f"\n[{result['phase']}] {result['path']} x{overall['count']} "
+          f"(concurrency {result['concurrency']}, statuses {statuses}) "
+          f"{overall.get('throughput_rps', 0.0):.1f} req/s")
+    print(f"  {'stage':<26} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    rows = [("overall", overall)] + list(result["stages"].items())
+    for stage, s in rows:
+        print(f"  {stage:<26} {s['count']:>7} {s['mean_ms']:>9.1f} {s['p50_ms']:>9.1f} "
+              f"{s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints p95 changes against a baseline run and returns the regressed phases.
+    """
+    previous = {result["phase"]: result for result in baseline.get("phases", [])}
+    regressions = []
+    print("\nComparison with baseline (p95):")
+    for result in results:
+        before = previous.get(result["phase"])
+        if not before or not before["overall"]["p95_ms"]:
+            continue
+        old, new = before["overall"]["p95_ms"], result["overall"]["p95_ms"]
+        change = (new - old) / old
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"  {result['phase']:<8} {old:>9.1f} ms -> {new:>9.1f} ms ({change:+.1%}){flag}")
+        if change > tolerance:
+            regressions.append(result["phase"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bank-size", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=100, help="/check-question calls in the check phase")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--group-requests", type=int, default=2)
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per fake embed_content call")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per fake generate_content call")
+    parser.add_argument("--bank-latency", type=float, default=0.0, help="seconds per full bank download")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="directory for caches and logs (default: a fresh temporary directory)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 regression")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's console logging")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", message="Using the in-memory storage")
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="qsimcheck-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    os.environ.setdefault("JWT_SECRET_KEY", "offline-benchmark-secret-key-0123456789")
+    os.environ.update({
+        "ALLOWED_DOMAINS": "127.0.0.1",
+        "PREWARM_BANKS": "",
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "cache", "embeddings"),
+        "INDEX_STORE_DIR": os.path.join(workdir, "cache", "indexes"),
+        "VERDICT_CACHE_PATH": os.path.join(workdir, "cache", "verdicts.json"),
+    })
+    # The app writes its log files relative to the working directory.
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+
+    fake = fake_gemini.install(fake_gemini.FakeGemini(
+        dim=args.dim, embed_latency=args.embed_latency, generate_latency=args.llm_latency
+    ))
+    server = BankServer(latency=args.bank_latency).start()
+    recorder = StageRecorder()
+    app, headers = create_client(args.verbose)
+    instrument(recorder, fake)
+
+    url = server.bank_url(args.bank_size, args.seed)
+    queries = generate_queries(args.requests + 1, args.seed)
+    print(f"Bank: {args.bank_size} questions at {url}")
+    print(f"Fake Gemini latency: embed {args.embed_latency * 1000:.0f} ms, "
+          f"generate {args.llm_latency * 1000:.0f} ms; workdir {workdir}")
+
+    results = [
+        run_phase("cold", app, headers, "/check-question",
+                  [{"questions_url": url, "question": queries[0]}], 1, recorder),
+        run_phase("check", app, headers, "/check-question",
+                  [{"questions_url": url, "question": q} for q in queries[1:]], args.concurrency, recorder),
+    ]
+    if args.group_requests:
+        results.append(run_phase("group", app, headers, "/group_similar_questions",
+                                 [{"questions_url": url}] * args.group_requests, 1, recorder))
+    server.stop()
+
+    for result in results:
+        print_phase(result)
+    print(f"\nFake Gemini calls: {json.dumps(fake.calls)}; bank server requests: {server.requests}")
+
+    report = {
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "baseline", "workdir", "verbose")},
+        "gemini_calls": fake.calls,
+        "phases": results,
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+    failed = any(code.startswith("5") for result in results for code in result["statuses"])
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            failed = bool(compare(results, json.load(f), args.tolerance)) or failed
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
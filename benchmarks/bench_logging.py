@@ -0,0 +1,171 @@
+"""
+Per-request logging overhead: synchronous handlers vs the queued pipeline.
+
+Each simulated request emits the records a /check-question request logs:
+one access record on entry, six app records with request extras and one
+access record for the response. The legacy setup writes them synchronously
+to every file and console handler, redacting once per handler. The current
+setup_logging redacts once and hands records to a background listener. The
+benchmark reports the time spent in the request thread per request, and for
+the queued pipeline also how long the listener took to drain afterwards.
+Each thread pauses --interval seconds between requests, standing in for the
+time a real request spends waiting on Gemini; --interval 0 measures a
+saturated logger instead.
+Console output goes to /dev/null for both, so the numbers reflect formatting
+and file I/O rather than the terminal.
+
+Usage:
+    python -m benchmarks.bench_logging --requests 5000 --threads 4
+"""
+import argparse
+import logging
+import logging.handlers
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.utils import logger_config
+from src.utils.logger_config import CustomJsonFormatter
+
+MESSAGES = [
+    "Processing check-question request",
+    "Fetching questions from: http://127.0.0.1/banks/5000.json",
+    "Using vector index for 5000 questions",
+    "Generating embeddings for new question",
+    "Sending prompt to Gemini API (0 cached verdicts)",
+    "Found 2 matching questions",
+]
+
+
+class LegacySensitiveDataFilter(logging.Filter):
+    """The original filter: nine lowercase scans per record, per handler."""
+
+    patterns = ['password', 'token', 'secret', 'key', 'auth', 'credential', 'jwt', 'api_key', 'apikey']
+
+    def filter(self, record):
+        if isinstance(record.msg, str):
+            for pattern in self.patterns:
+                if pattern in record.msg.lower():
+                    record.msg = self._redact_sensitive_data(record.msg, pattern)
+        return True
+
+    def _redact_sensitive_data(self, message, pattern):
+        if ":" in message:
+            parts = message.split(":")
+            for i, part in enumerate(parts):
+                if pattern in part.lower() and i < len(parts) - 1:
+                    parts[i + 1] = " [REDACTED]"
+            return ":".join(parts)
+        return message
+
+
+def legacy_setup_logging(app_name, log_level=logging.INFO):
+    """The original synchronous handler layout."""
+    logger = logging.getLogger()
+    logger.setLevel(log_level)
+    logger.handlers.clear()
+    json_formatter = CustomJsonFormatter('%(timestamp)s %(level)s %(name)s %(message)s')
+
+    def handler(h, level=log_level, formatter=json_formatter):
+        h.setFormatter(formatter)
+        h.setLevel(level)
+        h.addFilter(LegacySensitiveDataFilter())
+        return h
+
+    logger.addHandler(handler(logging.handlers.RotatingFileHandler('logs/app.log', maxBytes=10485760, backupCount=10)))
+    logger.addHandler(handler(logging.handlers.RotatingFileHandler('logs/error.log', maxBytes=10485760, backupCount=10),
+                              level=logging.ERROR))
+    logger.addHandler(handler(logging.StreamHandler(open(os.devnull, "w")),
+                              formatter=logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')))
+    access_logger = logging.getLogger('access')
+    access_logger.handlers.clear()
+    access_logger.setLevel(log_level)
+    access_logger.addHandler(handler(logging.handlers.TimedRotatingFileHandler('logs/access.log', when='midnight',
+                                                                               backupCount=30)))
+    access_logger.propagate = False
+    return logging.getLogger(app_name), access_logger
+
+
+def current_setup_logging(app_name):
+    loggers = logger_config.setup_logging(app_name=app_name)
+    router = logger_config._listener.handlers[0]
+    for handler in router.default:
+        if type(handler) is logging.StreamHandler:
+            handler.setStream(open(os.devnull, "w"))
+    return loggers['app_logger'], loggers['access_logger']
+
+
+def simulate_request(app_logger, access_logger, n):
+    request_id = f"00000000-0000-0000-0000-{n:012d}"
+    access_logger.info("Request: POST /check-question", extra={
+        'request_id': request_id, 'ip_address': '127.0.0.1', 'method': 'POST',
+        'path': '/check-question', 'user_agent': 'bench'
+    })
+    for message in MESSAGES:
+        app_logger.info(message, extra={'user_id': 'admin', 'request_id': request_id})
+    access_logger.info("Response: status_code=200", extra={'request_id': request_id, 'status_code': 200})
+
+
+def run(app_logger, access_logger, requests, threads, interval):
+    latencies = np.empty(requests)
+
+    def one(n):
+        start = time.perf_counter()
+        simulate_request(app_logger, access_logger, n)
+        latencies[n] = time.perf_counter() - start
+        if interval:
+            time.sleep(interval)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(one, range(requests)))
+    else:
+        for n in range(requests):
+            one(n)
+    return latencies * 1e6, time.perf_counter() - start
+
+
+def report(name, latencies, elapsed, drain=None):
+    drain_text = f" {drain * 1000:>9.1f}" if drain is not None else f" {'-':>9}"
+    print(f"{name:<10} {latencies.mean():>9.1f} {np.percentile(latencies, 50):>9.1f} "
+          f"{np.percentile(latencies, 99):>9.1f} {latencies.max():>9.1f} {elapsed * 1000:>10.1f}{drain_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds each thread waits between requests")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="qsimcheck-logbench-")
+    os.chdir(workdir)
+    os.makedirs("logs", exist_ok=True)
+    print(f"{args.requests} simulated requests, {len(MESSAGES) + 2} records each, {args.threads} threads "
+          f"(logs in {workdir})")
+    print(f"{'pipeline':<10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9} {'total ms':>10} {'drain ms':>9}")
+
+    app_logger, access_logger = legacy_setup_logging("bench-legacy")
+    latencies, elapsed = run(app_logger, access_logger, args.requests, args.threads, args.interval)
+    report("legacy", latencies, elapsed)
+    for handler in logging.getLogger().handlers + access_logger.handlers:
+        handler.close()
+
+    app_logger, access_logger = current_setup_logging("bench-queued")
+    latencies, elapsed = run(app_logger, access_logger, args.requests, args.threads, args.interval)
+    drain_start = time.perf_counter()
+    logger_config.stop_logging()
+    report("queued", latencies, elapsed, time.perf_counter() - drain_start)
+    waits = logger_config.log_queue_full_waits()
+    if waits:
+        print(f"{waits} records waited for a full queue (LOG_QUEUE_SIZE={logger_config.LOG_QUEUE_SIZE})")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Microbenchmark of SimpleVectorIndex.search against the original
+argsort-based implementation.
+
+Usage:
+    python -m benchmarks.bench_vector_index --sizes 1000,10000,100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.utils.faiss_utils import SimpleVectorIndex
+
+
+class LegacyVectorIndex:
+    """The float64, single-query, full-argsort index this benchmark compares against."""
+
+    def __init__(self, embeddings):
+        norm = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8
+        self.normalized_embeddings = embeddings / norm
+
+    def search(self, query_embedding, k=5):
+        norm_query = np.linalg.norm(query_embedding) + 1e-8
+        normalized_query = query_embedding / norm_query
+        similarities = np.dot(normalized_query, self.normalized_embeddings.T)
+        top_indices = np.argsort(-similarities[0])[:k]
+        top_scores = similarities[0][top_indices]
+        return np.array([top_scores]), np.array([top_indices])
+
+
+def time_call(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(sizes, dim, queries, k, repeat, seed=0):
+    rng = np.random.default_rng(seed)
+    print(f"{'N':>8} {'legacy 1q':>12} {'new 1q':>12} {'legacy Qq':>12} {'new Qq':>12} {'speedup':>8}")
+    for n in sizes:
+        embeddings = rng.standard_normal((n, dim))
+        query_matrix = rng.standard_normal((queries, dim))
+
+        legacy = LegacyVectorIndex(embeddings)
+        index = SimpleVectorIndex(embeddings)
+
+        _, legacy_ids = legacy.search(query_matrix[:1], k)
+        _, new_ids = index.search(query_matrix[:1], k)
+        if not np.array_equal(legacy_ids, new_ids):
+            print(f"warning: top-{k} results differ at N={n} (float32 ties)")
+
+        legacy_single = time_call(lambda: legacy.search(query_matrix[:1], k), repeat)
+        new_single = time_call(lambda: index.search(query_matrix[:1], k), repeat)
+        legacy_multi = time_call(
+            lambda: [legacy.search(query_matrix[i:i + 1], k) for i in range(queries)], repeat)
+        new_multi = time_call(lambda: index.search(query_matrix, k), repeat)
+
+        print(f"{n:>8} {legacy_single * 1e3:>10.2f}ms {new_single * 1e3:>10.2f}ms "
+              f"{legacy_multi * 1e3:>10.2f}ms {new_multi * 1e3:>10.2f}ms "
+              f"{legacy_multi / new_multi:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=32, help="rows in the multi-query batch")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run([int(n) for n in args.sizes.split(",")], args.dim, args.queries, args.k, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
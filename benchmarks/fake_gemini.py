@@ -0,0 +1,158 @@
+"""
+Deterministic offline stand-in for the Gemini API used by the benchmarks.
+
+install() replaces genai.embed_content and genai.GenerativeModel so the app
+runs without network access or an API key. Embeddings are hashed
+bag-of-words vectors, and the model answers the check, batch-check and
+grouping prompts by word-set overlap, so similar questions retrieve and
+match each other the way they would with the real service. Both calls sleep
+for a configurable latency to simulate the remote round trip.
+"""
+import hashlib
+import re
+import threading
+import time
+
+import numpy as np
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are can do does for how i in is it of on or the to what when which why with you your".split()
+)
+_QUOTED = re.compile(r'"""(.*?)"""', re.DOTALL)
+_NUMBERED = re.compile(r"^\s*(\d+)\.\s(.*)$")
+_SECTION = re.compile(r"\*Q(\d+) New Question:\*")
+
+
+def _words(text):
+    return {word for word in _WORD.findall((text or "").lower()) if word not in _STOPWORDS}
+
+
+def _jaccard(a, b):
+    a, b = _words(a), _words(b)
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGemini:
+    """
+    Fake embedding and generation endpoints with call counters.
+
+    Args:
+        dim: Embedding dimension.
+        embed_latency: Seconds each embed_content call sleeps.
+        generate_latency: Seconds each generate_content call sleeps.
+        match_threshold: Word-set Jaccard similarity at which two
+            questions are answered as identical.
+    """
+
+    def __init__(self, dim=768, embed_latency=0.05, generate_latency=0.5, match_threshold=0.5):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.generate_latency = generate_latency
+        self.match_threshold = match_threshold
+        self.calls = {"embed_content": 0, "embedded_texts": 0, "generate_content": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.calls[name] += amount
+
+    def embed_vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = sorted(_words(text)) or [(text or "").strip().lower()]
+        for word in words:
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        # A small shared component keeps empty texts from producing zero vectors.
+        vector[0] += 0.01
+        return vector
+
+    def embed_content(self, model, content, task_type=None, **kwargs):
+        items = content if isinstance(content, list) else [content]
+        self._count("embed_content")
+        self._count("embedded_texts", len(items))
+        if self.embed_latency:
+            time.sleep(self.embed_latency)
+        vectors = [self.embed_vector(text).tolist() for text in items]
+        return {"embedding": vectors if isinstance(content, list) else vectors[0]}
+
+    def _matches(self, new_question, candidates):
+        return [i + 1 for i, candidate in enumerate(candidates)
+                if _jaccard(new_question, candidate) >= self.match_threshold]
+
+    @staticmethod
+    def _numbered(lines):
+        items = []
+        for line in lines:
+            match = _NUMBERED.match(line)
+            if match:
+                items.append(match.group(2).strip())
+        return items
+
+    def answer(self, prompt):
+        """
+        Answers one of the prompts built in src.services.similarity_service.
+        """
+        if _SECTION.search(prompt):
+            answers = []
+            sections = _SECTION.split(prompt)[1:]
+            for q_num, body in zip(sections[::2], sections[1::2]):
+                quoted = _QUOTED.search(body)
+                candidates = self._numbered(body.split("Candidate Questions:*", 1)[-1].splitlines())
+                matches = self._matches(quoted.group(1) if quoted else "", candidates)
+                answers.append(f"Q{q_num}: {', '.join(map(str, matches)) or 'none'}")
+            return "\n".join(answers)
+
+        if "Candidate Questions" in prompt:
+            quoted = _QUOTED.search(prompt)
+            candidates = self._numbered(prompt.split("*Candidate Questions:*", 1)[-1].splitlines())
+            return ", ".join(map(str, self._matches(quoted.group(1) if quoted else "", candidates)))
+
+        questions = self._numbered(prompt.split("list of questions:", 1)[-1].split("Return the result", 1)[0].splitlines())
+        groups = []
+        assigned = set()
+        for i, question in enumerate(questions):
+            if i in assigned:
+                continue
+            group = [i] + [j for j in range(i + 1, len(questions))
+                           if j not in assigned and _jaccard(question, questions[j]) >= self.match_threshold]
+            if len(group) > 1:
+                assigned.update(group)
+                groups.append(group)
+        return "\n".join(f"Group {n}: {', '.join(str(i + 1) for i in group)}"
+                         for n, group in enumerate(groups, start=1))
+
+    def generate_content(self, prompt, **kwargs):
+        self._count("generate_content")
+        if self.generate_latency:
+            time.sleep(self.generate_latency)
+        return FakeResponse(self.answer(prompt))
+
+
+def install(fake):
+    """
+    Routes the google.generativeai calls used by the app to fake.
+
+    Must run before the app is created, since setup_gemini instantiates
+    the model at startup.
+    """
+    import google.generativeai as genai
+
+    class FakeGenerativeModel:
+        def __init__(self, model_name=None, **kwargs):
+            self.model_name = model_name
+
+        def generate_content(self, prompt, **kwargs):
+            return fake.generate_content(prompt, **kwargs)
+
+    genai.configure = lambda *args, **kwargs: None
+    # Look the methods up on every call so wrappers added later take effect.
+    genai.embed_content = lambda *args, **kwargs: fake.embed_content(*args, **kwargs)
+    genai.GenerativeModel = FakeGenerativeModel
+    return fake
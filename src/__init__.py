@@ -2,13 +2,15 @@ from flask import Flask, g, request, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 import uuid
 import os
+import time
 from dotenv import load_dotenv
 
 
 from .config import configure_app
 from .api import register_routes
-from .services import setup_gemini
-from .utils import setup_logging, log_request
+from .services import setup_gemini, start_bank_warmer, start_job_manager, start_verdict_cache
+from .utils import setup_logging, log_request, metrics_registry, server_timing_header
+from .utils.metrics import request_duration
 
 load_dotenv()
 
@@ -20,6 +22,7 @@ def create_app():
     
     @app.before_request
     def before_request():
+        g.request_start = time.perf_counter()
         g.request_id = str(uuid.uuid4())
         log_request(request)
         
@@ -43,6 +46,13 @@ def create_app():
         
         if hasattr(g, 'request_id'):
             response.headers['X-Request-ID'] = g.request_id
+
+        if hasattr(g, 'request_start'):
+            elapsed = time.perf_counter() - g.request_start
+            response.headers['Server-Timing'] = server_timing_header(g.get('stage_timings', {}), total=elapsed)
+            request_duration.observe(elapsed, endpoint=request.endpoint or 'unknown',
+                                     method=request.method, status=response.status_code)
+            metrics_registry.sync_if_due()
         
         status_code = response.status_code
         if status_code >= 400:
@@ -68,6 +78,9 @@ def create_app():
     
     setup_gemini(app)
     register_routes(app, components['limiter'])
+    start_bank_warmer(app)
+    start_job_manager(app)
+    start_verdict_cache(app)
     
     @app.errorhandler(404)
     def not_found_error(error):
@@ -1,10 +1,16 @@
 from .auth_routes import register_auth_routes
 from .question_routes import register_question_routes
 from .health_routes import register_health_routes
+from .bank_routes import register_bank_routes
+from .metrics_routes import register_metrics_routes
+from .job_routes import register_job_routes
 
 def register_routes(app, limiter):
     register_auth_routes(app, limiter)
     register_question_routes(app, limiter)
     register_health_routes(app, limiter)
+    register_bank_routes(app, limiter)
+    register_metrics_routes(app, limiter)
+    register_job_routes(app, limiter)
 
 __all__ = ['register_routes']
\ No newline at end of file
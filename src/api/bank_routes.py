@@ -0,0 +1,79 @@
+import uuid
+import urllib.parse
+import os
+from flask import request, jsonify, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.services import bank_warmer, question_bank_cache
+
+def register_bank_routes(app, limiter):
+    allowed_domains_str = os.getenv('ALLOWED_DOMAINS', '') if os.getenv('ALLOWED_DOMAINS', '') else 'all'
+    allowed_domains = [domain.strip() for domain in allowed_domains_str.split(',')]
+
+    @app.route("/banks", methods=["GET"])
+    @jwt_required()
+    def list_banks():
+        request_id = getattr(g, 'request_id', str(uuid.uuid4()))
+        current_user = get_jwt_identity()
+        app.logger.info("Listing registered question banks", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+        return jsonify({"banks": bank_warmer.status()})
+
+    @app.route("/banks/memory", methods=["GET"])
+    @jwt_required()
+    def bank_memory():
+        request_id = getattr(g, 'request_id', str(uuid.uuid4()))
+        current_user = get_jwt_identity()
+        app.logger.info("Reporting question bank memory", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+        stats = question_bank_cache.stats()
+        return jsonify({"resident_bytes": stats["bytes"], "max_bytes": stats["max_bytes"],
+                        "evictions": stats["evictions"], "banks": question_bank_cache.memory_report()})
+
+    @app.route("/banks", methods=["POST"])
+    @jwt_required()
+    def register_bank():
+        request_id = getattr(g, 'request_id', str(uuid.uuid4()))
+        current_user = get_jwt_identity()
+        app.logger.info("Processing bank registration request", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+
+        data = request.get_json(silent=True) or {}
+        questions_url = data.get("questions_url")
+
+        if not questions_url:
+            app.logger.warning("Missing questions_url parameter", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Missing 'questions_url' in request"}), 400
+
+        parsed_url = urllib.parse.urlparse(questions_url)
+
+        if not any(domain in parsed_url.netloc for domain in allowed_domains) and allowed_domains_str != 'all':
+            app.logger.warning(f"URL not allowed: {questions_url}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "URL not allowed. Please use an approved API endpoint."}), 403
+
+        status = bank_warmer.register(questions_url)
+        app.logger.info(f"Registered question bank for warm-up: {questions_url}", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+        return jsonify(status), 202
+
+    @app.route("/banks", methods=["DELETE"])
+    @jwt_required()
+    def unregister_bank():
+        request_id = getattr(g, 'request_id', str(uuid.uuid4()))
+        current_user = get_jwt_identity()
+
+        data = request.get_json(silent=True) or {}
+        questions_url = data.get("questions_url")
+
+        if not questions_url:
+            app.logger.warning("Missing questions_url parameter", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Missing 'questions_url' in request"}), 400
+
+        if not bank_warmer.unregister(questions_url):
+            return jsonify({"error": "Question bank is not registered"}), 404
+
+        app.logger.info(f"Unregistered question bank: {questions_url}", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+        return jsonify({"questions_url": questions_url, "status": "unregistered"})
\ No newline at end of file
@@ -2,6 +2,8 @@ import uuid
 import os
 from flask import jsonify, g
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.utils import embedding_cache
+from src.services import verdict_cache, response_cache, group_state_store
 
 def register_health_routes(app, limiter):
     @app.route("/health", methods=["GET"])
@@ -21,5 +23,9 @@ def register_health_routes(app, limiter):
         return jsonify({
             "status": "healthy",
             "gemini_api": gemini_status,
+            "embedding_cache": embedding_cache.stats(),
+            "verdict_cache": verdict_cache.stats(),
+            "response_cache": response_cache.stats(),
+            "group_state": group_state_store.stats(),
             "timestamp": str(uuid.uuid1().time)
         })
\ No newline at end of file
@@ -0,0 +1,64 @@
+import uuid
+import urllib.parse
+import os
+from flask import request, jsonify, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.services import job_manager
+
+def register_job_routes(app, limiter):
+    allowed_domains_str = os.getenv('ALLOWED_DOMAINS', '') if os.getenv('ALLOWED_DOMAINS', '') else 'all'
+    allowed_domains = [domain.strip() for domain in allowed_domains_str.split(',')]
+
+    @app.route("/jobs/group", methods=["POST"])
+    @jwt_required()
+    def submit_group_job():
+        request_id = getattr(g, 'request_id', str(uuid.uuid4()))
+        current_user = get_jwt_identity()
+        app.logger.info("Processing group job submission", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+
+        data = request.get_json(silent=True) or {}
+        questions_url = data.get("questions_url")
+
+        if not questions_url:
+            app.logger.warning("Missing questions_url parameter", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Missing 'questions_url' in request"}), 400
+
+        parsed_url = urllib.parse.urlparse(questions_url)
+
+        if not any(domain in parsed_url.netloc for domain in allowed_domains) and allowed_domains_str != 'all':
+            app.logger.warning(f"URL not allowed: {questions_url}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "URL not allowed. Please use an approved API endpoint."}), 403
+
+        job, deduplicated = job_manager.submit_group(questions_url, user_id=current_user)
+        app.logger.info(f"{'Joined existing' if deduplicated else 'Queued'} group job {job['id']} for {questions_url}", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+        response = jsonify(dict(job, deduplicated=deduplicated))
+        response.status_code = 202
+        response.headers['Location'] = f"/jobs/{job['id']}"
+        return response
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    @jwt_required()
+    def get_job(job_id):
+        current_user = get_jwt_identity()
+        job = job_manager.get(job_id)
+        if job is None or job_manager.owner(job_id) != current_user:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job)
+
+    @app.route("/jobs/<job_id>", methods=["DELETE"])
+    @jwt_required()
+    def cancel_job(job_id):
+        request_id = getattr(g, 'request_id', str(uuid.uuid4()))
+        current_user = get_jwt_identity()
+        if job_manager.owner(job_id) != current_user:
+            return jsonify({"error": "Job not found"}), 404
+        job = job_manager.cancel(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        app.logger.info(f"Cancellation requested for job {job_id} (status {job['status']})", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+        return jsonify(job), 202
@@ -0,0 +1,113 @@
+import hmac
+import ipaddress
+import os
+from flask import request, jsonify, Response
+from src.utils import embedding_cache, metrics_registry
+from src.utils.text_utils import _clean_markup
+from src.utils.logger_config import log_queue_full_waits
+from src.utils.admission import check_gate, batch_gate, group_gate, gemini_gate
+from src.services import question_bank_cache, verdict_cache, response_cache
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+CACHE_HITS = "qsimcheck_cache_hits_total"
+CACHE_MISSES = "qsimcheck_cache_misses_total"
+CACHE_ENTRIES = "qsimcheck_cache_entries"
+CACHE_EVICTIONS = "qsimcheck_cache_evictions_total"
+
+
+def collect_cache_metrics():
+    """
+    Reports hits, misses and size of the embedding, verdict, question bank,
+    response and clean_html caches.
+    """
+    embedding = embedding_cache.stats()
+    verdict = verdict_cache.stats()
+    bank = question_bank_cache.stats()
+    response = response_cache.stats()
+    clean = _clean_markup.cache_info()
+    caches = [
+        ("embedding", embedding["memory_hits"] + embedding["disk_hits"], embedding["misses"], embedding["entries"]),
+        ("verdict", verdict["hits"], verdict["misses"], verdict["entries"]),
+        ("question_bank", bank["warm_hits"] + bank["hits"] + bank["not_modified"] + bank["unchanged_content"],
+         bank["refreshes"], bank["banks"]),
+        ("response", response["hits"], response["misses"], response["entries"]),
+        ("clean_html", clean.hits, clean.misses, clean.currsize),
+    ]
+    samples = []
+    for name, hits, misses, entries in caches:
+        labels = {"cache": name}
+        samples.append((CACHE_HITS, "counter", "Cache lookups answered from the cache.", labels, hits))
+        samples.append((CACHE_MISSES, "counter", "Cache lookups that had to compute the value.", labels, misses))
+        samples.append((CACHE_ENTRIES, "gauge", "Entries currently held by the cache.", labels, entries))
+    samples.append((CACHE_EVICTIONS, "counter", "Entries evicted from the cache.", {"cache": "embedding"},
+                    embedding["evictions"]))
+    samples.append((CACHE_EVICTIONS, "counter", "Entries evicted from the cache.", {"cache": "embedding_disk"},
+                    embedding["disk_evictions"]))
+    samples.append(("qsimcheck_response_cache_bytes", "gauge", "Bytes held by cached responses.", {},
+                    response["bytes"]))
+    samples.append(("qsimcheck_response_cache_budget_bytes", "gauge", "Byte budget of the response cache.", {},
+                    response["max_bytes"]))
+    return samples
+
+
+def collect_bank_memory_metrics():
+    """
+    Reports the memory held by cached question banks in this process.
+    """
+    report = question_bank_cache.memory_report()
+    budget = question_bank_cache.stats()["max_bytes"]
+    return [
+        ("qsimcheck_bank_memory_bytes", "gauge", "Memory held by cached question banks.", {"kind": "resident"},
+         sum(entry["resident"] for entry in report)),
+        ("qsimcheck_bank_memory_bytes", "gauge", "Memory held by cached question banks.", {"kind": "mapped"},
+         sum(entry["mapped"] for entry in report)),
+        ("qsimcheck_bank_memory_budget_bytes", "gauge", "Resident memory budget for cached question banks.", {},
+         budget)
+    ]
+
+
+def collect_logging_metrics():
+    return [("qsimcheck_log_queue_full_total", "counter",
+             "Log records that waited for the writer because the log queue was full.", {}, log_queue_full_waits())]
+
+
+def collect_admission_metrics():
+    """
+    Reports each admission gate's running and queued callers in this process.
+    """
+    samples = []
+    for gate in (check_gate, batch_gate, group_gate, gemini_gate):
+        stats = gate.stats()
+        labels = {"gate": gate.name}
+        samples.append(("qsimcheck_admission_active", "gauge", "Callers running inside the gate.", labels,
+                        stats["active"]))
+        samples.append(("qsimcheck_admission_waiting", "gauge", "Callers queued for the gate.", labels,
+                        stats["waiting"]))
+    return samples
+
+
+def is_local_request():
+    try:
+        return ipaddress.ip_address(request.remote_addr or "").is_loopback
+    except ValueError:
+        return False
+
+
+def register_metrics_routes(app, limiter):
+    metrics_registry.add_collector(collect_cache_metrics)
+    metrics_registry.add_collector(collect_bank_memory_metrics)
+    metrics_registry.add_collector(collect_logging_metrics)
+    metrics_registry.add_collector(collect_admission_metrics)
+
+    @app.route("/metrics", methods=["GET"])
+    @limiter.exempt
+    def metrics():
+        # Without a token, metrics are only served on the loopback interface.
+        if METRICS_TOKEN:
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+            if not hmac.compare_digest(supplied, METRICS_TOKEN):
+                return jsonify({"error": "Invalid metrics token"}), 401
+        elif not is_local_request():
+            return jsonify({"error": "Set METRICS_TOKEN to scrape metrics from another host"}), 403
+        return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
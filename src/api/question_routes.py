@@ -1,10 +1,97 @@
 import uuid
+import json
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import os
-from flask import request, jsonify, g, current_app
+from flask import request, jsonify, g, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.utils import clean_html, build_vector_index, embed_texts
+from src.utils import embed_texts, EmbeddingError, stage
+from src.utils.admission import Overloaded, check_gate, batch_gate, group_gate
+from src.services import (
+    question_bank_cache, build_check_prompt, parse_match_numbers,
+    build_batch_check_prompt, parse_batch_matches, group_state_store,
+    verdict_cache, triage_candidates, decision_path, response_cache
+)
+
+MAX_BATCH_QUESTIONS = int(os.getenv("MAX_BATCH_QUESTIONS", "200"))
+BATCH_PACK_SIZE = int(os.getenv("BATCH_PACK_SIZE", "10"))
+BATCH_LLM_WORKERS = int(os.getenv("BATCH_LLM_WORKERS", "4"))
+BANK_REVALIDATE_INTERVAL = float(os.getenv("BANK_REVALIDATE_INTERVAL", "30"))
+
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def conditional_json(body, etag):
+    """
+    Returns body as JSON with its ETag, or an empty 304 when the client's
+    If-None-Match already names it.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(body)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def early_not_modified(endpoint, questions_url, questions=()):
+    """
+    Returns an empty 304 without contacting the bank server when the
+    client's If-None-Match names the cached response for the bank's
+    last-known content and the bank was revalidated less than
+    BANK_REVALIDATE_INTERVAL seconds ago, otherwise None.
+    """
+    if not request.if_none_match:
+        return None
+    bank = question_bank_cache.peek(questions_url, BANK_REVALIDATE_INTERVAL)
+    if bank is None:
+        return None
+    cached = response_cache.get(response_cache.make_key(endpoint, bank.content_hash, questions))
+    if cached is None or not request.if_none_match.contains(cached[1]):
+        return None
+    return conditional_json(*cached)
+
+def overloaded_response(error):
+    """
+    Returns the 503 sent when a request is shed, with a Retry-After hint.
+    """
+    response = jsonify({"error": "The service is busy. Please retry later."})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def requested_stream_format():
+    """
+    Returns "ndjson" or "sse" when the client asked for a streamed response
+    (with ?stream= or the Accept header), otherwise None.
+    """
+    stream_format = request.args.get("stream")
+    if stream_format in STREAM_MIMETYPES:
+        return stream_format
+    accept = request.headers.get("Accept", "")
+    if "text/event-stream" in accept:
+        return "sse"
+    if "application/x-ndjson" in accept:
+        return "ndjson"
+    return None
+
+def stream_response(stream_format, events):
+    """
+    Streams event dicts as NDJSON lines or Server-Sent Events.
+    """
+    def encode():
+        for event in events:
+            data = json.dumps(event)
+            if stream_format == "sse":
+                yield f"event: {event['event']}\ndata: {data}\n\n"
+            else:
+                yield data + "\n"
+
+    response = Response(stream_with_context(encode()), mimetype=STREAM_MIMETYPES[stream_format])
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 def register_question_routes(app, limiter):
     allowed_domains_str = os.getenv('ALLOWED_DOMAINS', '') if os.getenv('ALLOWED_DOMAINS', '') else 'all'
@@ -39,14 +126,18 @@ def register_question_routes(app, limiter):
                 app.logger.warning(f"URL not allowed: {questions_url}", 
                                 extra={'user_id': current_user, 'request_id': request_id})
                 return jsonify({"error": "URL not allowed. Please use an approved API endpoint."}), 403
+
+            not_modified = early_not_modified("check_question", questions_url, [new_question])
+            if not_modified is not None:
+                app.logger.info("Client's cached check-question response is current", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                return not_modified
                 
             try:
                 app.logger.info(f"Fetching questions from: {questions_url}", 
                             extra={'user_id': current_user, 'request_id': request_id})
-                response = requests.get(questions_url, timeout=5, 
-                                    headers={'User-Agent': 'Flask-App/1.0'})
-                response.raise_for_status()
-                questions = response.json()
+                bank = question_bank_cache.get(questions_url, build_index=False)
+                questions = bank.questions
             except requests.exceptions.RequestException as e:
                 app.logger.error(f"Failed to fetch questions: {str(e)}", 
                                 extra={'user_id': current_user, 'request_id': request_id})
@@ -57,68 +148,333 @@ def register_question_routes(app, limiter):
                                 extra={'user_id': current_user, 'request_id': request_id})
                 return jsonify({"error": "No questions were found at the provided URL"}), 404
 
-            app.logger.info(f"Building vector index for {len(questions)} questions", 
-                        extra={'user_id': current_user, 'request_id': request_id})
-            question_texts = [clean_html(q.get("Question")) for q in questions]
+            cache_key = response_cache.make_key("check_question", bank.content_hash, [new_question])
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                app.logger.info("Serving cached check-question response", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                return conditional_json(*cached)
 
-            index, _, _ = build_vector_index(question_texts)
+            duplicate, duplicate_rows = bank.lexical_duplicates(new_question)
+            if duplicate:
+                app.logger.info(f"Found {len(duplicate_rows)} {duplicate} duplicates, skipping embeddings and Gemini API", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                body = {"response": "yes", "matched_questions": [questions[row] for row in duplicate_rows],
+                        "decision_path": decision_path([], [], False, duplicate=duplicate)}
+                return conditional_json(body, response_cache.set(cache_key, body))
 
             app.logger.info("Generating embeddings for new question", 
                         extra={'user_id': current_user, 'request_id': request_id})
 
-            new_embedding = embed_texts([new_question])
-            D, I = index.search(new_embedding, k=5)
-            top_indices = I[0]
+            with check_gate.admit():
+                if bank.index is None:
+                    # The bank is only embedded once the request was admitted.
+                    bank = question_bank_cache.ensure_index(bank)
+                app.logger.info(f"Using vector index for {len(questions)} questions", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                question_texts = bank.texts
+                index = bank.index
+
+                with stage("embed"):
+                    new_embedding = embed_texts([new_question])
+                with stage("search"):
+                    D, I = index.search(new_embedding, k=5)
+                top_indices = I[0]
 
-            top_matches = [question_texts[i] for i in top_indices]
-            match_list = "\n".join(f"{i+1}. {q}" for i, q in enumerate(top_matches))
+                # Clear-cut candidates are decided by similarity; only the ambiguous band reaches the LLM.
+                triaged = triage_candidates(D[0])
+                top_matches = [question_texts[i] for i in top_indices]
+                ambiguous = [position for position, verdict in enumerate(triaged) if verdict is None]
+                verdicts = list(triaged)
+                for position, verdict in zip(ambiguous, verdict_cache.lookup(new_question, [top_matches[p] for p in ambiguous])):
+                    verdicts[position] = verdict
+                pending = [position for position, verdict in enumerate(verdicts) if verdict is None]
 
-            prompt = f"""
-                        You are an expert semantic analysis AI. Your task is to compare a "New Question" against a list of "Candidate Questions" and identify which ones are semantically identical.
-                        Definition of Semantically Identical: Two questions are semantically identical if they ask the exact same thing or test the same concept, even if the wording, names, or numbers are different.
-                        *New Question:*
-                        \"\"\"{new_question}\"\"\"
-                        *Candidate Questions:*
-                        {match_list}
-                        Which of the numbered "Candidate Questions" are semantically identical to the "New Question"?
+                if pending:
+                    pending_matches = [top_matches[position] for position in pending]
+                    prompt = build_check_prompt(new_question, pending_matches)
 
-                        Return ONLY the numbers of the matching candidates, separated by commas (e.g., "1, 3").
-                        Do not add any explanation or other text.
-                    """
+                    app.logger.info(f"Sending prompt to Gemini API ({len(top_matches) - len(pending)} cached verdicts)", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+                    with stage("llm"):
+                        response = llm.generate_content(prompt)
+                    match_numbers = response.text.strip()
+                    matched_pending = parse_match_numbers(match_numbers, len(pending)) if match_numbers else []
+                    if match_numbers:
+                        app.logger.info(f"Gemini identified matches: {match_numbers}", 
+                                    extra={'user_id': current_user, 'request_id': request_id})
+                    verdict_cache.record(new_question, pending_matches, matched_pending)
+                    for position in pending:
+                        verdicts[position] = False
+                    for pending_position in matched_pending:
+                        verdicts[pending[pending_position]] = True
+                elif ambiguous:
+                    app.logger.info("All candidate verdicts cached, skipping Gemini API", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+                else:
+                    app.logger.info(f"Similarity scores decided all candidates (best {float(D[0][0]):.3f}), skipping Gemini API", 
+                                extra={'user_id': current_user, 'request_id': request_id})
 
-            app.logger.info("Sending prompt to Gemini API", 
-                        extra={'user_id': current_user, 'request_id': request_id})
-            response = llm.generate_content(prompt)
-            match_numbers = response.text.strip()
-            matched_questions = []
-
-            if match_numbers:
-                app.logger.info(f"Gemini identified matches: {match_numbers}", 
-                            extra={'user_id': current_user, 'request_id': request_id})
-                for num_str in match_numbers.split(","):
-                    try:
-                        match_idx_1_based = int(num_str.strip())
-                        original_list_idx = top_indices[match_idx_1_based - 1]
-                        matched_questions.append(questions[original_list_idx])
-                    except (ValueError, IndexError) as e:
-                        app.logger.warning(f"Error parsing match index: {str(e)}", 
-                                        extra={'user_id': current_user, 'request_id': request_id})
-                        continue
+            path = decision_path(triaged, verdicts, bool(pending))
+            matched_questions = [questions[top_indices[position]]
+                                 for position, verdict in enumerate(verdicts) if verdict]
 
             if matched_questions:
                 app.logger.info(f"Found {len(matched_questions)} matching questions", 
                             extra={'user_id': current_user, 'request_id': request_id})
-                return jsonify({"response": "yes", "matched_questions": matched_questions})
+                body = {"response": "yes", "matched_questions": matched_questions, "decision_path": path}
             else:
                 app.logger.info("No matching questions found", 
                             extra={'user_id': current_user, 'request_id': request_id})
-                return jsonify({"response": "no"})
+                body = {"response": "no", "decision_path": path}
+            return conditional_json(body, response_cache.set(cache_key, body))
+
+        except Overloaded as e:
+            app.logger.warning(f"Shedding check-question request: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return overloaded_response(e)
+
+        except requests.exceptions.RequestException as e:
+            app.logger.error(f"Failed to fetch questions: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Could not retrieve questions from the provided URL"}), 500
+
+        except EmbeddingError as e:
+            app.logger.error(f"Embedding failed in check-question: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Could not generate embeddings. Please try again later."}), 503
 
         except Exception as e:
             app.logger.error(f"Error in check-question: {str(e)}", 
                             extra={'user_id': current_user, 'request_id': request_id})
             return jsonify({"error": "An internal server error occurred"}), 500
 
+    @app.route("/check-questions", methods=["POST"])
+    @jwt_required()
+    def check_questions():
+        request_id = getattr(g, 'request_id', str(uuid.uuid4()))
+        current_user = get_jwt_identity()
+        app.logger.info("Processing check-questions request", 
+                    extra={'user_id': current_user, 'request_id': request_id})
+        
+        llm = current_app.config.get('llm')
+        if not llm:
+            app.logger.error("Gemini model not initialized", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Gemini model not initialized. Check API Key."}), 503
+        try:
+            data = request.json
+            questions_url = data.get("questions_url")
+            new_questions = data.get("questions")
+
+            if not questions_url or not new_questions or not isinstance(new_questions, list) \
+                    or not all(isinstance(q, str) and q.strip() for q in new_questions):
+                app.logger.warning("Missing required parameters", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+                return jsonify({"error": "Request body must contain 'questions_url' and a non-empty list of 'questions'"}), 400
+
+            if len(new_questions) > MAX_BATCH_QUESTIONS:
+                app.logger.warning(f"Batch too large: {len(new_questions)} questions", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+                return jsonify({"error": f"A batch may contain at most {MAX_BATCH_QUESTIONS} questions"}), 400
+
+            parsed_url = urllib.parse.urlparse(questions_url)
+            
+            if not any(domain in parsed_url.netloc for domain in allowed_domains) and allowed_domains_str != 'all':
+                app.logger.warning(f"URL not allowed: {questions_url}", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+                return jsonify({"error": "URL not allowed. Please use an approved API endpoint."}), 403
+                
+            try:
+                app.logger.info(f"Fetching questions from: {questions_url}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                bank = question_bank_cache.get(questions_url, build_index=False)
+                questions = bank.questions
+            except requests.exceptions.RequestException as e:
+                app.logger.error(f"Failed to fetch questions: {str(e)}", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+                return jsonify({"error": "Could not retrieve questions from the provided URL"}), 500
+
+            if not questions:
+                app.logger.warning("No questions found at URL", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+                return jsonify({"error": "No questions were found at the provided URL"}), 404
+
+            duplicates = [bank.lexical_duplicates(new_question) for new_question in new_questions]
+            # Lexical duplicates are answered directly; only the rest are embedded.
+            semantic = [i for i, (duplicate, _) in enumerate(duplicates) if not duplicate]
+            semantic_questions = [new_questions[i] for i in semantic]
+
+            app.logger.info(f"Generating embeddings for {len(semantic)} new questions "
+                            f"({len(new_questions) - len(semantic)} lexical duplicates)", 
+                        extra={'user_id': current_user, 'request_id': request_id})
+            with batch_gate.admit():
+                top_scores, top_indices = [], []
+                if semantic_questions and bank.index is None:
+                    # The bank is only embedded once the request was admitted.
+                    bank = question_bank_cache.ensure_index(bank)
+                if semantic_questions:
+                    with stage("embed"):
+                        new_embeddings = embed_texts(semantic_questions)
+                    with stage("search"):
+                        top_scores, top_indices = bank.index.search(new_embeddings, k=5)
+
+                items = [(new_question, [bank.texts[i] for i in indices])
+                         for new_question, indices in zip(semantic_questions, top_indices)]
+                triaged = [triage_candidates(scores) for scores in top_scores]
+                verdicts = []
+                for (new_question, candidates), item_triage in zip(items, triaged):
+                    ambiguous = [p for p, verdict in enumerate(item_triage) if verdict is None]
+                    item_verdicts = list(item_triage)
+                    for p, verdict in zip(ambiguous, verdict_cache.lookup(new_question, [candidates[p] for p in ambiguous])):
+                        item_verdicts[p] = verdict
+                    verdicts.append(item_verdicts)
+                pending = [[p for p, verdict in enumerate(item_verdicts) if verdict is None]
+                           for item_verdicts in verdicts]
+                to_ask = [i for i in range(len(items)) if pending[i]]
+                packs = [to_ask[start:start + BATCH_PACK_SIZE]
+                         for start in range(0, len(to_ask), BATCH_PACK_SIZE)]
+
+                def adjudicate(pack):
+                    pack_items = [(items[i][0], [items[i][1][p] for p in pending[i]]) for i in pack]
+                    result = llm.generate_content(build_batch_check_prompt(pack_items))
+                    pack_matches = parse_batch_matches(result.text, [len(c) for _, c in pack_items])
+                    for (new_question, candidates), matched in zip(pack_items, pack_matches):
+                        verdict_cache.record(new_question, candidates, matched)
+                    return pack_matches
+
+                if packs:
+                    app.logger.info(f"Sending {len(packs)} packed prompts to Gemini API", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+                    with stage("llm"), ThreadPoolExecutor(max_workers=min(BATCH_LLM_WORKERS, len(packs))) as executor:
+                        pack_results = list(executor.map(adjudicate, packs))
+                    for pack, pack_matches in zip(packs, pack_results):
+                        for i, matched in zip(pack, pack_matches):
+                            for p in pending[i]:
+                                verdicts[i][p] = False
+                            for pending_position in matched:
+                                verdicts[i][pending[i][pending_position]] = True
+                else:
+                    app.logger.info("All candidate verdicts cached, skipping Gemini API", 
+                                extra={'user_id': current_user, 'request_id': request_id})
+
+            results = [None] * len(new_questions)
+            for i, (duplicate, duplicate_rows) in enumerate(duplicates):
+                if duplicate:
+                    results[i] = {"question": new_questions[i], "response": "yes",
+                                  "matched_questions": [questions[row] for row in duplicate_rows],
+                                  "decision_path": decision_path([], [], False, duplicate=duplicate)}
+            for i, item_verdicts in enumerate(verdicts):
+                path = decision_path(triaged[i], item_verdicts, bool(pending[i]))
+                matched_questions = [questions[top_indices[i][p]]
+                                     for p, verdict in enumerate(item_verdicts) if verdict]
+                new_question = semantic_questions[i]
+                if matched_questions:
+                    results[semantic[i]] = {"question": new_question, "response": "yes",
+                                            "matched_questions": matched_questions, "decision_path": path}
+                else:
+                    results[semantic[i]] = {"question": new_question, "response": "no", "decision_path": path}
+
+            matched_count = sum(1 for r in results if r["response"] == "yes")
+            app.logger.info(f"Found matches for {matched_count} of {len(results)} questions", 
+                        extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"results": results})
+
+        except Overloaded as e:
+            app.logger.warning(f"Shedding check-questions request: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return overloaded_response(e)
+
+        except requests.exceptions.RequestException as e:
+            app.logger.error(f"Failed to fetch questions: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Could not retrieve questions from the provided URL"}), 500
+
+        except EmbeddingError as e:
+            app.logger.error(f"Embedding failed in check-questions: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Could not generate embeddings. Please try again later."}), 503
+
+        except Exception as e:
+            app.logger.error(f"Error in check-questions: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "An internal server error occurred"}), 500
+
+    def group_events(questions_url, llm, current_user, request_id):
+        """
+        Runs a grouping request as a stream of progress, group and summary
+        events. Failures after the stream has started become error events.
+        """
+        extra = {'user_id': current_user, 'request_id': request_id}
+        start = time.perf_counter()
+        try:
+            yield {"event": "progress", "stage": "fetch", "status": "started"}
+            app.logger.info(f"Fetching questions from: {questions_url}", extra=extra)
+            bank = question_bank_cache.get(questions_url, build_index=False)
+            questions = bank.questions
+            if not questions:
+                app.logger.warning("No questions found at URL", extra=extra)
+                yield {"event": "error", "error": "No questions found"}
+                return
+            yield {"event": "progress", "stage": "fetch", "status": "done", "questions": len(questions)}
+
+            group_count = 0
+            cache_key = response_cache.make_key("group_similar_questions", bank.content_hash)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                app.logger.info("Streaming cached group_similar_questions response", extra=extra)
+                for group in cached[0].get("matched_groups", []):
+                    group_count += 1
+                    yield {"event": "group", "group": group_count, "questions": group}
+            else:
+                row_groups = []
+                with group_gate.admit():
+                    if bank.index is None:
+                        yield {"event": "progress", "stage": "embed", "status": "started"}
+                        bank = question_bank_cache.ensure_index(bank)
+                        yield {"event": "progress", "stage": "embed", "status": "done"}
+
+                    app.logger.info(f"Clustering {len(questions)} questions for grouping", extra=extra)
+                    yield {"event": "progress", "stage": "cluster", "status": "started"}
+                    events = group_state_store.iter_group_events(llm, bank)
+                    for event in events:
+                        if event["event"] == "clusters":
+                            yield {"event": "progress", "stage": "cluster", "status": "done",
+                                   "mode": event["mode"], "changed": event["changed"], "removed": event["removed"],
+                                   "duplicate_groups": event["duplicate_groups"],
+                                   "candidate_clusters": event["candidate_clusters"], "prompts": event["prompts"]}
+                        else:
+                            group_count += 1
+                            row_groups.append(event["rows"])
+                            yield {"event": "group", "group": group_count,
+                                   "questions": [questions[row] for row in event["rows"]]}
+
+                row_groups.sort()
+                if row_groups:
+                    body = {"response": "yes", "matched_groups": [[questions[row] for row in group]
+                                                                  for group in row_groups]}
+                else:
+                    body = {"response": "no"}
+                response_cache.set(cache_key, body)
+
+            app.logger.info(f"Streamed {group_count} question groups", extra=extra)
+            yield {"event": "summary", "response": "yes" if group_count else "no", "groups": group_count,
+                   "questions": len(questions), "cached": cached is not None,
+                   "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+        except Overloaded as e:
+            app.logger.warning(f"Shedding group_similar_questions stream: {str(e)}", extra=extra)
+            yield {"event": "error", "error": "The service is busy. Please retry later.", "retry_after": e.retry_after}
+        except requests.exceptions.RequestException as e:
+            app.logger.error(f"Failed to fetch questions: {str(e)}", extra=extra)
+            yield {"event": "error", "error": "Could not fetch questions from the URL"}
+        except EmbeddingError as e:
+            app.logger.error(f"Embedding failed in group_similar_questions: {str(e)}", extra=extra)
+            yield {"event": "error", "error": "Could not generate embeddings. Please try again later."}
+        except Exception as e:
+            app.logger.error(f"Error in group_similar_questions: {str(e)}", extra=extra)
+            yield {"event": "error", "error": "An internal server error occurred"}
+
     @app.route("/group_similar_questions", methods=["POST"])
     @jwt_required()
     def group_similar_questions():
@@ -143,18 +499,28 @@ def register_question_routes(app, limiter):
                 
             parsed_url = urllib.parse.urlparse(questions_url)
             
-            if not any(domain in parsed_url.netloc for domain in allowed_domains):
+            if not any(domain in parsed_url.netloc for domain in allowed_domains) and allowed_domains_str != 'all':
                 app.logger.warning(f"URL not allowed: {questions_url}", 
                                 extra={'user_id': current_user, 'request_id': request_id})
                 return jsonify({"error": "URL not allowed. Please use an approved API endpoint."}), 403
 
+            stream_format = requested_stream_format()
+            if stream_format:
+                app.logger.info(f"Streaming group_similar_questions as {stream_format}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                return stream_response(stream_format, group_events(questions_url, llm, current_user, request_id))
+
+            not_modified = early_not_modified("group_similar_questions", questions_url)
+            if not_modified is not None:
+                app.logger.info("Client's cached group_similar_questions response is current", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                return not_modified
+
             try:
                 app.logger.info(f"Fetching questions from: {questions_url}", 
                             extra={'user_id': current_user, 'request_id': request_id})
-                response = requests.get(questions_url, timeout=5,
-                                    headers={'User-Agent': 'Flask-App/1.0'})
-                response.raise_for_status()
-                questions = response.json()
+                bank = question_bank_cache.get(questions_url, build_index=False)
+                questions = bank.questions
             except requests.exceptions.RequestException as e:
                 app.logger.error(f"Failed to fetch questions: {str(e)}", 
                                 extra={'user_id': current_user, 'request_id': request_id})
@@ -165,56 +531,46 @@ def register_question_routes(app, limiter):
                                 extra={'user_id': current_user, 'request_id': request_id})
                 return jsonify({"response": "no", "message": "No questions found"}), 404
 
-            app.logger.info(f"Processing {len(questions)} questions for grouping", 
-                        extra={'user_id': current_user, 'request_id': request_id})
-            question_texts = [clean_html(q.get("Question")) for q in questions]
-            joined_questions = "\n".join([f"{i+1}. {q}" for i, q in enumerate(question_texts)])
-
-            prompt = f"""
-You are an expert question-grouping AI. Your task is to review the provided list of academic questions and identify all groups of questions that are *semantically identical*.
-
-**Definition of Semantically Identical:** Questions are semantically identical if they ask the same underlying question, test the same concept or skill, or require the same reasoning or answer approach — regardless of differences in phrasing, specific names, numbers, or wording.
-
-Here is the list of questions:
-{joined_questions}
-
-Return the result as groups of comma-separated numbers (based on their position in the list) representing identical questions.
-
-Example output: 
-Group 1: 1, 4, 7  
-Group 2: 2, 5
-
-Only return groups with more than one question. Do not include any explanation.
-"""
+            cache_key = response_cache.make_key("group_similar_questions", bank.content_hash)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                app.logger.info("Serving cached group_similar_questions response", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                return conditional_json(*cached)
 
-            app.logger.info("Sending grouping prompt to Gemini API", 
-                        extra={'user_id': current_user, 'request_id': request_id})
-            result = llm.generate_content(prompt)
-            raw_output = result.text.strip()
-            groups = []
-
-            for line in raw_output.splitlines():
-                if ":" in line:
-                    try:
-                        _, indices = line.split(":")
-                        ids = [int(x.strip()) - 1 for x in indices.strip().split(",") if x.strip().isdigit()]
-                        if len(ids) > 1:
-                            group = [questions[i] for i in ids if 0 <= i < len(questions)]
-                            if group:
-                                groups.append(group)
-                    except Exception as parse_error:
-                        app.logger.warning(f"Error parsing group line: {line} - {str(parse_error)}", 
-                                        extra={'user_id': current_user, 'request_id': request_id})
-                        continue
+            with group_gate.admit():
+                if bank.index is None:
+                    # The bank is only embedded once the request was admitted.
+                    bank = question_bank_cache.ensure_index(bank)
+                app.logger.info(f"Clustering {len(questions)} questions for grouping", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+                row_groups = group_state_store.group_questions(llm, bank)
+            groups = [[questions[row] for row in group] for group in row_groups]
 
             if groups:
                 app.logger.info(f"Found {len(groups)} question groups", 
                             extra={'user_id': current_user, 'request_id': request_id})
-                return jsonify({"response": "yes", "matched_groups": groups})
+                body = {"response": "yes", "matched_groups": groups}
             else:
                 app.logger.info("No question groups found", 
                             extra={'user_id': current_user, 'request_id': request_id})
-                return jsonify({"response": "no"})
+                body = {"response": "no"}
+            return conditional_json(body, response_cache.set(cache_key, body))
+
+        except Overloaded as e:
+            app.logger.warning(f"Shedding group_similar_questions request: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return overloaded_response(e)
+
+        except requests.exceptions.RequestException as e:
+            app.logger.error(f"Failed to fetch questions: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Could not fetch questions from the URL"}), 500
+
+        except EmbeddingError as e:
+            app.logger.error(f"Embedding failed in group_similar_questions: {str(e)}", 
+                            extra={'user_id': current_user, 'request_id': request_id})
+            return jsonify({"error": "Could not generate embeddings. Please try again later."}), 503
 
         except Exception as e:
             app.logger.error(f"Error in group_similar_questions: {str(e)}", 
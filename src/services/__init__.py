@@ -1,3 +1,25 @@
 from .gemini_service import setup_gemini
+from .question_bank import question_bank_cache
+from .similarity_service import (
+    build_check_prompt, parse_match_numbers,
+    build_batch_check_prompt, parse_batch_matches,
+    build_group_prompt, parse_groups,
+    triage_candidates, decision_path
+)
+from .grouping_service import group_questions, iter_group_events
+from .group_state import group_state_store
+from .verdict_cache import verdict_cache, start_verdict_cache
+from .response_cache import response_cache
+from .warmup_service import bank_warmer, start_bank_warmer
+from .job_service import job_manager, start_job_manager
 
-__all__ = ['setup_gemini']
\ No newline at end of file
+__all__ = [
+    'setup_gemini', 'question_bank_cache',
+    'build_check_prompt', 'parse_match_numbers',
+    'build_batch_check_prompt', 'parse_batch_matches',
+    'build_group_prompt', 'parse_groups', 'group_questions', 'iter_group_events',
+    'group_state_store',
+    'triage_candidates', 'decision_path',
+    'verdict_cache', 'start_verdict_cache', 'response_cache', 'bank_warmer', 'start_bank_warmer',
+    'job_manager', 'start_job_manager'
+]
\ No newline at end of file
@@ -1,10 +1,30 @@
 import os
 import google.generativeai as genai
+from ..utils.metrics import gemini_call
+from ..utils.admission import gemini_gate
+
+GEMINI_MODEL_NAME = "gemini-1.5-flash"
+
+class InstrumentedModel:
+    """
+    Wraps a GenerativeModel so every generate_content call is counted and
+    timed, and waits for a slot in the global Gemini concurrency budget.
+    """
+
+    def __init__(self, model):
+        self._model = model
+
+    def generate_content(self, *args, **kwargs):
+        with gemini_gate.admit(), gemini_call("generate_content"):
+            return self._model.generate_content(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
 
 def setup_gemini(app):
     try:
         genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        llm = genai.GenerativeModel("gemini-1.5-flash")
+        llm = InstrumentedModel(genai.GenerativeModel(GEMINI_MODEL_NAME))
         app.logger.info("Gemini API initialized successfully")
         app.config['llm'] = llm
         return llm
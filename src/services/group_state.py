@@ -0,0 +1,184 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from ..utils.dedup import CANONICAL_FORM, LEXICAL_DEDUP, NEAR_DUPLICATE_THRESHOLD
+from ..utils.faiss_utils import EMBEDDING_MODEL
+from .gemini_service import GEMINI_MODEL_NAME
+from .grouping_service import (
+    GROUP_SIMILARITY_THRESHOLD, GROUP_NEIGHBORS, iter_group_events, iter_incremental_group_events
+)
+
+GROUP_STATE_DIR = os.getenv("GROUP_STATE_DIR", "cache/groups")
+GROUP_INCREMENTAL_MAX_CHANGE = float(os.getenv("GROUP_INCREMENTAL_MAX_CHANGE", "0.2"))
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class GroupStateStore:
+    """
+    Persists each bank's confirmed groups by question ID, so regrouping a
+    bank after an edit only looks at the questions that changed.
+
+    The state is one JSON file per questions_url holding the ID and text
+    hash of every question and the groups as lists of IDs. A bank is
+    regrouped from scratch when it has no state, when its questions lack
+    unique IDs, when the grouping settings or models changed, or when more
+    than max_change of its questions were added, changed or removed.
+    """
+
+    def __init__(self, state_dir, max_change=0.2):
+        self.state_dir = state_dir
+        self.max_change = max_change
+        self.settings = {
+            "embedding_model": EMBEDDING_MODEL,
+            "llm_model": GEMINI_MODEL_NAME,
+            "threshold": GROUP_SIMILARITY_THRESHOLD,
+            "neighbors": GROUP_NEIGHBORS,
+            "lexical_dedup": LEXICAL_DEDUP,
+            "canonical_form": CANONICAL_FORM,
+            "near_duplicate_threshold": NEAR_DUPLICATE_THRESHOLD
+        }
+        self._lock = threading.Lock()
+        self._counts = {"full": 0, "incremental": 0, "saves": 0}
+
+    @property
+    def enabled(self):
+        return bool(self.state_dir)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _path(self, url):
+        return os.path.join(self.state_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, url):
+        """
+        Returns the stored state of a bank, or None if there is none.
+        """
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, url, ids, hashes, row_groups):
+        """
+        Atomically replaces the stored state of a bank.
+        """
+        state = {
+            "url": url,
+            "settings": self.settings,
+            "updated_at": time.time(),
+            "questions": [[question_id, digest] for question_id, digest in zip(ids, hashes)],
+            "groups": [[ids[row] for row in group] for group in row_groups]
+        }
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, path)
+            self._count("saves")
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not store group state for {url}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def plan(self, url, ids, hashes):
+        """
+        Diffs a bank against its stored state.
+
+        Returns:
+            A tuple (groups, changed_rows, removed) with the stored groups
+            mapped to unchanged rows, the new or changed rows and the number
+            of removed IDs, or None if the bank must be regrouped from scratch.
+        """
+        if not self.enabled or not _unique_ids(ids):
+            return None
+        state = self.load(url)
+        if state is None or state.get("settings") != self.settings:
+            return None
+
+        previous = {question_id: digest for question_id, digest in state["questions"]}
+        row_of = {question_id: row for row, question_id in enumerate(ids)}
+        changed_rows = [row for row, (question_id, digest) in enumerate(zip(ids, hashes))
+                        if previous.get(question_id) != digest]
+        removed = sum(1 for question_id in previous if question_id not in row_of)
+        if len(changed_rows) + removed > self.max_change * max(len(ids), len(previous)):
+            return None
+
+        changed = set(changed_rows)
+        groups = []
+        for group in state["groups"]:
+            rows = [row_of[question_id] for question_id in group
+                    if question_id in row_of and row_of[question_id] not in changed]
+            if len(rows) > 1:
+                groups.append(sorted(rows))
+        return groups, changed_rows, removed
+
+    def iter_group_events(self, llm, bank):
+        """
+        Groups a bank's questions, incrementally when its stored state allows,
+        and stores the new state once every group was emitted.
+
+        Yields:
+            The records of iter_group_events. The "clusters" record also has
+            the mode ("full" or "incremental") and the number of changed and
+            removed questions.
+        """
+        ids = bank.ids()
+        hashes = [text_hash(text) for text in bank.texts]
+        plan = self.plan(bank.url, ids, hashes)
+        duplicate_groups = bank.duplicate_groups() if LEXICAL_DEDUP else None
+        if plan is None:
+            mode, changed, removed = "full", len(ids), 0
+            events = iter_group_events(llm, bank.texts, bank.index, duplicate_groups=duplicate_groups)
+        else:
+            groups, changed_rows, removed = plan
+            mode, changed = "incremental", len(changed_rows)
+            events = iter_incremental_group_events(llm, bank.texts, bank.index, groups, changed_rows,
+                                                   duplicate_groups=duplicate_groups)
+        self._count(mode)
+
+        row_groups = []
+        try:
+            for event in events:
+                if event["event"] == "clusters":
+                    event = dict(event, mode=mode, changed=changed, removed=removed)
+                else:
+                    row_groups.append(event["rows"])
+                yield event
+        finally:
+            events.close()
+        if self.enabled and _unique_ids(ids):
+            self.save(bank.url, ids, hashes, sorted(row_groups))
+
+    def group_questions(self, llm, bank):
+        """
+        Returns the bank's groups as sorted lists of rows, ordered by first row.
+        """
+        return sorted(event["rows"] for event in self.iter_group_events(llm, bank) if event["event"] == "group")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+def _unique_ids(ids):
+    return all(isinstance(question_id, (int, str)) for question_id in ids) and len(set(ids)) == len(ids)
+
+
+group_state_store = GroupStateStore(
+    state_dir=GROUP_STATE_DIR or None,
+    max_change=GROUP_INCREMENTAL_MAX_CHANGE
+)
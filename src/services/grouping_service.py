@@ -0,0 +1,267 @@
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ..utils.clustering import UnionFind, similarity_pairs
+from ..utils.metrics import stage
+from .similarity_service import build_group_prompt, parse_groups
+
+GROUP_SIMILARITY_THRESHOLD = float(os.getenv("GROUP_SIMILARITY_THRESHOLD", "0.8"))
+GROUP_NEIGHBORS = int(os.getenv("GROUP_NEIGHBORS", "10"))
+GROUP_MAX_CLUSTER_SIZE = int(os.getenv("GROUP_MAX_CLUSTER_SIZE", "40"))
+GROUP_LLM_WORKERS = int(os.getenv("GROUP_LLM_WORKERS", "4"))
+
+logger = logging.getLogger(__name__)
+
+
+def split_cluster(cluster, max_size, neighbours):
+    """
+    Splits a candidate cluster into prompts of at most max_size questions
+    so that every candidate edge appears in at least one prompt.
+
+    Each prompt is grown from a row with an edge no prompt holds yet by
+    repeatedly adding the row with the most such edges into the prompt, so
+    prompts follow the neighbour graph and overlap only where it needs.
+
+    Args:
+        cluster: The rows of one connected component.
+        max_size: The largest prompt, at least 2.
+        neighbours: Maps each row to the set of rows it has an edge with.
+    """
+    if len(cluster) <= max_size:
+        return [cluster]
+    in_cluster = set(cluster)
+    uncovered = {row: neighbours.get(row, set()) & in_cluster for row in cluster}
+    chunks = []
+    for seed in cluster:
+        while uncovered[seed]:
+            chunk = {seed}
+            gain = Counter(uncovered[seed])
+            while gain and len(chunk) < max_size:
+                row = max(gain, key=lambda candidate: (gain[candidate], -candidate))
+                del gain[row]
+                chunk.add(row)
+                gain.update(neighbour for neighbour in uncovered[row] if neighbour not in chunk)
+            for row in chunk:
+                uncovered[row] -= chunk
+            chunks.append(sorted(chunk))
+    return chunks
+
+
+def adjudicate_cluster(llm, texts, cluster):
+    """
+    Asks the LLM which members of one candidate cluster are identical.
+
+    Returns:
+        A list of confirmed groups of bank rows.
+    """
+    result = llm.generate_content(build_group_prompt([texts[row] for row in cluster]))
+    return [[cluster[i] for i in group] for group in parse_groups(result.text.strip(), len(cluster))]
+
+
+def iter_cluster_verdicts(llm, texts, clusters, prompts, expand, workers):
+    """
+    Runs the grouping prompts in parallel and yields each cluster's groups
+    once every prompt of that cluster returned.
+
+    The LLM's verdicts are merged with union-find across all prompts of a
+    cluster, so a group can span prompts that share a row.
+
+    Args:
+        clusters: The candidate clusters.
+        prompts: (cluster position, rows) pairs covering every cluster.
+        expand: Maps a component of prompt rows to its sorted bank rows.
+    """
+    if not prompts:
+        return
+    pending = Counter(position for position, _ in prompts)
+    verdicts = UnionFind(len(texts))
+    executor = ThreadPoolExecutor(max_workers=min(workers, len(prompts)))
+    try:
+        with stage("llm"):
+            futures = {executor.submit(adjudicate_cluster, llm, texts, chunk): position
+                       for position, chunk in prompts}
+            for future in as_completed(futures):
+                position = futures[future]
+                for group in future.result():
+                    for row in group[1:]:
+                        verdicts.union(group[0], row)
+                pending[position] -= 1
+                if pending[position]:
+                    continue
+                components = {}
+                for row in clusters[position]:
+                    components.setdefault(verdicts.find(row), []).append(row)
+                for component in components.values():
+                    rows = expand(component)
+                    if len(rows) > 1:
+                        yield {"event": "group", "rows": rows}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_group_events(llm, texts, index, threshold=None, top_k=None,
+                      max_cluster_size=None, workers=None, duplicate_groups=None):
+    """
+    Groups semantically identical questions in a bank, yielding each group
+    as soon as it is final.
+
+    Candidate clusters are found from the embedding neighbour graph and
+    each cluster is adjudicated by the LLM in its own small prompt. Exact
+    and near duplicates are grouped without the LLM and only their first
+    row is shown to it. Candidate clusters that share a duplicate group are
+    merged first, so groups from different clusters never overlap. A
+    cluster larger than max_cluster_size is split into overlapping prompts
+    that hold every candidate edge, and its groups are emitted once all of
+    them returned.
+
+    Args:
+        llm: The Gemini model.
+        texts: The cleaned question texts, one per bank row.
+        index: A SimpleVectorIndex over the same rows.
+        duplicate_groups: Groups of rows already known to be exact or near
+            duplicates.
+
+    Yields:
+        A {"event": "clusters", ...} record with the number of duplicate
+        groups, candidate clusters and prompts, then one
+        {"event": "group", "rows": [...]} record per group of bank rows.
+        Closing the generator cancels prompts that have not started.
+    """
+    threshold = GROUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+    top_k = top_k or GROUP_NEIGHBORS
+    max_cluster_size = max_cluster_size or GROUP_MAX_CLUSTER_SIZE
+    workers = workers or GROUP_LLM_WORKERS
+
+    duplicate_groups = duplicate_groups or []
+    members = {}
+    for group in duplicate_groups:
+        members[group[0]] = group
+
+    with stage("cluster"):
+        # Map rows to their duplicate group's first row and merge clusters that share one.
+        representative = list(range(len(texts)))
+        for group in duplicate_groups:
+            for row in group:
+                representative[row] = group[0]
+        union_find = UnionFind(len(texts))
+        neighbours = {}
+        for i, j, _ in similarity_pairs(index, threshold, top_k=top_k):
+            i, j = representative[i], representative[j]
+            if i != j:
+                union_find.union(i, j)
+                neighbours.setdefault(i, set()).add(j)
+                neighbours.setdefault(j, set()).add(i)
+        clusters = union_find.components(min_size=2)
+        prompts = [(position, chunk) for position, cluster in enumerate(clusters)
+                   for chunk in split_cluster(cluster, max_cluster_size, neighbours)]
+    logger.info(f"Found {len(duplicate_groups)} duplicate groups and {len(clusters)} candidate clusters, "
+                f"sending {len(prompts)} grouping prompts")
+    yield {"event": "clusters", "duplicate_groups": len(duplicate_groups),
+           "candidate_clusters": len(clusters), "prompts": len(prompts)}
+
+    def expand(reps):
+        return sorted(row for rep in reps for row in members.get(rep, [rep]))
+
+    # Duplicate groups no prompt can extend are final already.
+    adjudicated = {rep for cluster in clusters for rep in cluster}
+    for rep, group in members.items():
+        if rep not in adjudicated:
+            yield {"event": "group", "rows": list(group)}
+    yield from iter_cluster_verdicts(llm, texts, clusters, prompts, expand, workers)
+
+
+def iter_incremental_group_events(llm, texts, index, groups, changed_rows, threshold=None, top_k=None,
+                                  max_cluster_size=None, workers=None, duplicate_groups=None):
+    """
+    Updates a bank's known groups after some rows were added or changed,
+    yielding each group as soon as it is final.
+
+    Only the changed rows are searched: each is linked to its top_k
+    neighbours scoring at least threshold, and every connected set of
+    changed rows, existing groups and unchanged single questions goes to
+    the LLM in small prompts split as in iter_group_events, with one row
+    standing in for each existing group. Groups no changed row links to
+    are kept as they are.
+
+    Args:
+        llm: The Gemini model.
+        texts: The cleaned question texts, one per bank row.
+        index: The bank's vector index.
+        groups: The known groups of unchanged rows.
+        changed_rows: The new or changed rows.
+        duplicate_groups: Groups of rows already known to be exact or near
+            duplicates; those with a changed row are grouped without the LLM.
+
+    Yields:
+        The same records as iter_group_events.
+    """
+    threshold = GROUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+    top_k = top_k or GROUP_NEIGHBORS
+    max_cluster_size = max_cluster_size or GROUP_MAX_CLUSTER_SIZE
+    workers = workers or GROUP_LLM_WORKERS
+
+    changed = set(changed_rows)
+    union_find = UnionFind(len(texts))
+    for group in groups:
+        for row in group[1:]:
+            union_find.union(group[0], row)
+    duplicate_groups = [group for group in duplicate_groups or [] if changed.intersection(group)]
+    for group in duplicate_groups:
+        for row in group[1:]:
+            union_find.union(group[0], row)
+
+    with stage("cluster"):
+        links = UnionFind(len(texts))
+        neighbours = {}
+        if changed_rows:
+            embeddings = index.normalized_embeddings
+            scores, found = index.search(embeddings[list(changed_rows)], k=min(top_k + 1, len(texts)))
+            for row, row_scores, row_neighbours in zip(changed_rows, scores, found):
+                for score, neighbour in zip(row_scores, row_neighbours):
+                    if score < threshold or neighbour < 0:
+                        continue
+                    a, b = union_find.find(row), union_find.find(int(neighbour))
+                    if a != b:
+                        links.union(a, b)
+                        neighbours.setdefault(a, set()).add(b)
+                        neighbours.setdefault(b, set()).add(a)
+        # Each cluster holds one representative row per existing group or single question.
+        clusters = links.components(min_size=2)
+        prompts = [(position, chunk) for position, cluster in enumerate(clusters)
+                   for chunk in split_cluster(cluster, max_cluster_size, neighbours)]
+    logger.info(f"Assigning {len(changed)} changed questions: {len(clusters)} candidate clusters, "
+                f"sending {len(prompts)} grouping prompts")
+    yield {"event": "clusters", "duplicate_groups": len(duplicate_groups),
+           "candidate_clusters": len(clusters), "prompts": len(prompts)}
+
+    members = {}
+    for component in union_find.components():
+        members[union_find.find(component[0])] = component
+
+    def expand(reps):
+        return sorted(row for rep in reps for row in members[rep])
+
+    # Groups no prompt can extend are final already.
+    adjudicated = {rep for cluster in clusters for rep in cluster}
+    for rep, group in members.items():
+        if rep not in adjudicated and len(group) > 1:
+            yield {"event": "group", "rows": group}
+    yield from iter_cluster_verdicts(llm, texts, clusters, prompts, expand, workers)
+
+
+def group_questions(llm, texts, index, threshold=None, top_k=None,
+                    max_cluster_size=None, workers=None, duplicate_groups=None):
+    """
+    Groups semantically identical questions in a bank.
+
+    Takes the same arguments as iter_group_events.
+
+    Returns:
+        A list of groups, each a sorted list of bank rows, ordered by first row.
+    """
+    events = iter_group_events(llm, texts, index, threshold=threshold, top_k=top_k,
+                               max_cluster_size=max_cluster_size, workers=workers,
+                               duplicate_groups=duplicate_groups)
+    return sorted(event["rows"] for event in events if event["event"] == "group")
@@ -0,0 +1,345 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.single_flight import file_lock
+from .group_state import group_state_store
+from .question_bank import question_bank_cache
+from .response_cache import response_cache
+
+JOBS_DIR = os.getenv("JOBS_DIR", "cache/jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5"))
+
+ACTIVE_STATUSES = ("queued", "running")
+PUBLIC_FIELDS = ("id", "kind", "questions_url", "status", "created_at", "started_at", "finished_at",
+                 "progress", "error", "result", "cancel_requested")
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when its cancellation was requested."""
+
+
+class JobManager:
+    """
+    Runs grouping jobs on a dedicated thread pool and persists their state
+    as one JSON file per job, so any worker on the host can report on them
+    and results outlive the worker that produced them.
+
+    Submitting a job for a bank the same user already has a queued or
+    running job for returns the existing one. Each worker heartbeats its running jobs;
+    jobs whose worker stopped heartbeating are taken over and re-run by
+    another worker.
+    """
+
+    def __init__(self, bank_cache, jobs_dir, workers=2, retention=86400, heartbeat_interval=5):
+        self.bank_cache = bank_cache
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.retention = retention
+        self.heartbeat_interval = heartbeat_interval
+        self.llm = None
+        self._local = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._heartbeat = None
+        self._stop = threading.Event()
+
+    def _path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _active_path(self, key):
+        return os.path.join(self.jobs_dir, "active", key)
+
+    def _read(self, job_id):
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, job):
+        path = self._path(job["id"])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    def _update(self, job_id, **fields):
+        """
+        Applies fields to a job file under its lock and returns the new record.
+        """
+        with file_lock(self._path(job_id) + ".lock"):
+            job = self._read(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            self._write(job)
+            return job
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            return self._executor
+
+    def _is_stale(self, job):
+        return time.time() - job.get("heartbeat_at", 0) > self.heartbeat_interval * 3
+
+    def submit_group(self, questions_url, user_id=None):
+        """
+        Queues a grouping job for questions_url, or returns the queued or
+        running job of the same user for the same bank. Jobs are only
+        shared within one user, since only their owner may read or cancel them.
+
+        Returns:
+            A tuple (job, deduplicated).
+        """
+        os.makedirs(os.path.join(self.jobs_dir, "active"), exist_ok=True)
+        key = hashlib.sha256(f"group\x00{user_id}\x00{questions_url}".encode("utf-8")).hexdigest()
+        with file_lock(self._active_path(key) + ".lock"):
+            try:
+                with open(self._active_path(key), "r", encoding="utf-8") as f:
+                    existing = self._read(f.read().strip())
+            except OSError:
+                existing = None
+            if existing is not None and existing["status"] in ACTIVE_STATUSES and not existing["cancel_requested"]:
+                return self.public(existing), True
+
+            now = time.time()
+            job = {
+                "id": uuid.uuid4().hex,
+                "kind": "group",
+                "questions_url": questions_url,
+                "user_id": user_id,
+                "key": key,
+                "status": "queued",
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "heartbeat_at": now,
+                "progress": {},
+                "error": None,
+                "result": None,
+                "cancel_requested": False
+            }
+            self._write(job)
+            with open(self._active_path(key), "w", encoding="utf-8") as f:
+                f.write(job["id"])
+        self._schedule(job["id"])
+        return self.public(job), False
+
+    def _schedule(self, job_id):
+        with self._lock:
+            self._local[job_id] = threading.Event()
+        self._get_executor().submit(self._run, job_id)
+
+    def get(self, job_id):
+        """
+        Returns the public view of a job, or None if it is unknown.
+        """
+        job = self._read(job_id) if _valid_id(job_id) else None
+        return self.public(job) if job is not None else None
+
+    def owner(self, job_id):
+        job = self._read(job_id) if _valid_id(job_id) else None
+        return job.get("user_id") if job is not None else None
+
+    def cancel(self, job_id):
+        """
+        Requests cancellation. Queued jobs are cancelled before they start;
+        running jobs stop after their current Gemini prompts.
+
+        Returns:
+            The public view of the job, or None if it is unknown.
+        """
+        if not _valid_id(job_id):
+            return None
+        job = self._read(job_id)
+        if job is None:
+            return None
+        if job["status"] in ACTIVE_STATUSES:
+            job = self._update(job_id, cancel_requested=True)
+            with self._lock:
+                event = self._local.get(job_id)
+            if event is not None:
+                event.set()
+        return self.public(job)
+
+    def _cancelled(self, job_id):
+        with self._lock:
+            event = self._local.get(job_id)
+        return event is not None and event.is_set()
+
+    def _run(self, job_id):
+        job = self._read(job_id)
+        try:
+            if job is None or job["status"] not in ACTIVE_STATUSES:
+                return
+            if job["cancel_requested"] or self._cancelled(job_id):
+                raise JobCancelled()
+            job = self._update(job_id, status="running", started_at=time.time(), heartbeat_at=time.time(),
+                               owner_pid=os.getpid())
+            result = self._run_group(job)
+            self._finish(job, status="succeeded", result=result)
+            logger.info(f"Job {job_id} grouped {job['questions_url']}")
+        except JobCancelled:
+            self._finish(job, status="cancelled")
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            self._finish(job, status="failed", error=str(e))
+            logger.warning(f"Job {job_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._local.pop(job_id, None)
+
+    def _run_group(self, job):
+        if self.llm is None:
+            raise RuntimeError("Gemini model not initialized")
+        url = job["questions_url"]
+        bank = self.bank_cache.get(url)
+        questions = bank.questions
+        if not questions:
+            return {"response": "no", "message": "No questions found"}
+
+        cache_key = response_cache.make_key("group_similar_questions", bank.content_hash)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached[0]
+
+        row_groups = []
+        events = group_state_store.iter_group_events(self.llm, bank)
+        try:
+            for event in events:
+                if self._cancelled(job["id"]):
+                    raise JobCancelled()
+                if event["event"] == "clusters":
+                    progress = {"questions": len(questions), "mode": event["mode"], "changed": event["changed"],
+                                "prompts": event["prompts"], "groups": 0}
+                else:
+                    row_groups.append(event["rows"])
+                    progress = dict(progress, groups=len(row_groups))
+                self._update(job["id"], progress=progress, heartbeat_at=time.time())
+        finally:
+            events.close()
+
+        row_groups.sort()
+        if row_groups:
+            body = {"response": "yes", "matched_groups": [[questions[row] for row in group] for group in row_groups]}
+        else:
+            body = {"response": "no"}
+        response_cache.set(cache_key, body)
+        return body
+
+    def _finish(self, job, **fields):
+        if job is None:
+            return
+        self._update(job["id"], finished_at=time.time(), **fields)
+        active = self._active_path(job["key"])
+        with file_lock(active + ".lock"):
+            try:
+                with open(active, "r", encoding="utf-8") as f:
+                    if f.read().strip() == job["id"]:
+                        os.remove(active)
+            except OSError:
+                pass
+
+    def _job_ids(self):
+        try:
+            names = os.listdir(self.jobs_dir)
+        except OSError:
+            return []
+        return [name[:-5] for name in names if name.endswith(".json")]
+
+    def _maintain(self):
+        """
+        Heartbeats this worker's jobs, relays cancellations requested through
+        other workers, takes over orphaned jobs and deletes expired ones.
+        """
+        with self._lock:
+            local = dict(self._local)
+        now = time.time()
+        for job_id in self._job_ids():
+            if job_id in local:
+                job = self._update(job_id, heartbeat_at=now)
+                if job is not None and job["cancel_requested"]:
+                    local[job_id].set()
+                continue
+            job = self._read(job_id)
+            if job is None:
+                continue
+            if job["status"] in ACTIVE_STATUSES and self._is_stale(job):
+                with file_lock(self._path(job_id) + ".lock") as locked:
+                    job = self._read(job_id) if locked else None
+                    if job is None or job["status"] not in ACTIVE_STATUSES or not self._is_stale(job):
+                        continue
+                    job.update(status="queued", heartbeat_at=now, owner_pid=os.getpid())
+                    self._write(job)
+                logger.info(f"Taking over orphaned job {job_id}")
+                self._schedule(job_id)
+            elif job["status"] not in ACTIVE_STATUSES and now - (job["finished_at"] or now) > self.retention:
+                for path in (self._path(job_id), self._path(job_id) + ".lock"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def _run_heartbeat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                self._maintain()
+            except Exception as e:
+                logger.warning(f"Job maintenance failed: {e}")
+
+    def start(self, llm):
+        """
+        Sets the model used by jobs and starts the heartbeat thread, which
+        also resumes jobs left behind by stopped workers.
+        """
+        self.llm = llm
+        os.makedirs(os.path.join(self.jobs_dir, "active"), exist_ok=True)
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._run_heartbeat, name="job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def public(job):
+        return {field: job.get(field) for field in PUBLIC_FIELDS}
+
+    def stats(self):
+        with self._lock:
+            return {"local_jobs": len(self._local)}
+
+
+def _valid_id(job_id):
+    return len(job_id) == 32 and all(c in "0123456789abcdef" for c in job_id)
+
+
+job_manager = JobManager(
+    question_bank_cache,
+    jobs_dir=JOBS_DIR,
+    workers=JOB_WORKERS,
+    retention=JOB_RETENTION,
+    heartbeat_interval=JOB_HEARTBEAT_INTERVAL
+)
+
+
+def start_job_manager(app):
+    """
+    Starts the grouping job workers for app's Gemini model.
+    """
+    job_manager.start(app.config.get('llm'))
+    return job_manager
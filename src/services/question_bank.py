@@ -0,0 +1,523 @@
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import requests
+
+from ..utils import clean_html, embed_texts
+from ..utils.faiss_utils import SimpleVectorIndex, EMBEDDING_MODEL
+from ..utils.index_store import IndexStoreError
+from ..utils.ann_index import index_for_size
+from ..utils.columnar import IdColumn, RecordColumn, StringColumn, is_mapped
+from ..utils.dedup import CANONICAL_FORM, LexicalIndex, LEXICAL_DEDUP
+from ..utils.http_client import get_session
+from ..utils.json_stream import iter_json_array
+from ..utils.metrics import record_stage, stage
+from ..utils.single_flight import SingleFlight, file_lock
+
+HTTP_CHUNK_SIZE = int(os.getenv("HTTP_CHUNK_SIZE", "65536"))
+BANK_BUILD_LOCK_TIMEOUT = float(os.getenv("BANK_BUILD_LOCK_TIMEOUT", "120"))
+BANK_CACHE_MEMORY_BUDGET_MB = float(os.getenv("BANK_CACHE_MEMORY_BUDGET_MB", "1024"))
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionBank:
+    """
+    A fetched question bank together with its cleaned texts and vector index.
+
+    Columns are stored compactly: question IDs in an IdColumn, cleaned
+    texts in a StringColumn and the original records as JSON in a
+    RecordColumn, which only decodes the rows that are accessed.
+    """
+
+    def __init__(self, url, questions, texts, content_hash, etag=None, last_modified=None, ids=None):
+        self.url = url
+        if ids is None:
+            ids = [q.get("ID") if isinstance(q, dict) else None for q in questions]
+        self._ids = ids if isinstance(ids, IdColumn) else IdColumn(ids)
+        self.questions = questions if isinstance(questions, RecordColumn) else RecordColumn(questions)
+        self.texts = texts if isinstance(texts, StringColumn) else StringColumn(texts)
+        self.content_hash = content_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.embeddings = None
+        self.index = None
+        self.checked_at = time.time()
+        self._lexical = None
+        self._lexical_bytes = 0
+        self._duplicate_groups = None
+        self._lexical_lock = threading.Lock()
+
+    def ids(self):
+        return self._ids.tolist()
+
+    def lexical_index(self):
+        """
+        Returns the bank's LexicalIndex, building it on first use.
+        """
+        with self._lexical_lock:
+            if self._lexical is None:
+                with stage("lexical_index"):
+                    self._lexical = LexicalIndex(self.texts)
+                    self._lexical_bytes = _lexical_nbytes(self._lexical)
+            return self._lexical
+
+    def duplicate_groups(self):
+        """
+        Returns the groups of exact and near-duplicate rows, computed once per bank.
+        """
+        lexical = self.lexical_index()
+        with self._lexical_lock:
+            if self._duplicate_groups is None:
+                with stage("lexical_dedup"):
+                    self._duplicate_groups = lexical.groups()
+            return self._duplicate_groups
+
+    def lexical_duplicates(self, question):
+        """
+        Finds bank rows that are exact or near duplicates of a new question.
+
+        Returns:
+            A tuple (kind, rows) where kind is "exact", "near" or None when
+            lexical duplicate detection is off or nothing matched.
+        """
+        if not LEXICAL_DEDUP or not self.texts:
+            return None, []
+        text = clean_html(question)
+        lexical = self.lexical_index()
+        with stage("lexical_check"):
+            rows = lexical.exact_duplicates_of(text)
+            if rows:
+                return "exact", rows
+            rows = lexical.near_duplicates_of(text)
+        return ("near", rows) if rows else (None, [])
+
+    def row_map(self):
+        """
+        Maps each question ID to its (cleaned text, row number) pair.
+        """
+        rows = {}
+        for row, (question_id, text) in enumerate(zip(self.ids(), self.texts)):
+            if question_id is not None:
+                rows[question_id] = (text, row)
+        return rows
+
+    def memory_usage(self):
+        """
+        Returns the bytes held by each part of the bank.
+
+        Memory-mapped embeddings are reported as mapped: their pages belong
+        to the shared index store and are not counted as resident.
+        """
+        usage = {
+            "ids": self._ids.nbytes,
+            "texts": self.texts.nbytes,
+            "records": self.questions.nbytes,
+            "embeddings": 0,
+            "index": 0,
+            "lexical": self._lexical_bytes,
+            "mapped": 0
+        }
+        if self.embeddings is not None:
+            usage["mapped" if is_mapped(self.embeddings) else "embeddings"] += self.embeddings.nbytes
+        for name in ("centroids", "list_rows", "list_offsets"):
+            usage["index"] += getattr(getattr(self.index, name, None), "nbytes", 0)
+        usage["resident"] = sum(value for name, value in usage.items() if name != "mapped")
+        return usage
+
+
+def _lexical_nbytes(lexical):
+    # Estimate of the per-row strings and the hash table; the LSH buckets
+    # built on first near-duplicate lookup are not included.
+    strings = sum(sys.getsizeof(text) for text in lexical.canonical) + \
+        sum(sys.getsizeof(digest) for digest in lexical.hashes)
+    return strings + sys.getsizeof(lexical.by_hash) + 3 * 8 * len(lexical.canonical)
+
+
+class QuestionBankCache:
+    """
+    Keeps built question banks per questions_url, revalidates them with
+    conditional requests and only re-embeds questions whose text changed.
+
+    The banks' resident memory is bounded by max_bytes. Eviction is
+    size-aware (GreedyDual-Size): each use of a bank credits it in
+    inverse proportion to its size, so large banks that are rarely used
+    leave first and many small hot banks fit alongside them. Pinned banks
+    are never evicted.
+
+    Concurrent requests for the same questions_url share one fetch and
+    build, and with an index_dir, workers on the same host take turns
+    building a bank so later ones load the stored index instead of
+    re-embedding it.
+    """
+
+    def __init__(self, max_banks=32, fetch_timeout=5, index_dir=None, build_lock_timeout=120, max_bytes=None):
+        self.max_banks = max_banks
+        self.max_bytes = max_bytes
+        self.fetch_timeout = fetch_timeout
+        self.index_dir = index_dir
+        self.build_lock_timeout = build_lock_timeout
+        self._banks = OrderedDict()
+        self._sizes = {}
+        self._credits = {}
+        self._inflation = 0.0
+        self._pinned = {}
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._stats = {
+            "warm_hits": 0,
+            "hits": 0,
+            "not_modified": 0,
+            "unchanged_content": 0,
+            "refreshes": 0,
+            "reused_embeddings": 0,
+            "new_embeddings": 0,
+            "stored_index_loads": 0,
+            "coalesced": 0,
+            "deduplicated_embeddings": 0,
+            "evictions": 0
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _credit(self, url):
+        # Caller must hold the lock. GreedyDual-Size priority of a bank that was just used.
+        self._credits[url] = self._inflation + 2 ** 20 / max(self._sizes.get(url, 0), 1)
+
+    def _lookup(self, url):
+        with self._lock:
+            bank = self._banks.get(url)
+            if bank is not None:
+                self._banks.move_to_end(url)
+                self._credit(url)
+            return bank
+
+    def _evict(self, url):
+        # Caller must hold the lock.
+        del self._banks[url]
+        self._sizes.pop(url, None)
+        self._credits.pop(url, None)
+        self._stats["evictions"] += 1
+
+    def _store(self, bank):
+        size = bank.memory_usage()["resident"]
+        with self._lock:
+            self._banks[bank.url] = bank
+            self._banks.move_to_end(bank.url)
+            self._sizes[bank.url] = size
+            self._credit(bank.url)
+            evictable = [url for url in self._banks if url not in self._pinned and url != bank.url]
+            for url in evictable[:max(0, len(self._banks) - self.max_banks)]:
+                self._evict(url)
+                evictable.remove(url)
+            if self.max_bytes:
+                evictable.sort(key=lambda url: self._credits[url])
+                total = sum(self._sizes.values())
+                for url in evictable:
+                    if total <= self.max_bytes:
+                        break
+                    self._inflation = self._credits[url]
+                    total -= self._sizes[url]
+                    self._evict(url)
+                if total > self.max_bytes:
+                    logger.warning(f"Question banks hold {total} bytes, over the {self.max_bytes} byte budget, "
+                                   f"after evicting every unpinned bank but {bank.url}")
+
+    def pin(self, url, max_age):
+        """
+        Keeps url's bank out of LRU eviction and serves it without
+        revalidation while it was checked less than max_age seconds ago.
+        """
+        with self._lock:
+            self._pinned[url] = max_age
+
+    def unpin(self, url):
+        with self._lock:
+            self._pinned.pop(url, None)
+
+    def _fresh_pinned(self, url, build_index):
+        with self._lock:
+            max_age = self._pinned.get(url)
+            bank = self._banks.get(url)
+        if max_age is None or bank is None or time.time() - bank.checked_at >= max_age:
+            return None
+        if build_index and bank.index is None and bank.questions:
+            return None
+        return bank
+
+    def peek(self, url, max_age):
+        """
+        Returns url's cached bank without contacting the bank server if it
+        was revalidated less than max_age seconds ago, otherwise None.
+        """
+        with self._lock:
+            bank = self._banks.get(url)
+        if bank is None or time.time() - bank.checked_at >= max_age:
+            return None
+        return bank
+
+    def _index_path(self, url):
+        return os.path.join(self.index_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".idx")
+
+    def _load_stored_index(self, bank):
+        """
+        Attaches the memory-mapped index another worker saved for this exact
+        bank content, if there is one.
+        """
+        try:
+            index, header = SimpleVectorIndex.load(self._index_path(bank.url))
+        except IndexStoreError:
+            return False
+        # Rows with the same canonical text share an embedding, so the canonical form must match too.
+        if (header.get("content_hash") != bank.content_hash or header.get("model") != EMBEDDING_MODEL
+                or header.get("canonical_form") != CANONICAL_FORM or len(index) != len(bank.texts)):
+            return False
+        bank.index = index_for_size(index)
+        bank.embeddings = index.normalized_embeddings
+        self._count("stored_index_loads")
+        return True
+
+    def _store_index(self, bank, index):
+        """
+        Saves the index to the shared store and reopens it memory-mapped, so
+        the in-process copy is replaced by pages shared with other workers.
+        """
+        path = self._index_path(bank.url)
+        try:
+            index.save(path, ids=bank.ids(), url=bank.url, content_hash=bank.content_hash,
+                       canonical_form=CANONICAL_FORM)
+            index, _ = SimpleVectorIndex.load(path)
+        except (OSError, TypeError, IndexStoreError) as e:
+            logger.warning(f"Could not store index for {bank.url}: {e}")
+        return index
+
+    def _build_index(self, bank, previous=None):
+        """
+        Embeds the bank, reusing rows from a previous version of it whose
+        question ID and cleaned text are unchanged.
+
+        With an index_dir, the build runs under a host-wide lock per
+        questions_url, so a worker that waited for another one's build
+        loads its stored index for the same content instead of embedding.
+        """
+        if not self.index_dir:
+            self._embed_and_index(bank, previous)
+            return
+
+        wait_start = time.perf_counter()
+        with file_lock(self._index_path(bank.url) + ".lock", timeout=self.build_lock_timeout):
+            record_stage("build_lock_wait", time.perf_counter() - wait_start)
+            with stage("index_load"):
+                if self._load_stored_index(bank):
+                    return
+            self._embed_and_index(bank, previous)
+
+    def _embed_and_index(self, bank, previous=None):
+        reuse = {}
+        if previous is not None and previous.embeddings is not None:
+            old_rows = previous.row_map()
+            for row, (question_id, text) in enumerate(zip(bank.ids(), bank.texts)):
+                old = old_rows.get(question_id)
+                if old is not None and old[0] == text:
+                    reuse[row] = old[1]
+
+        pending = [row for row in range(len(bank.texts)) if row not in reuse]
+        # Rows with the same canonical text share one embedding.
+        source = {}
+        if LEXICAL_DEDUP and pending:
+            hashes = bank.lexical_index().hashes
+            first = {}
+            for row in pending:
+                source[row] = first.setdefault(hashes[row], row)
+            unique = sorted(set(source.values()))
+            self._count("deduplicated_embeddings", len(pending) - len(unique))
+        else:
+            unique = pending
+        with stage("embed_bank"):
+            new_embeddings = embed_texts([bank.texts[row] for row in unique]) if unique else None
+
+        dim = previous.embeddings.shape[1] if reuse else new_embeddings.shape[1]
+        embeddings = np.empty((len(bank.texts), dim), dtype=np.float32)
+        for row, old_row in reuse.items():
+            embeddings[row] = previous.embeddings[old_row]
+        if unique:
+            embeddings[unique] = new_embeddings
+        for row, source_row in source.items():
+            if source_row != row:
+                embeddings[row] = embeddings[source_row]
+
+        self._count("reused_embeddings", len(reuse))
+        self._count("new_embeddings", len(unique))
+        with stage("index_build"):
+            index = SimpleVectorIndex(embeddings)
+            if self.index_dir:
+                index = self._store_index(bank, index)
+            bank.index = index_for_size(index)
+        bank.embeddings = index.normalized_embeddings
+
+    def get(self, url, build_index=True, refresh=False):
+        """
+        Returns the QuestionBank for url, fetching or refreshing it as needed.
+
+        Pinned banks that were checked recently are served as-is unless
+        refresh is set. Concurrent calls for the same url wait for a single
+        fetch and build and share its result.
+
+        Raises:
+            requests.exceptions.RequestException: If the bank cannot be fetched.
+            EmbeddingError: If the bank's embeddings cannot be generated.
+        """
+        if not refresh:
+            warm = self._fresh_pinned(url, build_index)
+            if warm is not None:
+                self._count("warm_hits")
+                return warm
+
+        wait_start = time.perf_counter()
+        bank, shared = self._flights.do(url, lambda: self._fetch(url, build_index))
+        if shared:
+            self._count("coalesced")
+            record_stage("coalesced_wait", time.perf_counter() - wait_start)
+            if build_index:
+                # The shared call may only have fetched the bank.
+                bank = self.ensure_index(bank)
+        return bank
+
+    def ensure_index(self, bank):
+        """
+        Builds the index of a bank returned by get(url, build_index=False)
+        without contacting the bank server again. Concurrent calls for the
+        same bank content share one build.
+
+        Returns:
+            The bank with its index built.
+
+        Raises:
+            EmbeddingError: If the bank's embeddings cannot be generated.
+        """
+        if bank.index is not None or not bank.questions:
+            return bank
+
+        def build():
+            if bank.index is None:
+                self._build_index(bank)
+                with self._lock:
+                    current = self._banks.get(bank.url) is bank
+                if current:
+                    # Store again so the bank's size includes its index.
+                    self._store(bank)
+            return bank
+
+        wait_start = time.perf_counter()
+        indexed, shared = self._flights.do((bank.url, bank.content_hash), build)
+        if shared:
+            self._count("coalesced")
+            record_stage("coalesced_wait", time.perf_counter() - wait_start)
+        return indexed
+
+    def _fetch(self, url, build_index):
+        cached = self._lookup(url)
+
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+        fetch_start = time.perf_counter()
+        clean_seconds = 0.0
+        with get_session().get(url, timeout=self.fetch_timeout, headers=headers, stream=True) as response:
+            if cached is not None and response.status_code == 304:
+                self._count("not_modified")
+                bank = cached
+            else:
+                response.raise_for_status()
+                hasher = hashlib.sha256()
+
+                def chunks():
+                    for chunk in response.iter_content(chunk_size=HTTP_CHUNK_SIZE):
+                        hasher.update(chunk)
+                        yield chunk
+
+                # Questions are cleaned and packed as they stream in instead of after the
+                # whole body is loaded, so no per-question dict outlives the fetch.
+                records, texts, ids = [], [], []
+                try:
+                    for question in iter_json_array(chunks()):
+                        records.append(RecordColumn.encode(question))
+                        ids.append(question.get("ID"))
+                        clean_start = time.perf_counter()
+                        texts.append(StringColumn.encode(clean_html(question.get("Question"))))
+                        clean_seconds += time.perf_counter() - clean_start
+                except ValueError as e:
+                    raise requests.exceptions.InvalidJSONError(f"Invalid question bank JSON: {e}")
+                content_hash = hasher.hexdigest()
+
+                if cached is not None and cached.content_hash == content_hash:
+                    self._count("unchanged_content")
+                    bank = cached
+                else:
+                    bank = QuestionBank(url, RecordColumn.from_encoded(records), StringColumn.from_encoded(texts),
+                                        content_hash, ids=ids)
+                    self._count("refreshes")
+
+                bank.etag = response.headers.get('ETag') or bank.etag
+                bank.last_modified = response.headers.get('Last-Modified') or bank.last_modified
+
+        record_stage("fetch", time.perf_counter() - fetch_start - clean_seconds)
+        if clean_seconds:
+            record_stage("clean_html", clean_seconds)
+
+        # Embed after the response is closed so the pooled connection is released first.
+        if bank is not cached:
+            if bank.questions and (build_index or (cached is not None and cached.index is not None)):
+                self._build_index(bank, previous=cached)
+        else:
+            self._count("hits")
+            if build_index and bank.index is None and bank.questions:
+                self._build_index(bank)
+
+        bank.checked_at = time.time()
+        self._store(bank)
+        return bank
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, banks=len(self._banks), pinned=len(self._pinned),
+                        bytes=sum(self._sizes.values()), max_bytes=self.max_bytes or 0)
+
+    def memory_report(self):
+        """
+        Returns the memory used by each cached bank, largest first.
+        """
+        with self._lock:
+            banks = list(self._banks.values())
+            pinned = set(self._pinned)
+        report = []
+        for bank in banks:
+            usage = bank.memory_usage()
+            with self._lock:
+                if self._banks.get(bank.url) is bank:
+                    # Lexical indexes are built after the bank is stored.
+                    self._sizes[bank.url] = usage["resident"]
+            report.append({"questions_url": bank.url, "questions": len(bank.texts),
+                           "pinned": bank.url in pinned, **usage})
+        return sorted(report, key=lambda entry: entry["resident"], reverse=True)
+
+
+question_bank_cache = QuestionBankCache(
+    max_banks=int(os.getenv("BANK_CACHE_MAX_BANKS", "512")),
+    fetch_timeout=float(os.getenv("QUESTIONS_FETCH_TIMEOUT", "5")),
+    index_dir=os.getenv("INDEX_STORE_DIR", "cache/indexes") or None,
+    build_lock_timeout=BANK_BUILD_LOCK_TIMEOUT,
+    max_bytes=int(BANK_CACHE_MEMORY_BUDGET_MB * 2 ** 20)
+)
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from ..utils.faiss_utils import EMBEDDING_MODEL
+from .gemini_service import GEMINI_MODEL_NAME
+from .verdict_cache import normalize_question
+
+RESPONSE_CACHE_MEMORY_BUDGET_MB = float(os.getenv("RESPONSE_CACHE_MEMORY_BUDGET_MB", "64"))
+
+# Bytes per entry besides its body: the key string, the entry tuple and the dict slot.
+_ENTRY_OVERHEAD = 256
+
+
+class ResponseCache:
+    """
+    Memoizes successful endpoint responses per (endpoint, bank content hash,
+    normalized request, model versions) with a TTL, an entry bound and a
+    byte bound.
+
+    Bodies are held as compact JSON and decoded on access, so the bytes
+    counted against max_bytes are the bytes held. Each entry carries an
+    ETag derived from its body, so clients can revalidate with
+    If-None-Match. A max_entries of 0 disables the cache.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600, models=(GEMINI_MODEL_NAME, EMBEDDING_MODEL),
+                 max_bytes=64 * 2 ** 20):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.models = list(models)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def make_key(self, endpoint, content_hash, questions=()):
+        """
+        Builds the cache key for a request against one bank version.
+
+        Args:
+            endpoint: The endpoint name.
+            content_hash: The bank's content hash.
+            questions: The new question texts of the request, if any.
+        """
+        payload = json.dumps([endpoint, content_hash, self.models,
+                              [normalize_question(question) for question in questions]])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached (body, etag) pair, or None if unknown or expired.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[2] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return json.loads(entry[0]), entry[1]
+
+    def _remove(self, key):
+        # Caller must hold the lock.
+        data = self._entries.pop(key)[0]
+        self._bytes -= len(data) + _ENTRY_OVERHEAD
+
+    def set(self, key, body):
+        """
+        Stores a response body and returns its ETag. Bodies larger than
+        the whole byte budget are not stored.
+        """
+        data = json.dumps(body, sort_keys=True, default=str, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+        etag = hashlib.sha256(data).hexdigest()[:32]
+        size = len(data) + _ENTRY_OVERHEAD
+        if not self.enabled or size > self.max_bytes:
+            return etag
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (data, etag, time.time())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0
+            }
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    max_bytes=int(RESPONSE_CACHE_MEMORY_BUDGET_MB * 2 ** 20)
+)
@@ -0,0 +1,215 @@
+import logging
+import os
+import re
+
+from ..utils.calibration import NEVER_MATCH, NEVER_REJECT
+from ..utils.metrics import metrics_registry
+
+# Cosine similarity bands: candidates at or above the match threshold are
+# duplicates without asking the LLM, a best score below the no-match
+# threshold answers no, and candidates below the relevance floor are left
+# out of the prompt. Good values depend on the embedding model, so every
+# band is off until values fitted with tools/calibrate_thresholds.py are set.
+SIMILARITY_MATCH_THRESHOLD = float(os.getenv("SIMILARITY_MATCH_THRESHOLD") or NEVER_MATCH)
+SIMILARITY_NO_MATCH_THRESHOLD = float(os.getenv("SIMILARITY_NO_MATCH_THRESHOLD") or NEVER_REJECT)
+SIMILARITY_RELEVANCE_FLOOR = float(os.getenv("SIMILARITY_RELEVANCE_FLOOR") or NEVER_REJECT)
+
+logger = logging.getLogger(__name__)
+
+decisions = metrics_registry.counter(
+    "qsimcheck_check_decisions_total", "How new questions were decided, by decision path.", ["path"]
+)
+
+_BATCH_LINE = re.compile(r"^\W*Q(\d+)\W*:\s*(.*)$", re.IGNORECASE)
+
+
+def triage_candidates(scores, match_threshold=None, no_match_threshold=None, relevance_floor=None):
+    """
+    Decides clear-cut candidates from their similarity scores alone.
+
+    Args:
+        scores: Cosine similarities of the candidates, best first.
+
+    Returns:
+        One entry per candidate: True for a certain match, False for a
+        certain non-match, or None where the LLM has to decide.
+    """
+    match_threshold = SIMILARITY_MATCH_THRESHOLD if match_threshold is None else match_threshold
+    no_match_threshold = SIMILARITY_NO_MATCH_THRESHOLD if no_match_threshold is None else no_match_threshold
+    relevance_floor = SIMILARITY_RELEVANCE_FLOOR if relevance_floor is None else relevance_floor
+
+    scores = [float(score) for score in scores]
+    if not scores or max(scores) < no_match_threshold:
+        return [False] * len(scores)
+    return [True if score >= match_threshold else False if score < relevance_floor else None
+            for score in scores]
+
+
+def decision_path(triaged, verdicts, llm_called, duplicate=None):
+    """
+    Names the path that decided a new question and counts it.
+
+    Args:
+        duplicate: "exact" or "near" when the question was matched by the
+            lexical duplicate check before any embedding.
+
+    Returns:
+        "exact_duplicate" or "near_duplicate" for lexical matches, "llm" if
+        Gemini was asked, "verdict_cache" if cached verdicts settled every
+        ambiguous candidate, otherwise "similarity_match" or
+        "similarity_no_match" when the scores alone decided.
+    """
+    if duplicate:
+        path = f"{duplicate}_duplicate"
+    elif llm_called:
+        path = "llm"
+    elif any(t is None for t in triaged):
+        path = "verdict_cache"
+    elif any(verdicts):
+        path = "similarity_match"
+    else:
+        path = "similarity_no_match"
+    decisions.inc(path=path)
+    return path
+
+
+def build_check_prompt(new_question, candidates):
+    """
+    Builds the prompt asking which candidates are identical to new_question.
+    """
+    match_list = "\n".join(f"{i+1}. {q}" for i, q in enumerate(candidates))
+    return f"""
+                        You are an expert semantic analysis AI. Your task is to compare a "New Question" against a list of "Candidate Questions" and identify which ones are semantically identical.
+                        Definition of Semantically Identical: Two questions are semantically identical if they ask the exact same thing or test the same concept, even if the wording, names, or numbers are different.
+                        *New Question:*
+                        \"\"\"{new_question}\"\"\"
+                        *Candidate Questions:*
+                        {match_list}
+                        Which of the numbered "Candidate Questions" are semantically identical to the "New Question"?
+
+                        Return ONLY the numbers of the matching candidates, separated by commas (e.g., "1, 3").
+                        Do not add any explanation or other text.
+                    """
+
+
+def parse_match_numbers(text, candidate_count):
+    """
+    Parses a comma-separated list of 1-based candidate numbers.
+
+    Returns:
+        The matching 0-based candidate positions, in answer order.
+    """
+    positions = []
+    for num_str in (text or "").split(","):
+        num_str = num_str.strip()
+        if not num_str:
+            continue
+        try:
+            position = int(num_str) - 1
+        except ValueError:
+            logger.warning(f"Error parsing match index: {num_str!r}")
+            continue
+        if 0 <= position < candidate_count and position not in positions:
+            positions.append(position)
+        else:
+            logger.warning(f"Match index out of range: {num_str}")
+    return positions
+
+
+def build_batch_check_prompt(items):
+    """
+    Packs several (new question, candidates) comparisons into one prompt.
+
+    Args:
+        items: A list of (new_question, candidate_texts) pairs.
+    """
+    sections = []
+    for q_num, (new_question, candidates) in enumerate(items, start=1):
+        match_list = "\n".join(f"{i+1}. {q}" for i, q in enumerate(candidates))
+        sections.append(f"""*Q{q_num} New Question:*
+\"\"\"{new_question}\"\"\"
+*Q{q_num} Candidate Questions:*
+{match_list}""")
+    joined_sections = "\n\n".join(sections)
+
+    return f"""
+You are an expert semantic analysis AI. Each numbered "New Question" below has its own list of "Candidate Questions". For every new question, identify which of its candidates are semantically identical to it.
+Definition of Semantically Identical: Two questions are semantically identical if they ask the exact same thing or test the same concept, even if the wording, names, or numbers are different.
+
+{joined_sections}
+
+Return exactly one line per new question in the form "Q<number>: <matching candidate numbers separated by commas>", or "Q<number>: none" if no candidate matches (e.g., "Q1: 1, 3").
+Do not add any explanation or other text.
+"""
+
+
+def parse_batch_matches(text, candidate_counts):
+    """
+    Parses the answer to a packed prompt built by build_batch_check_prompt.
+
+    Args:
+        text: The raw model output.
+        candidate_counts: The number of candidates given for each new question.
+
+    Returns:
+        A list with the matching 0-based candidate positions for each new question.
+    """
+    results = [[] for _ in candidate_counts]
+    for line in (text or "").splitlines():
+        match = _BATCH_LINE.match(line.strip())
+        if not match:
+            continue
+        q_idx = int(match.group(1)) - 1
+        if not 0 <= q_idx < len(candidate_counts):
+            logger.warning(f"Question number out of range in batch answer: {line!r}")
+            continue
+        answer = match.group(2).strip()
+        if answer.lower().strip(" .\"'") == "none":
+            continue
+        results[q_idx] = parse_match_numbers(answer, candidate_counts[q_idx])
+    return results
+
+
+def build_group_prompt(texts):
+    """
+    Builds the prompt asking for all groups of identical questions in texts.
+    """
+    joined_questions = "\n".join([f"{i+1}. {q}" for i, q in enumerate(texts)])
+    return f"""
+You are an expert question-grouping AI. Your task is to review the provided list of academic questions and identify all groups of questions that are *semantically identical*.
+
+**Definition of Semantically Identical:** Questions are semantically identical if they ask the same underlying question, test the same concept or skill, or require the same reasoning or answer approach — regardless of differences in phrasing, specific names, numbers, or wording.
+
+Here is the list of questions:
+{joined_questions}
+
+Return the result as groups of comma-separated numbers (based on their position in the list) representing identical questions.
+
+Example output: 
+Group 1: 1, 4, 7  
+Group 2: 2, 5
+
+Only return groups with more than one question. Do not include any explanation.
+"""
+
+
+def parse_groups(text, question_count):
+    """
+    Parses "Group n: 1, 4, 7" lines from a grouping answer.
+
+    Returns:
+        A list of groups, each a list of 0-based question positions.
+    """
+    groups = []
+    for line in (text or "").splitlines():
+        if ":" not in line:
+            continue
+        _, indices = line.split(":", 1)
+        ids = [int(x.strip()) - 1 for x in indices.strip().split(",") if x.strip().isdigit()]
+        group = []
+        for i in ids:
+            if 0 <= i < question_count and i not in group:
+                group.append(i)
+        if len(group) > 1:
+            groups.append(group)
+    return groups
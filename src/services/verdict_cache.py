@@ -0,0 +1,186 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .gemini_service import GEMINI_MODEL_NAME
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text):
+    """
+    Normalizes a question for cache keys: case-folded with collapsed whitespace.
+    """
+    return _WHITESPACE.sub(" ", (text or "").casefold()).strip()
+
+
+class VerdictCache:
+    """
+    Memoizes LLM "is this pair identical" verdicts with a TTL and size bound,
+    optionally persisted to a JSON file by a background thread every
+    save_interval seconds and at exit.
+    """
+
+    def __init__(self, max_entries=100000, ttl=604800, path=None, save_interval=60, model=GEMINI_MODEL_NAME):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.save_interval = save_interval
+        self.model = model
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._flusher = None
+        self._stop = threading.Event()
+        self._hits = 0
+        self._misses = 0
+
+        if self.path:
+            self._entries.update(self._read_file())
+            self._evict()
+
+    def make_key(self, new_question, candidate):
+        payload = "\x00".join([self.model, normalize_question(new_question), normalize_question(candidate)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _evict(self):
+        # Caller must hold the lock (or own the cache exclusively).
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Returns the cached verdict (True or False), or None if unknown or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def set(self, key, verdict):
+        with self._lock:
+            self._entries[key] = (bool(verdict), time.time())
+            self._entries.move_to_end(key)
+            self._evict()
+            self._dirty = True
+
+    def lookup(self, new_question, candidates):
+        """
+        Returns the cached verdict for each candidate, None where unknown.
+        """
+        return [self.get(self.make_key(new_question, candidate)) for candidate in candidates]
+
+    def record(self, new_question, candidates, matched_positions):
+        """
+        Stores a verdict for every candidate: True for matched_positions, False otherwise.
+        """
+        matched = set(matched_positions)
+        for position, candidate in enumerate(candidates):
+            self.set(self.make_key(new_question, candidate), position in matched)
+
+    def _read_file(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        entries = [(key, (bool(value[0]), float(value[1]))) for key, value in raw.items()]
+        entries.sort(key=lambda item: item[1][1])
+        return OrderedDict((key, value) for key, value in entries if now - value[1] <= self.ttl)
+
+    def save(self):
+        """
+        Writes the cache to disk, merging entries saved by other workers.
+        """
+        if not self.path:
+            return
+        # One save at a time per process; other processes merge through the file.
+        with self._save_lock:
+            on_disk = self._read_file()
+            with self._lock:
+                for key, value in on_disk.items():
+                    current = self._entries.get(key)
+                    if current is None or current[1] < value[1]:
+                        self._entries[key] = value
+                self._evict()
+                snapshot = {key: list(value) for key, value in self._entries.items()}
+                self._dirty = False
+
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"Could not save verdict cache: {e}")
+                self._dirty = True
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def flush(self):
+        if self._dirty:
+            self.save()
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.save_interval):
+            self.flush()
+
+    def start(self):
+        """
+        Starts the thread that saves new verdicts every save_interval seconds.
+        """
+        if not self.path or self.save_interval <= 0:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run_flusher, name="verdict-cache-flush", daemon=True)
+        self._flusher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0
+            }
+
+
+verdict_cache = VerdictCache(
+    max_entries=int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "100000")),
+    ttl=float(os.getenv("VERDICT_CACHE_TTL", "604800")),
+    path=os.getenv("VERDICT_CACHE_PATH", "cache/verdicts.json") or None,
+    save_interval=float(os.getenv("VERDICT_CACHE_SAVE_INTERVAL", "60"))
+)
+atexit.register(verdict_cache.flush)
+
+
+def start_verdict_cache(app):
+    """
+    Starts the verdict cache's periodic save thread.
+    """
+    verdict_cache.start()
+    return verdict_cache
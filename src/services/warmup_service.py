@@ -0,0 +1,250 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.single_flight import file_lock
+from .question_bank import question_bank_cache
+
+BANK_REFRESH_INTERVAL = float(os.getenv("BANK_REFRESH_INTERVAL", "900"))
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "2"))
+BANK_REGISTRY_DIR = os.getenv("BANK_REGISTRY_DIR", "cache/banks")
+BANK_REGISTRY_SYNC_INTERVAL = float(os.getenv("BANK_REGISTRY_SYNC_INTERVAL", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class BankWarmer:
+    """
+    Fetches, cleans, embeds and indexes registered question banks in the
+    background and refreshes them on a schedule, so requests for them are
+    served from a warm index.
+
+    With a registry_dir, each registered bank is also stored there as one
+    JSON file holding its warm-up status. Every worker on the host loads
+    the registry when it starts and every sync_interval seconds, so
+    registrations reach all workers and survive restarts.
+    """
+
+    def __init__(self, bank_cache, workers=2, refresh_interval=900, registry_dir=None, sync_interval=30):
+        self.bank_cache = bank_cache
+        self.workers = workers
+        self.refresh_interval = refresh_interval
+        self.registry_dir = registry_dir
+        self.sync_interval = sync_interval
+        self._banks = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._scheduler = None
+        self._stop = threading.Event()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="warmup")
+            return self._executor
+
+    def _path(self, url):
+        return os.path.join(self.registry_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, entry):
+        path = self._path(entry["questions_url"])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(self.registry_dir, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _stored(self):
+        """
+        Returns the registry's entries by questions_url.
+        """
+        entries = (self._read(path) for path in sorted(glob.glob(os.path.join(self.registry_dir, "*.json"))))
+        return {entry["questions_url"]: entry for entry in entries if entry}
+
+    def _update(self, url, **fields):
+        """
+        Applies fields to url's local entry and, unless it was unregistered
+        meanwhile, to its stored entry.
+        """
+        with self._lock:
+            entry = self._banks.get(url)
+            if entry is not None:
+                entry.update(fields)
+        if not self.registry_dir:
+            return
+        path = self._path(url)
+        try:
+            with file_lock(path + ".lock"):
+                stored = self._read(path)
+                if stored is not None:
+                    stored.update(fields)
+                    self._write(stored)
+        except OSError as e:
+            logger.warning(f"Could not update bank registry for {url}: {e}")
+
+    def _track(self, entry):
+        # Keep the warm bank slightly past one refresh cycle so it never expires between refreshes.
+        with self._lock:
+            self._banks.setdefault(entry["questions_url"], dict(entry))
+        self.bank_cache.pin(entry["questions_url"], self.refresh_interval * 1.5)
+
+    def _untrack(self, url):
+        with self._lock:
+            removed = self._banks.pop(url, None) is not None
+        self.bank_cache.unpin(url)
+        return removed
+
+    def register(self, url):
+        """
+        Registers a bank and schedules it to be warmed immediately.
+        """
+        entry = {
+            "questions_url": url,
+            "registered_at": time.time(),
+            "status": "pending",
+            "last_warmed_at": None,
+            "last_error": None,
+            "questions": None
+        }
+        if self.registry_dir:
+            path = self._path(url)
+            with file_lock(path + ".lock"):
+                stored = self._read(path)
+                if stored is None:
+                    self._write(entry)
+                else:
+                    entry = stored
+        self._track(entry)
+        self.warm(url)
+        return self.status(url)
+
+    def unregister(self, url):
+        removed = False
+        if self.registry_dir:
+            path = self._path(url)
+            with file_lock(path + ".lock"):
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed = True
+        return self._untrack(url) or removed
+
+    def status(self, url=None):
+        if self.registry_dir:
+            entries = self._stored()
+        else:
+            with self._lock:
+                entries = {key: dict(entry) for key, entry in self._banks.items()}
+        if url is not None:
+            return entries.get(url)
+        return list(entries.values())
+
+    def sync(self):
+        """
+        Starts tracking the banks other workers registered and drops those
+        they unregistered.
+        """
+        if not self.registry_dir:
+            return
+        stored = self._stored()
+        with self._lock:
+            local = set(self._banks)
+        for url in local - set(stored):
+            self._untrack(url)
+            logger.info(f"Question bank {url} was unregistered")
+        for url in set(stored) - local:
+            self._track(stored[url])
+            self.warm(url)
+
+    def warm(self, url):
+        """
+        Schedules a background refresh of url unless one is already running.
+        """
+        with self._lock:
+            if url not in self._banks or url in self._in_flight:
+                return
+            self._in_flight.add(url)
+        self._get_executor().submit(self._warm, url)
+
+    def _warm(self, url):
+        start = time.time()
+        try:
+            bank = self.bank_cache.get(url, refresh=True)
+            self._update(url, status="warm", last_warmed_at=time.time(),
+                         last_error=None, questions=len(bank.questions))
+            logger.info(f"Warmed question bank {url} ({len(bank.questions)} questions) "
+                        f"in {time.time() - start:.2f}s")
+        except Exception as e:
+            self._update(url, status="error", last_error=str(e))
+            logger.warning(f"Failed to warm question bank {url}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(url)
+
+    def _run_schedule(self):
+        interval = min(self.refresh_interval, self.sync_interval) if self.registry_dir else self.refresh_interval
+        last_refresh = time.monotonic()
+        while not self._stop.wait(interval):
+            try:
+                self.sync()
+            except OSError as e:
+                logger.warning(f"Could not load the bank registry: {e}")
+            if time.monotonic() - last_refresh < self.refresh_interval:
+                continue
+            last_refresh = time.monotonic()
+            with self._lock:
+                urls = list(self._banks)
+            for url in urls:
+                self.warm(url)
+
+    def start(self, urls=()):
+        """
+        Loads the registry, registers urls and starts the periodic refresh thread.
+        """
+        try:
+            self.sync()
+        except OSError as e:
+            logger.warning(f"Could not load the bank registry: {e}")
+        for url in urls:
+            self.register(url)
+        with self._lock:
+            if self._scheduler is not None:
+                return
+            self._scheduler = threading.Thread(target=self._run_schedule, name="warmup-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+bank_warmer = BankWarmer(
+    question_bank_cache,
+    workers=WARMUP_WORKERS,
+    refresh_interval=BANK_REFRESH_INTERVAL,
+    registry_dir=BANK_REGISTRY_DIR or None,
+    sync_interval=BANK_REGISTRY_SYNC_INTERVAL
+)
+
+
+def start_bank_warmer(app):
+    """
+    Starts background warm-up for the stored bank registry and the banks
+    listed in PREWARM_BANKS.
+    """
+    urls = [url.strip() for url in os.getenv("PREWARM_BANKS", "").split(",") if url.strip()]
+    bank_warmer.start(urls)
+    if urls:
+        app.logger.info(f"Registered {len(urls)} question banks for warm-up")
+    return bank_warmer
@@ -1,8 +1,20 @@
 from .logger_config import setup_logging, log_request, log_security_event
-from .faiss_utils import build_vector_index, embed_texts
+from .faiss_utils import build_vector_index, embed_texts, EmbeddingError
+from .embedding_cache import embedding_cache
 from .text_utils import clean_html
+from .clustering import UnionFind, candidate_clusters
+from .http_client import get_session
+from .json_stream import iter_json_array
+from .ann_index import IVFIndex, index_for_size
+from .metrics import metrics_registry, stage, record_stage, server_timing_header
+from .single_flight import SingleFlight, file_lock
+from .dedup import LexicalIndex, canonical_text
 
 __all__ = [
     'setup_logging', 'log_request', 'log_security_event',
-    'build_vector_index', 'embed_texts', 'clean_html'
+    'build_vector_index', 'embed_texts', 'EmbeddingError', 'embedding_cache', 'clean_html',
+    'UnionFind', 'candidate_clusters', 'get_session', 'iter_json_array',
+    'IVFIndex', 'index_for_size',
+    'metrics_registry', 'stage', 'record_stage', 'server_timing_header',
+    'SingleFlight', 'file_lock', 'LexicalIndex', 'canonical_text'
 ]
\ No newline at end of file
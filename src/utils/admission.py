@@ -0,0 +1,157 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .metrics import metrics_registry, record_stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: limits are per process only.
+    fcntl = None
+
+ADMISSION_LOCK_DIR = os.getenv("ADMISSION_LOCK_DIR", "cache/admission")
+ADMISSION_POLL_INTERVAL = 0.02
+
+admissions = metrics_registry.counter(
+    "qsimcheck_admission_total", "Admission decisions per gate, by outcome.", ["gate", "outcome"]
+)
+
+
+class Overloaded(Exception):
+    """Raised when a gate sheds work instead of queueing it."""
+
+    def __init__(self, gate, reason, retry_after):
+        super().__init__(f"{gate} is saturated ({reason})")
+        self.gate = gate
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Bounds how many callers may run a section at once, with a bounded wait
+    queue and a queue deadline.
+
+    With a lock_dir, the limit holds for all processes on the host: each
+    running caller holds an advisory lock on one of limit slot files.
+    Without one, the limit applies per process. The queue bound is per
+    process in both cases.
+    """
+
+    def __init__(self, name, limit, queue_size=0, queue_timeout=0.0, retry_after=None, lock_dir=None):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after or max(1, math.ceil(queue_timeout))
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._held = set()
+        self._slots = None
+
+    @property
+    def enabled(self):
+        return self.limit > 0
+
+    def _slot_files(self):
+        # Caller must hold the condition's lock.
+        if self._slots is None:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            self._slots = [open(os.path.join(self.lock_dir, f"{self.name}.{slot}.lock"), "a+")
+                           for slot in range(self.limit)]
+        return self._slots
+
+    def _try_acquire(self):
+        # Caller must hold the condition's lock. Returns the slot taken, or None.
+        if self._active >= self.limit:
+            return None
+        if not self.lock_dir:
+            self._active += 1
+            return -1
+        for slot, f in enumerate(self._slot_files()):
+            if slot in self._held:
+                continue
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            self._held.add(slot)
+            self._active += 1
+            return slot
+        return None
+
+    def _release(self, slot):
+        with self._cond:
+            if slot >= 0:
+                fcntl.flock(self._slots[slot].fileno(), fcntl.LOCK_UN)
+                self._held.discard(slot)
+            self._active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def admit(self):
+        """
+        Runs the block once a slot is free.
+
+        Raises:
+            Overloaded: If the wait queue is full or no slot freed up within
+                queue_timeout seconds.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = time.monotonic()
+        with self._cond:
+            slot = self._try_acquire()
+            if slot is None:
+                if self._waiting >= self.queue_size:
+                    admissions.inc(gate=self.name, outcome="rejected")
+                    raise Overloaded(self.name, "queue full", self.retry_after)
+                self._waiting += 1
+                try:
+                    deadline = start + self.queue_timeout
+                    while slot is None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            admissions.inc(gate=self.name, outcome="timeout")
+                            raise Overloaded(self.name, "queue timeout", self.retry_after)
+                        # Local releases notify; other processes' releases are polled.
+                        self._cond.wait(min(remaining, ADMISSION_POLL_INTERVAL) if self.lock_dir else remaining)
+                        slot = self._try_acquire()
+                finally:
+                    self._waiting -= 1
+                admissions.inc(gate=self.name, outcome="queued")
+            else:
+                admissions.inc(gate=self.name, outcome="admitted")
+        record_stage(f"{self.name}_queue", time.monotonic() - start)
+
+        try:
+            yield
+        finally:
+            self._release(slot)
+
+    def stats(self):
+        with self._cond:
+            return {"limit": self.limit, "active": self._active, "waiting": self._waiting,
+                    "queue_size": self.queue_size}
+
+
+def _gate(name, prefix, limit, queue_size, queue_timeout):
+    return AdmissionGate(
+        name,
+        limit=int(os.getenv(f"{prefix}_MAX_CONCURRENT", str(limit))),
+        queue_size=int(os.getenv(f"{prefix}_QUEUE_SIZE", str(queue_size))),
+        queue_timeout=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", str(queue_timeout))),
+        lock_dir=ADMISSION_LOCK_DIR or None
+    )
+
+
+check_gate = _gate("check", "CHECK", 8, 16, 5)
+batch_gate = _gate("batch", "BATCH", 2, 2, 2)
+group_gate = _gate("group", "GROUP", 1, 1, 1)
+gemini_gate = _gate("gemini", "GEMINI", 8, 64, 30)
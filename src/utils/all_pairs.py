@@ -0,0 +1,226 @@
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .faiss_utils import top_k
+
+ALL_PAIRS_MEMORY_BUDGET_MB = float(os.getenv("ALL_PAIRS_MEMORY_BUDGET_MB", "512"))
+ALL_PAIRS_WORKERS = int(os.getenv("ALL_PAIRS_WORKERS", "0"))
+ALL_PAIRS_PARALLEL_MIN_ROWS = int(os.getenv("ALL_PAIRS_PARALLEL_MIN_ROWS", "20000"))
+
+MIN_TILE = 64
+MAX_TILE = 8192
+# Bytes per element of a (t, t) tile in the worst case: float32 scores, the
+# threshold mask and its inverse, and the negated copy and int64 positions
+# argpartition needs when a tile is too dense for the sparse merge.
+_TILE_BYTES_PER_CELL = 4 + 1 + 1 + 4 + 8
+# Tiles with more hits than this many per row are reduced with argpartition.
+_SPARSE_HITS_PER_ROW = 4
+_BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+_worker_memory = None
+_worker_embeddings = None
+
+
+def tile_size_for_budget(n, dim, k, workers=1, memory_budget=None):
+    """
+    Returns the largest tile edge whose working set fits the memory budget.
+
+    The budget covers the shared (n, dim) float32 rows, the (n, k)
+    neighbour graph and, per worker, one (t, t) score tile with its mask
+    and partition scratch, the tile's rows and its top-k merge buffers.
+
+    Raises:
+        ValueError: If the rows and the graph alone exceed the budget.
+    """
+    memory_budget = memory_budget or ALL_PAIRS_MEMORY_BUDGET_MB * 2 ** 20
+    fixed = n * dim * 4 + n * k * 12
+    per_worker = (memory_budget - fixed) / max(1, workers)
+    a = _TILE_BYTES_PER_CELL
+    # Per tile row: its embedding and the sparse merge's (row, column,
+    # score) arrays, which are bounded by the hits allowed per row.
+    b = dim * 4 + k * (_SPARSE_HITS_PER_ROW + 1) * 64
+    if per_worker < a * MIN_TILE ** 2 + b * MIN_TILE:
+        raise ValueError(f"A memory budget of {memory_budget / 2 ** 20:.0f} MB is too small for "
+                         f"{n} x {dim} embeddings with {workers} workers")
+    tile = int((-b + math.sqrt(b * b + 4 * a * per_worker)) / (2 * a))
+    return max(MIN_TILE, min(MAX_TILE, tile, n))
+
+
+def row_tile_neighbours(embeddings, start, stop, tile, threshold, k):
+    """
+    Finds the top-k neighbours scoring at least threshold for rows
+    start:stop, scanning the columns in tiles of tile rows.
+
+    Returns:
+        A tuple (scores, indices) of (stop - start, k) arrays, best first.
+        Slots without a neighbour have score -inf and index -1.
+    """
+    rows = np.asarray(embeddings[start:stop], dtype=np.float32)
+    best_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+    best_indices = np.full((len(rows), k), -1, dtype=np.int64)
+    for col_start in range(0, len(embeddings), tile):
+        col_stop = min(len(embeddings), col_start + tile)
+        scores = rows @ np.asarray(embeddings[col_start:col_stop], dtype=np.float32).T
+        # A row is not its own neighbour.
+        low, high = max(start, col_start), min(stop, col_stop)
+        if low < high:
+            diagonal = np.arange(low, high)
+            scores[diagonal - start, diagonal - col_start] = -np.inf
+        above = scores >= threshold
+        hits = np.count_nonzero(above)
+        if not hits:
+            continue
+        if hits <= len(rows) * k * _SPARSE_HITS_PER_ROW:
+            hit_rows, hit_cols = np.nonzero(above)
+            _merge_hits(best_scores, best_indices, hit_rows, hit_cols + col_start, scores[hit_rows, hit_cols])
+            continue
+        scores[~above] = -np.inf
+
+        tile_scores, tile_indices = top_k(scores, k)
+        merged_scores = np.concatenate([best_scores, tile_scores], axis=1)
+        merged_indices = np.concatenate([best_indices, tile_indices + col_start], axis=1)
+        best_scores, positions = top_k(merged_scores, k)
+        best_indices = np.take_along_axis(merged_indices, positions, axis=1)
+    best_indices[np.isneginf(best_scores)] = -1
+    return best_scores, best_indices
+
+
+def _merge_hits(best_scores, best_indices, hit_rows, hit_cols, hit_scores):
+    """
+    Merges sparse (row, column, score) hits into the running top-k in place.
+    """
+    k = best_scores.shape[1]
+    kept_rows, kept_slots = np.nonzero(best_indices >= 0)
+    rows = np.concatenate([kept_rows, hit_rows])
+    cols = np.concatenate([best_indices[kept_rows, kept_slots], hit_cols])
+    scores = np.concatenate([best_scores[kept_rows, kept_slots], hit_scores])
+    order = np.lexsort((-scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < k
+    # A row's hit count only grows, so every previously filled slot is rewritten.
+    best_scores[rows[keep], rank[keep]] = scores[keep]
+    best_indices[rows[keep], rank[keep]] = cols[keep]
+
+
+def _init_worker(name, shape):
+    global _worker_memory, _worker_embeddings
+    # Workers share the parent's resource tracker, so attaching does not
+    # hand ownership of the block to them; the parent unlinks it.
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    _worker_embeddings = np.ndarray(shape, dtype=np.float32, buffer=_worker_memory.buf)
+
+
+def _worker_row_tile(start, stop, tile, threshold, k):
+    scores, indices = row_tile_neighbours(_worker_embeddings, start, stop, tile, threshold, k)
+    return start, scores, indices
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+@contextmanager
+def _single_threaded_blas():
+    # Worker processes read these when they start; one BLAS thread per process
+    # keeps workers from oversubscribing the CPUs.
+    saved = {name: os.environ.get(name) for name in _BLAS_THREAD_VARS}
+    os.environ.update({name: "1" for name in _BLAS_THREAD_VARS})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def all_pairs_neighbours(embeddings, threshold, k=10, memory_budget=None, workers=None):
+    """
+    Computes the thresholded top-k neighbour graph of normalized rows
+    without materializing the N x N similarity matrix.
+
+    The matrix is processed in square tiles sized to the memory budget.
+    Large inputs are split by row tile across a process pool that reads
+    the rows from one shared-memory block.
+
+    Args:
+        embeddings: A (N, d) array of normalized rows (may be memory-mapped).
+        threshold: Minimum cosine similarity of a neighbour.
+        k: Neighbours kept per row.
+        memory_budget: Peak bytes for rows, graph and tiles
+            (ALL_PAIRS_MEMORY_BUDGET_MB by default).
+        workers: Worker processes (ALL_PAIRS_WORKERS, or one per CPU).
+            Inputs below ALL_PAIRS_PARALLEL_MIN_ROWS rows run in-process.
+
+    Returns:
+        A tuple (scores, indices) of (N, k) arrays, best first, with -inf
+        and -1 in unused slots.
+    """
+    n, dim = embeddings.shape
+    k = max(1, min(k, n - 1)) if n > 1 else 1
+    workers = workers or ALL_PAIRS_WORKERS or os.cpu_count() or 1
+    if n < ALL_PAIRS_PARALLEL_MIN_ROWS:
+        workers = 1
+    tile = tile_size_for_budget(n, dim, k, workers, memory_budget)
+    # Leave at least one row tile per worker.
+    tile = max(MIN_TILE, min(tile, math.ceil(n / workers)))
+
+    if workers == 1:
+        return row_tile_neighbours(embeddings, 0, n, tile, threshold, k) if n <= tile else \
+            _merge_row_tiles(n, k, (
+                (start, *row_tile_neighbours(embeddings, start, min(n, start + tile), tile, threshold, k))
+                for start in range(0, n, tile)))
+
+    block = shared_memory.SharedMemory(create=True, size=n * dim * 4)
+    try:
+        shared = np.ndarray((n, dim), dtype=np.float32, buffer=block.buf)
+        for start in range(0, n, tile):
+            shared[start:start + tile] = embeddings[start:start + tile]
+        with _single_threaded_blas(), ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(),
+                                                          initializer=_init_worker,
+                                                          initargs=(block.name, (n, dim))) as pool:
+            starts = list(range(0, n, tile))
+            results = pool.map(_worker_row_tile, starts, [min(n, s + tile) for s in starts],
+                               [tile] * len(starts), [threshold] * len(starts), [k] * len(starts))
+            graph = _merge_row_tiles(n, k, results)
+        del shared
+        return graph
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _merge_row_tiles(n, k, results):
+    scores = np.full((n, k), -np.inf, dtype=np.float32)
+    indices = np.full((n, k), -1, dtype=np.int64)
+    for start, tile_scores, tile_indices in results:
+        scores[start:start + len(tile_scores)] = tile_scores
+        indices[start:start + len(tile_indices)] = tile_indices
+    return scores, indices
+
+
+def neighbour_pairs(scores, indices):
+    """
+    Turns a neighbour graph into unique undirected edges.
+
+    Returns:
+        A tuple (i, j, score) of 1-D arrays with i < j.
+    """
+    rows = np.broadcast_to(np.arange(len(indices))[:, None], indices.shape)
+    mask = indices >= 0
+    i, j, s = rows[mask], indices[mask], scores[mask]
+    low, high = np.minimum(i, j), np.maximum(i, j)
+    order = np.lexsort((-s, high, low))
+    low, high, s = low[order], high[order], s[order]
+    first = np.ones(len(low), dtype=bool)
+    first[1:] = (low[1:] != low[:-1]) | (high[1:] != high[:-1])
+    return low[first], high[first], s[first]
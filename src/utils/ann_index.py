@@ -0,0 +1,139 @@
+import math
+import os
+
+import numpy as np
+
+from .faiss_utils import top_k
+
+ANN_MIN_SIZE = int(os.getenv("ANN_MIN_SIZE", "50000"))
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+
+
+def spherical_kmeans(embeddings, n_clusters, iterations=10, sample_size=None, seed=0, chunk_size=8192):
+    """
+    Clusters unit vectors by cosine similarity.
+
+    Args:
+        embeddings: A (N, d) array of normalized rows.
+        n_clusters: The number of centroids.
+        iterations: Lloyd iterations to run.
+        sample_size: Train on at most this many random rows (all rows if None).
+
+    Returns:
+        A (n_clusters, d) float32 array of normalized centroids.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(embeddings)
+    if sample_size and n > sample_size:
+        sample = np.asarray(embeddings[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32)
+    else:
+        sample = np.asarray(embeddings, dtype=np.float32)
+    n_clusters = min(n_clusters, len(sample))
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = assign_to_centroids(sample, centroids, chunk_size)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        order = np.argsort(assignments, kind="stable")
+        occupied = counts > 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[occupied]
+        sums = np.zeros_like(centroids)
+        sums[occupied] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = ~occupied
+        if empty.any():
+            # Re-seed empty clusters with random training rows.
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-8)
+    return centroids.astype(np.float32)
+
+
+def assign_to_centroids(embeddings, centroids, chunk_size=8192):
+    """
+    Returns the index of the most similar centroid for every row.
+    """
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), chunk_size):
+        chunk = np.asarray(embeddings[start:start + chunk_size], dtype=np.float32)
+        assignments[start:start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index.
+
+    Rows are partitioned by spherical k-means into nlist lists, and a query
+    is only scored against the rows of its nprobe closest lists. It has the
+    same search(query, k) interface as SimpleVectorIndex and reads the
+    normalized rows in place, so a memory-mapped matrix stays shared.
+    """
+
+    def __init__(self, normalized_embeddings, nlist=None, nprobe=16, iterations=10, seed=0):
+        self.normalized_embeddings = normalized_embeddings
+        n = len(normalized_embeddings)
+        self.nlist = max(1, min(nlist or int(4 * math.sqrt(n)), n))
+        self.nprobe = nprobe
+        self.centroids = spherical_kmeans(normalized_embeddings, self.nlist, iterations=iterations,
+                                          sample_size=max(self.nlist * 20, 5000), seed=seed)
+        self.nlist = len(self.centroids)
+
+        assignments = assign_to_centroids(normalized_embeddings, self.centroids)
+        # Rows grouped by list: list l owns list_rows[list_offsets[l]:list_offsets[l + 1]].
+        self.list_rows = np.argsort(assignments, kind="stable").astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.nlist))])
+
+    @classmethod
+    def from_embeddings(cls, embeddings, **kwargs):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norm = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8
+        return cls(np.ascontiguousarray(embeddings / norm), **kwargs)
+
+    def __len__(self):
+        return len(self.normalized_embeddings)
+
+    def _candidates(self, list_order, k, nprobe):
+        # Probe at least nprobe lists, and more if they hold fewer than k rows.
+        parts = []
+        count = 0
+        for probed, list_id in enumerate(list_order):
+            if probed >= nprobe and count >= k:
+                break
+            rows = self.list_rows[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+            parts.append(rows)
+            count += len(rows)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def search(self, query_embedding, k=5, nprobe=None):
+        """
+        Searches for the approximate k-nearest neighbors of one or more queries.
+
+        Returns:
+            A tuple (scores, indices) of (Q, k) arrays, best match first.
+        """
+        nprobe = nprobe or self.nprobe
+        queries = np.atleast_2d(np.asarray(query_embedding, dtype=np.float32))
+        queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-8)
+        k = min(k, len(self))
+
+        centroid_order = np.argsort(-(queries @ self.centroids.T), axis=1)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        for q, query in enumerate(queries):
+            rows = self._candidates(centroid_order[q], k, nprobe)
+            row_scores = np.asarray(self.normalized_embeddings[rows]) @ query
+            top_scores, top_positions = top_k(row_scores[None, :], k)
+            scores[q] = top_scores[0]
+            indices[q] = rows[top_positions[0]]
+        return scores, indices
+
+
+def index_for_size(index, min_size=None):
+    """
+    Wraps a SimpleVectorIndex in an IVFIndex over the same rows when the
+    bank has at least min_size questions; smaller banks stay exact.
+    """
+    min_size = ANN_MIN_SIZE if min_size is None else min_size
+    if min_size <= 0 or len(index) < min_size:
+        return index
+    return IVFIndex(index.normalized_embeddings, nlist=ANN_NLIST or None, nprobe=ANN_NPROBE)
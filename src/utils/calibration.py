@@ -0,0 +1,82 @@
+import numpy as np
+
+# Cosine similarities lie in [-1, 1], so these values disable a threshold.
+NEVER_MATCH = 1.01
+NEVER_REJECT = -1.0
+
+
+def fit_thresholds(scores, labels, target_precision=0.99, min_support=20):
+    """
+    Fits the similarity bands that can be decided without the LLM.
+
+    The match threshold is the lowest score at which the pairs scoring at
+    least that much are matches with at least target_precision; the
+    no-match threshold is the highest score below which pairs are
+    non-matches with at least target_precision.
+
+    Args:
+        scores: Cosine similarity of each labelled (question, candidate) pair.
+        labels: True where the pair is a duplicate.
+        target_precision: Required precision of each automatic decision.
+        min_support: Minimum number of pairs an automatic band must cover.
+
+    Returns:
+        A tuple (match_threshold, no_match_threshold). A band that cannot
+        reach the target is disabled (NEVER_MATCH / NEVER_REJECT).
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    order = np.argsort(-scores, kind="stable")
+    scores, labels = scores[order], labels[order]
+    n = len(scores)
+
+    match_threshold = NEVER_MATCH
+    matches_above = np.cumsum(labels)
+    for i in range(n - 1, -1, -1):
+        # Only cut between distinct scores so ties fall on one side.
+        if i + 1 < n and scores[i] == scores[i + 1]:
+            continue
+        count = i + 1
+        if count >= min_support and matches_above[i] / count >= target_precision:
+            match_threshold = float(scores[i])
+            break
+
+    no_match_threshold = NEVER_REJECT
+    non_matches_below = np.cumsum(~labels[::-1])[::-1]
+    for i in range(n):
+        if i > 0 and scores[i] == scores[i - 1]:
+            continue
+        count = n - i
+        if count >= min_support and non_matches_below[i] / count >= target_precision:
+            # Scores strictly below scores[i - 1] (the next higher one) are rejected.
+            no_match_threshold = float(scores[i - 1]) if i > 0 else NEVER_MATCH
+            break
+
+    if no_match_threshold > match_threshold:
+        no_match_threshold = match_threshold
+    return match_threshold, no_match_threshold
+
+
+def evaluate_thresholds(scores, labels, match_threshold, no_match_threshold):
+    """
+    Reports how a pair of thresholds would have decided a labelled set.
+
+    Returns:
+        A dict with the share of pairs decided without the LLM and the
+        precision of the automatic match and no-match decisions.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    auto_match = scores >= match_threshold
+    auto_reject = (scores < no_match_threshold) & ~auto_match
+    decided = auto_match | auto_reject
+    return {
+        "pairs": int(len(scores)),
+        "matches": int(labels.sum()),
+        "auto_match": int(auto_match.sum()),
+        "auto_match_precision": float(labels[auto_match].mean()) if auto_match.any() else None,
+        "auto_reject": int(auto_reject.sum()),
+        "auto_reject_precision": float((~labels[auto_reject]).mean()) if auto_reject.any() else None,
+        "llm": int((~decided).sum()),
+        "decided_without_llm": float(decided.mean()) if len(scores) else 0.0,
+    }
@@ -0,0 +1,79 @@
+import numpy as np
+
+from .all_pairs import all_pairs_neighbours, neighbour_pairs
+from .ann_index import IVFIndex
+
+
+class UnionFind:
+    """
+    Disjoint-set forest with path halving and union by size.
+    """
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+    def components(self, min_size=1):
+        """
+        Returns the components as lists of items, in order of their first item.
+        """
+        groups = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self.find(item), []).append(item)
+        return [members for members in groups.values() if len(members) >= min_size]
+
+
+def similarity_pairs(index, threshold, top_k=10, chunk_size=1024):
+    """
+    Finds pairs of indexed rows whose cosine similarity is at least threshold.
+
+    Each row is only linked to its top_k nearest neighbours. Exact indexes
+    are scanned tile by tile within ALL_PAIRS_MEMORY_BUDGET_MB; approximate
+    ones are searched in chunks of chunk_size rows.
+
+    Returns:
+        A list of (i, j, similarity) tuples with i < j.
+    """
+    embeddings = index.normalized_embeddings
+    if not isinstance(index, IVFIndex):
+        rows, neighbours, scores = neighbour_pairs(*all_pairs_neighbours(embeddings, threshold, k=top_k))
+        return list(zip(rows.tolist(), neighbours.tolist(), scores.tolist()))
+
+    pairs = {}
+    for start in range(0, len(embeddings), chunk_size):
+        scores, neighbours = index.search(embeddings[start:start + chunk_size], k=top_k + 1)
+        rows = np.arange(start, start + len(scores))[:, None]
+        mask = (scores >= threshold) & (neighbours != rows)
+        for row, neighbour, score in zip(np.broadcast_to(rows, mask.shape)[mask],
+                                         neighbours[mask], scores[mask]):
+            pair = (int(min(row, neighbour)), int(max(row, neighbour)))
+            pairs[pair] = max(pairs.get(pair, -1.0), float(score))
+    return [(i, j, score) for (i, j), score in pairs.items()]
+
+
+def candidate_clusters(index, threshold, top_k=10):
+    """
+    Groups indexed rows into candidate clusters: the connected components
+    of the thresholded top-k neighbour graph with more than one member.
+    """
+    union_find = UnionFind(len(index))
+    for i, j, _ in similarity_pairs(index, threshold, top_k=top_k):
+        union_find.union(i, j)
+    return union_find.components(min_size=2)
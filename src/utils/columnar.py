@@ -0,0 +1,129 @@
+import json
+import mmap
+import sys
+
+import numpy as np
+
+
+class StringColumn:
+    """
+    An immutable sequence of strings stored as one UTF-8 buffer with int64
+    offsets, instead of one Python object per string.
+    """
+
+    __slots__ = ("_buffer", "_offsets")
+
+    def __init__(self, values=()):
+        buffer, offsets = _pack([self.encode(value) for value in values])
+        self._buffer = buffer
+        self._offsets = offsets
+
+    @classmethod
+    def from_encoded(cls, encoded):
+        """
+        Builds a column from values already passed through encode().
+        """
+        column = cls.__new__(cls)
+        column._buffer, column._offsets = _pack(encoded)
+        return column
+
+    @staticmethod
+    def encode(value):
+        return value.encode("utf-8", "surrogatepass")
+
+    @staticmethod
+    def decode(data):
+        return data.decode("utf-8", "surrogatepass")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        row = int(row)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("column index out of range")
+        return self.decode(self._buffer[int(self._offsets[row]):int(self._offsets[row + 1])])
+
+    def __iter__(self):
+        buffer, offsets = self._buffer, self._offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield self.decode(buffer[start:end])
+
+    @property
+    def nbytes(self):
+        return len(self._buffer) + self._offsets.nbytes
+
+
+class RecordColumn(StringColumn):
+    """
+    JSON records stored as compact JSON in a StringColumn. A record is only
+    decoded when it is accessed, and each access returns a new copy.
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def encode(value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8", "surrogatepass")
+
+    @staticmethod
+    def decode(data):
+        return json.loads(data.decode("utf-8", "surrogatepass"))
+
+
+class IdColumn:
+    """
+    Question IDs as an int64 array when they are all integers, a
+    StringColumn when they are all strings, and a tuple otherwise.
+    """
+
+    __slots__ = ("_values",)
+
+    def __init__(self, ids):
+        ids = list(ids)
+        values = tuple(ids)
+        if all(type(value) is int for value in ids):
+            try:
+                values = np.array(ids, dtype=np.int64)
+            except OverflowError:
+                pass
+        elif all(type(value) is str for value in ids):
+            values = StringColumn(ids)
+        self._values = values
+
+    def __len__(self):
+        return len(self._values)
+
+    def tolist(self):
+        if isinstance(self._values, np.ndarray):
+            return self._values.tolist()
+        return list(self._values)
+
+    @property
+    def nbytes(self):
+        if isinstance(self._values, tuple):
+            return sys.getsizeof(self._values) + sum(sys.getsizeof(value) for value in self._values)
+        return self._values.nbytes
+
+
+def _pack(encoded):
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum(np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded)),
+                  out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+def is_mapped(array):
+    """
+    Returns whether a numpy array's memory belongs to a memory-mapped file.
+    """
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, "base", None)
+    return False
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from .clustering import UnionFind
+
+LEXICAL_DEDUP = os.getenv("LEXICAL_DEDUP", "true").lower() == "true"
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", "128"))
+MINHASH_BANDS = int(os.getenv("MINHASH_BANDS", "16"))
+SHINGLE_SIZE = int(os.getenv("SHINGLE_SIZE", "2"))
+
+# Bumped whenever canonical_text changes, so state derived from it is rebuilt.
+CANONICAL_FORM = 2
+
+# Sentence punctuation and quotes; a period, comma or colon between two
+# digits is part of a number and is kept.
+_PUNCTUATION = re.compile(r"[.,:](?!\d)|(?<!\d)[.,:]|[?!;\"'`\u2018\u2019\u201c\u201d]")
+_BLANK = re.compile(r"_+")
+# Any other symbol; the periods, commas and colons left are inside numbers.
+_SYMBOL = re.compile(r"([^\w\s.,:])")
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def canonical_text(text):
+    """
+    Reduces cleaned question text to the form used for exact-duplicate
+    detection: case-folded, sentence punctuation dropped and whitespace
+    collapsed. Digits are kept, and symbols such as + - * / = < > ^ % and
+    brackets become tokens of their own, so "2+2" matches "2 + 2" but not
+    "2*2" or "7+9".
+    """
+    text = _PUNCTUATION.sub(" ", _BLANK.sub("_", (text or "").casefold()))
+    return " ".join(_SYMBOL.sub(r" \1 ", text).split())
+
+
+def canonical_hash(text):
+    return hashlib.blake2b(canonical_text(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def shingles(canonical, size=SHINGLE_SIZE):
+    """
+    Returns the set of word n-grams of canonical text (the whole text when
+    it has fewer than size words).
+    """
+    words = canonical.split()
+    if len(words) <= size:
+        return frozenset([canonical]) if canonical else frozenset()
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+class MinHasher:
+    """
+    MinHash signatures over string shingles using universal hashing.
+    """
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        if not shingle_set:
+            return np.full(self.num_perm, _MERSENNE_PRIME, dtype=np.uint32)
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        # a < 2^31 and hash < 2^32, so the products fit in 64 bits.
+        permuted = (hashes[:, None] * self.a[None, :] + self.b[None, :]) % _MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class LexicalIndex:
+    """
+    Finds exact duplicates (same canonical text) and near duplicates
+    (word-shingle Jaccard similarity of at least threshold) in a list of
+    cleaned texts without any API call.
+
+    Exact duplicates are found by canonical hash. Near-duplicate candidates
+    come from MinHash LSH banding over one representative per canonical
+    text and are confirmed with the exact Jaccard similarity. The LSH tables
+    are built on first use.
+    """
+
+    def __init__(self, texts, threshold=NEAR_DUPLICATE_THRESHOLD, num_perm=MINHASH_PERMUTATIONS, bands=MINHASH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = max(1, num_perm // bands)
+        self._hasher = MinHasher(self.rows_per_band * bands)
+        self._lock = threading.Lock()
+        self._buckets = None
+
+        self.canonical = [canonical_text(text) for text in texts]
+        self.hashes = [hashlib.blake2b(c.encode("utf-8"), digest_size=16).hexdigest() for c in self.canonical]
+        self.by_hash = {}
+        for row, (canonical, digest) in enumerate(zip(self.canonical, self.hashes)):
+            if canonical:
+                self.by_hash.setdefault(digest, []).append(row)
+        # One representative row per distinct non-empty canonical text.
+        self.representatives = [rows[0] for rows in self.by_hash.values()]
+
+    def __len__(self):
+        return len(self.canonical)
+
+    def _band_keys(self, signature):
+        r = self.rows_per_band
+        return [signature[band * r:(band + 1) * r].tobytes() for band in range(self.bands)]
+
+    def _ensure_buckets(self):
+        with self._lock:
+            if self._buckets is not None:
+                return
+            self._shingles = {}
+            buckets = [{} for _ in range(self.bands)]
+            for row in self.representatives:
+                shingle_set = shingles(self.canonical[row])
+                self._shingles[row] = shingle_set
+                for band, key in enumerate(self._band_keys(self._hasher.signature(shingle_set))):
+                    buckets[band].setdefault(key, []).append(row)
+            self._buckets = buckets
+
+    def exact_duplicates_of(self, text):
+        """
+        Returns the rows whose canonical text equals that of text.
+        """
+        canonical = canonical_text(text)
+        if not canonical:
+            return []
+        return list(self.by_hash.get(hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest(), []))
+
+    def near_duplicates_of(self, text):
+        """
+        Returns the rows that are near duplicates of text but not exact ones.
+        """
+        canonical = canonical_text(text)
+        query = shingles(canonical)
+        if not query:
+            return []
+        self._ensure_buckets()
+        candidates = set()
+        for band, key in enumerate(self._band_keys(self._hasher.signature(query))):
+            candidates.update(self._buckets[band].get(key, ()))
+        rows = []
+        for representative in candidates:
+            if self.canonical[representative] != canonical and \
+                    jaccard(query, self._shingles[representative]) >= self.threshold:
+                rows.extend(self.by_hash[self.hashes[representative]])
+        return sorted(rows)
+
+    def near_duplicate_pairs(self):
+        """
+        Returns (representative, representative) pairs of near-duplicate texts.
+        """
+        self._ensure_buckets()
+        checked, pairs = set(), set()
+        for buckets in self._buckets:
+            for rows in buckets.values():
+                for i, a in enumerate(rows):
+                    for b in rows[i + 1:]:
+                        if (a, b) in checked:
+                            continue
+                        checked.add((a, b))
+                        if jaccard(self._shingles[a], self._shingles[b]) >= self.threshold:
+                            pairs.add((a, b))
+        return pairs
+
+    def groups(self, near=True):
+        """
+        Returns the groups of duplicate rows (each with more than one member).
+
+        Args:
+            near: Also merge near duplicates, not only exact ones.
+        """
+        union_find = UnionFind(len(self.canonical))
+        for rows in self.by_hash.values():
+            for row in rows[1:]:
+                union_find.union(rows[0], row)
+        if near:
+            for a, b in self.near_duplicate_pairs():
+                union_find.union(a, b)
+        return union_find.components(min_size=2)
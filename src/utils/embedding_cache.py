@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache with a bounded in-memory LRU tier
+    and an optional on-disk tier that survives restarts.
+
+    The disk tier is bounded by disk_max_bytes: once it grows past the
+    bound, the least recently used files (by modification time, which disk
+    hits refresh) are removed until it is back under 90% of the bound.
+    """
+
+    def __init__(self, max_entries=50000, cache_dir=None, disk_max_bytes=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._disk_bytes = None
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_evictions = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model, task_type, text):
+        """
+        Returns the cache key for a (model, task_type, text) triple.
+        """
+        payload = "\x00".join([model, task_type, text or ""])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def _remember(self, key, vector):
+        # Caller must hold the lock.
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, key):
+        """
+        Returns the cached vector for key, or None if it has never been stored.
+        """
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self._memory_hits += 1
+                return vector
+
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                vector = np.load(path)
+                # Mark the file as recently used for pruning.
+                os.utime(path)
+            except (OSError, ValueError):
+                vector = None
+            if vector is not None:
+                with self._lock:
+                    self._remember(key, vector)
+                    self._disk_hits += 1
+                return vector
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key, vector):
+        """
+        Stores a vector in memory and, if configured, on disk.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+
+        if self.cache_dir:
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    np.save(f, vector)
+                size = os.path.getsize(tmp_path)
+                # Rename is atomic, so concurrent readers never see a partial file.
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self._track_disk(size)
+
+    def _scan(self):
+        """
+        Returns (mtime, size, path) for every file of the disk tier.
+        """
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".npy"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _track_disk(self, size):
+        if not self.disk_max_bytes:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += size
+                if self._disk_bytes <= self.disk_max_bytes:
+                    return
+        self.prune()
+
+    def prune(self):
+        """
+        Removes the least recently used files of the disk tier until it is
+        under 90% of disk_max_bytes. The size is measured from the files, so
+        writes by other processes sharing the directory are counted too.
+        """
+        if not self.cache_dir or not self.disk_max_bytes:
+            return
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            files = self._scan()
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            if total > self.disk_max_bytes:
+                target = self.disk_max_bytes * 0.9
+                for _, size, path in sorted(files):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    removed += 1
+                if removed:
+                    logger.info(f"Pruned {removed} embeddings from the disk cache")
+            with self._lock:
+                self._disk_bytes = total
+                self._disk_evictions += removed
+        finally:
+            self._prune_lock.release()
+
+    def stats(self):
+        with self._lock:
+            hits = self._memory_hits + self._disk_hits
+            lookups = hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "disk_evictions": self._disk_evictions,
+                "disk_bytes": self._disk_bytes
+            }
+
+
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000")),
+    cache_dir=os.getenv("EMBEDDING_CACHE_DIR", "cache/embeddings") or None,
+    disk_max_bytes=int(float(os.getenv("EMBEDDING_CACHE_DISK_MAX_MB", "2048")) * 2 ** 20)
+)
@@ -1,62 +1,233 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import numpy as np
 import google.generativeai as genai
+from .embedding_cache import embedding_cache
+from .index_store import write_index_file, open_index_file
+from .metrics import gemini_call
+from .admission import gemini_gate, Overloaded
+
+EMBEDDING_MODEL = "models/embedding-001"
+# The batch embedding API accepts at most 100 texts per call.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+EMBEDDING_RETRY_BACKOFF = float(os.getenv("EMBEDDING_RETRY_BACKOFF", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
 
-def embed_texts(texts):
+class EmbeddingError(Exception):
+    """Raised when embeddings could not be generated for a list of texts."""
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EMBEDDING_MAX_WORKERS,
+                                           thread_name_prefix="embed")
+        return _executor
+
+def _embed_batch(batch, task_type):
     """
-    Embeds a list of texts using the Google Generative AI embedding model.
+    Embeds a single batch, retrying with exponential backoff on failure.
+    """
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        try:
+            with gemini_gate.admit(), gemini_call("embed_content"):
+                result = genai.embed_content(
+                    model=EMBEDDING_MODEL,
+                    content=batch,
+                    task_type=task_type
+                )
+            embeddings = np.asarray(result['embedding'], dtype=np.float32)
+            if embeddings.ndim != 2 or embeddings.shape[0] != len(batch):
+                raise ValueError(f"expected {len(batch)} embeddings, got shape {embeddings.shape}")
+            return embeddings
+        except Overloaded:
+            raise
+        except Exception as e:
+            if attempt == EMBEDDING_MAX_RETRIES:
+                raise EmbeddingError(f"Embedding batch of {len(batch)} texts failed: {e}") from e
+            logger.warning(f"Embedding batch failed (attempt {attempt + 1}), retrying: {e}")
+            time.sleep(EMBEDDING_RETRY_BACKOFF * (2 ** attempt))
+
+def embed_batches(texts, task_type="RETRIEVAL_DOCUMENT"):
+    """
+    Embeds texts in API-sized batches on a bounded thread pool.
 
     Args:
         texts: A list of strings to be embedded.
+        task_type: The embedding task type passed to the API.
 
     Returns:
-        A numpy array of embeddings.
+        A float32 numpy array with one row per text, in input order.
+
+    Raises:
+        EmbeddingError: If any batch still fails after its retries.
     """
+    batches = [(start, texts[start:start + EMBEDDING_BATCH_SIZE])
+               for start in range(0, len(texts), EMBEDDING_BATCH_SIZE)]
+    if len(batches) == 1:
+        return _embed_batch(batches[0][1], task_type)
+
+    embeddings = None
+    executor = _get_executor()
+    futures = {executor.submit(_embed_batch, batch, task_type): start for start, batch in batches}
     try:
-        # Use the "embedding-001" model for generating embeddings
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=texts,
-            task_type="RETRIEVAL_DOCUMENT"  # Optimized for document search
-        )
-        return np.array(result['embedding'])
-    except Exception as e:
-        # Log the exception or handle it as needed
-        print(f"An error occurred during embedding: {e}")
+        for future in as_completed(futures):
+            start = futures[future]
+            batch_embeddings = future.result()
+            if embeddings is None:
+                embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+            embeddings[start:start + len(batch_embeddings)] = batch_embeddings
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+    return embeddings
+
+def embed_texts(texts, task_type="RETRIEVAL_DOCUMENT"):
+    """
+    Embeds a list of texts using the Google Generative AI embedding model.
+
+    Texts that have been embedded before are served from the embedding cache;
+    only unseen texts are sent to the API, in concurrent batches.
+
+    Args:
+        texts: A list of strings to be embedded.
+        task_type: The embedding task type passed to the API.
+
+    Returns:
+        A float32 numpy array of embeddings.
+
+    Raises:
+        EmbeddingError: If the embeddings could not be generated.
+    """
+    if not texts:
         return np.array([])
 
+    keys = [embedding_cache.make_key(EMBEDDING_MODEL, task_type, text) for text in texts]
+    vectors = {}
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key in vectors or key in missing:
+            continue
+        vector = embedding_cache.get(key)
+        if vector is None:
+            missing[key] = text
+        else:
+            vectors[key] = vector
+
+    if missing:
+        new_embeddings = embed_batches(list(missing.values()), task_type=task_type)
+        for key, vector in zip(missing, new_embeddings):
+            embedding_cache.set(key, vector)
+            vectors[key] = vector
+
+    dim = len(next(iter(vectors.values())))
+    embeddings = np.empty((len(keys), dim), dtype=np.float32)
+    for row, key in enumerate(keys):
+        embeddings[row] = vectors[key]
+    return embeddings
+
+def top_k(similarities, k):
+    """
+    Selects the k highest scores in each row of a similarity matrix.
+
+    Uses partial selection (argpartition) and only sorts the k survivors,
+    so the cost is O(N + k log k) per row instead of O(N log N).
+
+    Args:
+        similarities: A (Q, N) array of scores.
+        k: The number of results to keep per row.
+
+    Returns:
+        A tuple (scores, indices) of (Q, k) arrays, best match first.
+    """
+    n = similarities.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        empty = np.empty((similarities.shape[0], 0))
+        return empty.astype(similarities.dtype), empty.astype(np.int64)
+    if k < n:
+        candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(n), (similarities.shape[0], 1))
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return (np.take_along_axis(candidate_scores, order, axis=1),
+            np.take_along_axis(candidates, order, axis=1))
+
 class SimpleVectorIndex:
     def __init__(self, embeddings):
         """
         Initializes the vector index and pre-normalizes embeddings for efficient search.
         """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
         # Calculate the L2 norm for each embedding vector.
         # Add a small epsilon to avoid division by zero.
         norm = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8
-        # Normalize the embeddings by dividing by their norm.
-        self.normalized_embeddings = embeddings / norm
-    
+        # Store normalized float32 rows contiguously so search is a single BLAS call.
+        self.normalized_embeddings = np.ascontiguousarray(embeddings / norm, dtype=np.float32)
+
+    @classmethod
+    def from_normalized(cls, normalized_embeddings):
+        """
+        Wraps already-normalized float32 rows without copying them.
+        """
+        index = cls.__new__(cls)
+        index.normalized_embeddings = normalized_embeddings
+        return index
+
+    @classmethod
+    def load(cls, path):
+        """
+        Opens an index saved with save() as a zero-copy memory map, so every
+        process that loads the same file shares its pages.
+
+        Returns:
+            A tuple (index, header).
+        """
+        normalized_embeddings, header = open_index_file(path)
+        return cls.from_normalized(normalized_embeddings), header
+
+    def save(self, path, ids=None, **metadata):
+        """
+        Atomically writes the normalized embeddings to path with a header
+        holding the embedding model, dimension, row IDs and metadata.
+        """
+        header = dict(metadata, model=EMBEDDING_MODEL, ids=list(ids) if ids is not None else None)
+        write_index_file(path, self.normalized_embeddings, header)
+
+    def __len__(self):
+        return self.normalized_embeddings.shape[0]
+
     def search(self, query_embedding, k=5):
         """
-        Searches for the k-nearest neighbors to the query_embedding.
+        Searches for the k-nearest neighbors of one or more query embeddings.
+
+        Args:
+            query_embedding: A (d,) vector or a (Q, d) matrix of queries.
+            k: The number of neighbors to return per query.
+
+        Returns:
+            A tuple (scores, indices) of (Q, k) arrays, best match first.
         """
-        # Normalize the single query embedding.
-        norm_query = np.linalg.norm(query_embedding) + 1e-8
-        normalized_query = query_embedding / norm_query
-
-        # Compute cosine similarity via dot product between the normalized query 
-        # and all normalized document embeddings.
-        similarities = np.dot(normalized_query, self.normalized_embeddings.T)
-
-        # Get the indices of the top k most similar items.
-        # np.argsort sorts in ascending order, so we negate the similarities array
-        # to sort in descending order.
-        top_indices = np.argsort(-similarities[0])[:k]
-        
-        # Get the similarity scores for the top indices.
-        top_scores = similarities[0][top_indices]
-        
-        # Return the scores and indices as numpy arrays.
-        return np.array([top_scores]), np.array([top_indices])
+        queries = np.atleast_2d(np.asarray(query_embedding, dtype=np.float32))
+        # Normalize each query row.
+        queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-8)
+
+        # Cosine similarity of every query against every document in one matrix product.
+        similarities = queries @ self.normalized_embeddings.T
+
+        return top_k(similarities, k)
 
 def build_vector_index(questions):
     """
@@ -0,0 +1,49 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _create_session():
+    session = requests.Session()
+    retries = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"])
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retries
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({'User-Agent': 'Flask-App/1.0', 'Connection': 'keep-alive'})
+    return session
+
+
+def get_session():
+    """
+    Returns this process's shared, connection-pooled requests.Session.
+
+    The session is recreated after a fork so gunicorn workers never share
+    sockets inherited from the master process.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            _session = _create_session()
+            _session_pid = pid
+        return _session
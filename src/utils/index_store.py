@@ -0,0 +1,94 @@
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+# File layout: magic, format version, header length, JSON header padded to
+# a 64-byte boundary, then a C-ordered float32 (count, dim) matrix.
+MAGIC = b"QSIX"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<4sII")
+_ALIGNMENT = 64
+
+
+class IndexStoreError(Exception):
+    """Raised when an index file is missing, truncated or in an unknown format."""
+
+
+def write_index_file(path, embeddings, header):
+    """
+    Atomically writes embeddings and a JSON header to path.
+
+    The file is written under a temporary name and renamed into place, so
+    readers see either the previous index or the complete new one.
+
+    Args:
+        path: Destination file.
+        embeddings: A (count, dim) array, stored as float32.
+        header: JSON-serializable metadata; count and dim are added to it.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    header = dict(header, count=int(embeddings.shape[0]), dim=int(embeddings.shape[1]))
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_offset = _PREFIX.size + len(header_bytes)
+    padding = (-data_offset) % _ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes) + padding))
+            f.write(header_bytes)
+            f.write(b" " * padding)
+            f.write(embeddings.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_index_header(path):
+    """
+    Returns (header, data_offset) for an index file.
+
+    Raises:
+        IndexStoreError: If the file is missing or not a valid index file.
+    """
+    try:
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) != _PREFIX.size:
+                raise IndexStoreError(f"Truncated index file: {path}")
+            magic, version, header_length = _PREFIX.unpack(prefix)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise IndexStoreError(f"Unknown index format in {path}")
+            header = json.loads(f.read(header_length).decode("utf-8"))
+    except (OSError, ValueError) as e:
+        raise IndexStoreError(f"Could not read index file {path}: {e}") from e
+    return header, _PREFIX.size + header_length
+
+
+def open_index_file(path):
+    """
+    Memory-maps an index file read-only without copying its embeddings.
+
+    Returns:
+        A tuple (embeddings, header) where embeddings is a read-only
+        float32 memmap of shape (count, dim).
+
+    Raises:
+        IndexStoreError: If the file is missing, truncated or invalid.
+    """
+    header, offset = read_index_header(path)
+    shape = (header["count"], header["dim"])
+    expected_size = offset + shape[0] * shape[1] * 4
+    if os.path.getsize(path) < expected_size:
+        raise IndexStoreError(f"Truncated index file: {path}")
+    if shape[0] == 0:
+        return np.empty(shape, dtype=np.float32), header
+    embeddings = np.memmap(path, dtype=np.float32, mode="r", offset=offset, shape=shape)
+    return embeddings, header
@@ -0,0 +1,94 @@
+import codecs
+import json
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(chunks, encoding="utf-8"):
+    """
+    Incrementally parses a top-level JSON array, yielding one element at a time.
+
+    Only the element currently being parsed is buffered, so peak memory does
+    not grow with the size of the whole document.
+
+    Args:
+        chunks: An iterable of bytes chunks, e.g. response.iter_content().
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON array.
+    """
+    chunk_iter = iter(chunks)
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    pos = 0
+    exhausted = False
+
+    def read_more():
+        nonlocal buffer, pos, exhausted
+        try:
+            chunk = next(chunk_iter)
+            data = text_decoder.decode(chunk)
+        except StopIteration:
+            data = text_decoder.decode(b"", final=True)
+            exhausted = True
+        buffer = buffer[pos:] + data
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or exhausted:
+                return
+            read_more()
+
+    skip_whitespace()
+    if pos < len(buffer) and buffer[pos] == "\ufeff":
+        pos += 1
+        skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+
+    expect_value = True
+    first = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of JSON array")
+
+        char = buffer[pos]
+        if char == "]" and (first or not expect_value):
+            pos += 1
+            break
+        if not expect_value:
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' at offset {pos}")
+            pos += 1
+            expect_value = True
+            continue
+
+        try:
+            value, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise
+            read_more()
+            continue
+        if not exhausted and (end >= len(buffer) or (
+                isinstance(value, (int, float)) and buffer[end] in _NUMBER_CHARS)):
+            # A number such as 12 or 3. may continue in the next chunk.
+            read_more()
+            continue
+
+        pos = end
+        expect_value = False
+        first = False
+        yield value
+
+    skip_whitespace()
+    if pos < len(buffer):
+        raise ValueError(f"Extra data after JSON array at offset {pos}")
@@ -1,11 +1,17 @@
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+import re
 from datetime import datetime
+from flask import g, has_request_context
 from pythonjsonlogger import jsonlogger
 
 os.makedirs('logs', exist_ok=True)
 
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
 class CustomJsonFormatter(jsonlogger.JsonFormatter):
     def add_fields(self, log_record, record, message_dict):
         super(CustomJsonFormatter, self).add_fields(log_record, record, message_dict)
@@ -35,24 +41,97 @@ class SensitiveDataFilter(logging.Filter):
             'password', 'token', 'secret', 'key', 'auth', 
             'credential', 'jwt', 'api_key', 'apikey'
         ]
+        self._pattern = re.compile("|".join(re.escape(p) for p in self.patterns), re.IGNORECASE)
     
     def filter(self, record):
-        if isinstance(record.msg, str):
-            for pattern in self.patterns:
-                if pattern in record.msg.lower():
-                    record.msg = self._redact_sensitive_data(record.msg, pattern)
+        if isinstance(record.msg, str) and self._pattern.search(record.msg):
+            record.msg = self._redact_sensitive_data(record.msg)
         return True
     
-    def _redact_sensitive_data(self, message, pattern):
+    def _redact_sensitive_data(self, message):
+        # The value after any "name:" segment that mentions a sensitive word is replaced.
         if ":" in message:
             parts = message.split(":")
-            for i, part in enumerate(parts):
-                if pattern in part.lower() and i < len(parts) - 1:
+            sensitive = [bool(self._pattern.search(part)) for part in parts]
+            for i in range(len(parts) - 1):
+                if sensitive[i]:
                     parts[i+1] = " [REDACTED]"
             return ":".join(parts)
         return message
 
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records for the background listener. Only when the queue is
+    full does the caller wait for the writer, so no record is ever lost.
+    """
+
+    full_waits = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _BoundedQueueHandler.full_waits += 1
+            self.queue.put(record)
+
+
+class _BlockingQueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class _ChannelRouter(logging.Handler):
+    """
+    Hands each dequeued record to the handlers of its logger channel.
+    """
+
+    def __init__(self, channels, default):
+        super(_ChannelRouter, self).__init__()
+        self.channels = channels
+        self.default = default
+
+    def handle(self, record):
+        for handler in self.channels.get(record.name.split('.', 1)[0], self.default):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def close(self):
+        for handlers in list(self.channels.values()) + [self.default]:
+            for handler in handlers:
+                handler.close()
+        super(_ChannelRouter, self).close()
+
+
+_listener = None
+
+
+def stop_logging():
+    """
+    Flushes queued records and stops the background log writer.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def log_queue_full_waits():
+    """
+    Returns how many records had to wait because the log queue was full.
+    """
+    return _BoundedQueueHandler.full_waits
+
+
+atexit.register(stop_logging)
+
 def setup_logging(app_name='flask-rag-app', log_level=logging.INFO):
+    global _listener
+    stop_logging()
+    
     logger = logging.getLogger()
     logger.setLevel(log_level)
     
@@ -98,25 +177,33 @@ def setup_logging(app_name='flask-rag-app', log_level=logging.INFO):
     console_handler.setFormatter(console_formatter)
     console_handler.setLevel(log_level)
     
+    # Handlers run on one background thread; request threads only redact and enqueue.
+    log_queue = queue.Queue(maxsize=max(LOG_QUEUE_SIZE, 0))
     sensitive_filter = SensitiveDataFilter()
-    app_log_handler.addFilter(sensitive_filter)
-    error_log_handler.addFilter(sensitive_filter)
-    access_log_handler.addFilter(sensitive_filter)
-    security_log_handler.addFilter(sensitive_filter)
-    console_handler.addFilter(sensitive_filter)
+    router = _ChannelRouter(
+        channels={'access': [access_log_handler], 'security': [security_log_handler]},
+        default=[app_log_handler, error_log_handler, console_handler]
+    )
+    _listener = _BlockingQueueListener(log_queue, router)
+    _listener.start()
+    
+    def queue_handler():
+        handler = _BoundedQueueHandler(log_queue)
+        handler.addFilter(sensitive_filter)
+        return handler
     
-    logger.addHandler(app_log_handler)
-    logger.addHandler(error_log_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(queue_handler())
     
     access_logger = logging.getLogger('access')
     access_logger.setLevel(log_level)
-    access_logger.addHandler(access_log_handler)
+    access_logger.handlers.clear()
+    access_logger.addHandler(queue_handler())
     access_logger.propagate = False
     
     security_logger = logging.getLogger('security')
     security_logger.setLevel(log_level)
-    security_logger.addHandler(security_log_handler)
+    security_logger.handlers.clear()
+    security_logger.addHandler(queue_handler())
     security_logger.propagate = False
     
     app_logger = logging.getLogger(app_name)
@@ -131,7 +218,8 @@ def setup_logging(app_name='flask-rag-app', log_level=logging.INFO):
 def log_request(request, user_id=None):
     logger = logging.getLogger('access')
     
-    request_id = os.urandom(8).hex()
+    request_id = getattr(g, 'request_id', None) if has_request_context() else None
+    request_id = request_id or os.urandom(8).hex()
     
     method = request.method
     path = request.path
@@ -0,0 +1,390 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+from .single_flight import file_lock
+
+METRICS_DIR = os.getenv("METRICS_DIR", "cache/metrics")
+METRICS_SYNC_INTERVAL = float(os.getenv("METRICS_SYNC_INTERVAL", "5"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+class Counter:
+    """
+    A monotonically increasing count per label combination.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram per label combination.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One counter per bucket plus +Inf, then the sum.
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), list(counts)] for key, counts in self._values.items()]
+
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text format.
+
+    When sync_dir is set, every worker periodically writes a snapshot of its
+    metrics there and a scrape of any worker merges all snapshots, so the
+    numbers cover every gunicorn worker rather than whichever one answered.
+    Snapshots are keyed by pid and a per-process run id, so a worker that
+    reuses an exited worker's pid never overwrites its snapshot. Snapshots
+    of exited workers are folded into one retired snapshot and removed:
+    their counters and histograms are kept so totals never go backwards,
+    and their gauges are dropped.
+    """
+
+    def __init__(self, sync_dir=None, sync_interval=5):
+        self.sync_dir = sync_dir
+        self.sync_interval = sync_interval
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._run_pid = None
+        self._run_id = None
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """
+        Registers a callable evaluated at snapshot time.
+
+        The collector returns (name, kind, documentation, labels, value)
+        tuples, where kind is "counter" or "gauge".
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        families = {}
+        for metric in metrics:
+            families[metric.name] = {
+                "kind": metric.kind,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": metric.samples()
+            }
+        for collector in collectors:
+            for name, kind, documentation, labels, value in collector():
+                family = families.setdefault(name, {
+                    "kind": kind,
+                    "documentation": documentation,
+                    "labelnames": list(labels),
+                    "buckets": [],
+                    "samples": []
+                })
+                family["samples"].append([[str(labels[key]) for key in family["labelnames"]], value])
+        return {"pid": os.getpid(), "run": self._run(), "families": families}
+
+    def _run(self):
+        # A new run id per process, including after a fork.
+        pid = os.getpid()
+        with self._lock:
+            if self._run_pid != pid:
+                self._run_pid = pid
+                self._run_id = uuid.uuid4().hex[:12]
+            return f"{pid}-{self._run_id}"
+
+    def _snapshot_path(self, run):
+        return os.path.join(self.sync_dir, f"{run}.json")
+
+    def _retired_path(self):
+        return os.path.join(self.sync_dir, "retired.json")
+
+    def sync(self, snapshot=None):
+        """
+        Writes this worker's snapshot to sync_dir and retires the snapshots
+        of exited workers.
+        """
+        if not self.sync_dir:
+            return
+        snapshot = snapshot or self.snapshot()
+        self._last_sync = time.time()
+        try:
+            os.makedirs(self.sync_dir, exist_ok=True)
+            _write_json(self._snapshot_path(snapshot["run"]), snapshot)
+        except OSError:
+            pass
+        self._retire_exited(snapshot["run"])
+
+    def _retire_exited(self, own_run):
+        pid = os.getpid()
+        for path in glob.glob(os.path.join(self.sync_dir, "*.json")):
+            run = os.path.basename(path)[:-len(".json")]
+            if run == own_run or path == self._retired_path():
+                continue
+            run_pid = run.split("-", 1)[0]
+            # A snapshot with this process's pid but another run id belongs to an exited process.
+            if str(pid) == run_pid or not _pid_alive(run_pid):
+                self._retire(path)
+
+    def _retire(self, path):
+        """
+        Folds an exited worker's counters and histograms into the retired
+        snapshot and removes its snapshot.
+        """
+        retired_path = self._retired_path()
+        with file_lock(retired_path + ".lock", timeout=5) as locked:
+            if not locked:
+                return
+            snapshot = _read_json(path)
+            if snapshot is None:
+                # Another worker retired it meanwhile, or it is unreadable.
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                return
+            merged = {}
+            retired = _read_json(retired_path)
+            if retired is not None:
+                _merge(merged, retired)
+            _merge(merged, snapshot, gauges=False)
+            families = {name: dict(family, samples=[[list(key), value] for key, value in family["samples"].items()])
+                        for name, family in merged.items()}
+            try:
+                _write_json(retired_path, {"pid": None, "run": "retired", "families": families})
+                os.remove(path)
+            except OSError:
+                pass
+
+    def sync_if_due(self):
+        if self.sync_dir and time.time() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def _snapshots(self):
+        own = self.snapshot()
+        if not self.sync_dir:
+            return [own]
+        self.sync(own)
+        snapshots = [own]
+        for path in glob.glob(os.path.join(self.sync_dir, "*.json")):
+            snapshot = _read_json(path)
+            if snapshot is not None and snapshot.get("run") != own["run"]:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def render(self):
+        """
+        Returns the merged metrics of all workers in Prometheus text format.
+        """
+        merged = {}
+        for snapshot in self._snapshots():
+            _merge(merged, snapshot)
+
+        lines = []
+        for name in sorted(merged):
+            family = merged[name]
+            lines.append(f"# HELP {name} {family['documentation']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for key, value in sorted(family["samples"].items()):
+                labels = list(zip(family["labelnames"], key))
+                if family["kind"] == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(family["buckets"] + ["+Inf"], value[:-1]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels + [('le', _format_bound(bound))])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(merged, snapshot, gauges=True):
+    """
+    Adds a snapshot's samples to merged, which maps each family name to the
+    family with its samples keyed by label values.
+    """
+    for name, family in snapshot["families"].items():
+        if family["kind"] == "gauge" and not gauges:
+            continue
+        target = merged.setdefault(name, dict(family, samples={}))
+        for labels, value in family["samples"]:
+            key = tuple(labels)
+            current = target["samples"].get(key)
+            if current is None:
+                target["samples"][key] = value
+            elif isinstance(value, list):
+                target["samples"][key] = [a + b for a, b in zip(current, value)]
+            else:
+                target["samples"][key] = current + value
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, TypeError, ValueError):
+        return False
+    return True
+
+
+def _format_bound(bound):
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+metrics_registry = MetricsRegistry(sync_dir=METRICS_DIR or None, sync_interval=METRICS_SYNC_INTERVAL)
+
+stage_duration = metrics_registry.histogram(
+    "qsimcheck_stage_duration_seconds", "Time spent in each request processing stage.", ["stage"]
+)
+request_duration = metrics_registry.histogram(
+    "qsimcheck_http_request_duration_seconds", "HTTP request latency.", ["endpoint", "method", "status"]
+)
+gemini_calls = metrics_registry.counter(
+    "qsimcheck_gemini_calls_total", "Calls made to the Gemini API.", ["method", "outcome"]
+)
+gemini_call_duration = metrics_registry.histogram(
+    "qsimcheck_gemini_call_duration_seconds", "Latency of individual Gemini API calls.", ["method"]
+)
+
+
+def record_stage(name, seconds):
+    """
+    Records a stage duration in the stage histogram and, inside a request,
+    in the request's Server-Timing entries.
+    """
+    stage_duration.observe(seconds, stage=name)
+    if has_request_context():
+        timings = g.setdefault("stage_timings", {})
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name):
+    """
+    Times the enclosed block as one processing stage.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+@contextmanager
+def gemini_call(method):
+    """
+    Counts and times one Gemini API call, labelled ok or error by outcome.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        gemini_calls.inc(method=method, outcome=outcome)
+        gemini_call_duration.observe(time.perf_counter() - start, method=method)
+
+
+def server_timing_header(timings, total=None):
+    """
+    Formats stage durations in seconds as a Server-Timing header value.
+    """
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
@@ -1,4 +1,118 @@
+import os
+import re
+from functools import lru_cache
+
 from bs4 import BeautifulSoup
+from bs4.dammit import EntitySubstitution
+
+CLEAN_HTML_CACHE_SIZE = int(os.getenv("CLEAN_HTML_CACHE_SIZE", "65536"))
+
+# A start or end tag whose attributes contain no markup characters.
+_SIMPLE_TAG = re.compile(
+    r"""<(/?)([a-zA-Z][a-zA-Z0-9]*)"""
+    r"""((?:\s+[^\s<>"'=/]+(?:\s*=\s*(?:"[^"<>]*"|'[^'<>]*'|[^\s<>"'=`]+))?)*)\s*/?>"""
+)
+# Anything html.parser could treat as the start of markup.
+_MARKUP_START = re.compile(r"<[a-zA-Z/!?]")
+_ENTITY = re.compile(r"&(?:#([xX][0-9a-fA-F]+|[0-9]+)|([a-zA-Z][-.a-zA-Z0-9]*))(;?)")
+# An ampersand html.parser would try to read as a character reference.
+_REFERENCE_START = re.compile(r"&[a-zA-Z#]")
+_ASCII_SPACES = " \n\t\x0c\r"
+# Elements whose content is not ordinary collapsible text.
+_FULL_PARSE_TAGS = {"script", "style", "template", "pre", "textarea"}
+
+
+class _NeedsFullParse(Exception):
+    pass
+
+
+def _decode_charref(number):
+    # Mirrors BeautifulSoup's handling, including its Windows-1252 fallback.
+    data = None
+    if number < 256:
+        try:
+            data = bytearray([number]).decode("windows-1252")
+        except UnicodeDecodeError:
+            pass
+    if not data:
+        try:
+            data = chr(number)
+        except (ValueError, OverflowError):
+            pass
+    return data or "\N{REPLACEMENT CHARACTER}"
+
+
+def _collapse_whitespace(node):
+    # BeautifulSoup replaces text nodes made only of ASCII whitespace with one character.
+    if node and not node.strip(_ASCII_SPACES):
+        return "\n" if "\n" in node else " "
+    return node
+
+
+def _decode_entities(segment):
+    if len(_REFERENCE_START.findall(segment)) != len(_ENTITY.findall(segment)):
+        # html.parser treats a malformed reference as the start of unparsed text.
+        raise _NeedsFullParse()
+
+    def replace(match):
+        end = match.end()
+        if end == len(segment) or (not match.group(3) and match.group(1)):
+            # An unterminated reference is ambiguous; leave it to the full parser.
+            raise _NeedsFullParse()
+        if match.group(1):
+            ref = match.group(1)
+            number = int(ref[1:], 16) if ref[0] in "xX" else int(ref)
+            return _decode_charref(number)
+        name = match.group(2)
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        if character is None:
+            return f"&{name}"
+        return character
+
+    return _ENTITY.sub(replace, segment)
+
+
+def _clean_simple_markup(text):
+    """
+    Strips simple tags and decodes entities without building a parse tree.
+
+    Raises:
+        _NeedsFullParse: If the text contains markup this tokenizer does not handle.
+    """
+    parts = []
+    pos = 0
+    for match in _SIMPLE_TAG.finditer(text):
+        if match.group(2).lower() in _FULL_PARSE_TAGS:
+            raise _NeedsFullParse()
+        parts.append(text[pos:match.start()])
+        pos = match.end()
+    parts.append(text[pos:])
+
+    cleaned = []
+    for segment in parts:
+        if _MARKUP_START.search(segment):
+            raise _NeedsFullParse()
+        cleaned.append(_collapse_whitespace(_decode_entities(segment) if "&" in segment else segment))
+    return "".join(cleaned)
+
+
+@lru_cache(maxsize=CLEAN_HTML_CACHE_SIZE)
+def _clean_markup(text):
+    try:
+        return _clean_simple_markup(text)
+    except _NeedsFullParse:
+        return BeautifulSoup(text, "html.parser").get_text()
+
 
 def clean_html(text):
-    return BeautifulSoup(text or "", "html.parser").get_text()
\ No newline at end of file
+    """
+    Returns the visible text of an HTML fragment.
+
+    Plain text is returned as-is, simple markup is handled by a lightweight
+    tokenizer, and only complex HTML is parsed with BeautifulSoup. Results
+    are memoized.
+    """
+    text = text or ""
+    if "<" not in text and "&" not in text:
+        return _collapse_whitespace(text)
+    return _clean_markup(text)
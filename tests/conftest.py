@@ -0,0 +1,117 @@
+import hashlib
+import http.server
+import json
+import os
+import socketserver
+import tempfile
+import threading
+
+import pytest
+
+# Settings are read when the modules are imported, so state directories must
+# point away from the working tree before any test imports src.
+STATE_DIR = tempfile.mkdtemp(prefix="qsimcheck-tests-")
+for name, path in [("EMBEDDING_CACHE_DIR", "embeddings"), ("INDEX_STORE_DIR", "indexes"),
+                   ("VERDICT_CACHE_PATH", "verdicts.json"), ("JOBS_DIR", "jobs"), ("BANK_REGISTRY_DIR", "banks"),
+                   ("GROUP_STATE_DIR", "groups"), ("METRICS_DIR", "metrics"), ("ADMISSION_LOCK_DIR", "admission")]:
+    os.environ[name] = os.path.join(STATE_DIR, path)
+os.environ["ALLOWED_DOMAINS"] = "127.0.0.1"
+os.environ["PREWARM_BANKS"] = ""
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-with-at-least-32-bytes")
+
+
+class BankServer:
+    """
+    Serves question banks from memory with an ETag and counts the requests.
+
+    Assign a list of questions to banks[path] to publish or change a bank.
+    """
+
+    def __init__(self):
+        self.banks = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def count(self, path, status=None):
+        with self._lock:
+            return sum(1 for p, s in self.requests if p == path and status in (None, s))
+
+    def _handle(self, handler):
+        if handler.path not in self.banks:
+            handler.send_error(404)
+            return
+        body = json.dumps(self.banks[handler.path]).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        status = 304 if handler.headers.get("If-None-Match") == etag else 200
+        with self._lock:
+            self.requests.append((handler.path, status))
+        handler.send_response(status)
+        handler.send_header("ETag", etag)
+        if status == 304:
+            handler.end_headers()
+            return
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture(scope="session")
+def bank_server():
+    server = BankServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture(scope="session")
+def fake_gemini():
+    from benchmarks.fake_gemini import FakeGemini, install
+    return install(FakeGemini(dim=32, embed_latency=0, generate_latency=0))
+
+
+@pytest.fixture(scope="session")
+def app(fake_gemini):
+    from src import create_app
+    # Log files are opened relative to the working directory.
+    cwd = os.getcwd()
+    os.makedirs(os.path.join(STATE_DIR, "logs"), exist_ok=True)
+    os.chdir(STATE_DIR)
+    try:
+        app = create_app()
+    finally:
+        os.chdir(cwd)
+    for limiter in app.extensions.get("limiter", ()):
+        limiter.enabled = False
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def auth(client):
+    response = client.post("/login", json={"username": os.getenv("ADMIN_USERNAME", "admin"),
+                                           "password": os.getenv("ADMIN_PASSWORD", "password")})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.admission import AdmissionGate, Overloaded
+
+
+def hold(gate):
+    """
+    Takes a slot of gate on another thread until the returned event is set.
+    """
+    admitted, release = threading.Event(), threading.Event()
+
+    def run():
+        with gate.admit():
+            admitted.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert admitted.wait(5)
+    return release, thread
+
+
+def test_full_gate_without_queue_sheds():
+    gate = AdmissionGate("test", limit=1, queue_size=0, queue_timeout=1)
+    release, thread = hold(gate)
+    try:
+        with pytest.raises(Overloaded) as error:
+            with gate.admit():
+                pass
+        assert (error.value.reason, error.value.retry_after) == ("queue full", 1)
+    finally:
+        release.set()
+        thread.join()
+    with gate.admit():
+        assert gate.stats()["active"] == 1
+
+
+def test_queued_caller_runs_when_a_slot_frees():
+    gate = AdmissionGate("test", limit=1, queue_size=1, queue_timeout=5)
+    release, thread = hold(gate)
+    threading.Timer(0.1, release.set).start()
+    with gate.admit():
+        assert gate.stats() == {"limit": 1, "active": 1, "waiting": 0, "queue_size": 1}
+    thread.join()
+
+
+def test_queued_caller_times_out():
+    gate = AdmissionGate("test", limit=1, queue_size=1, queue_timeout=0.1, retry_after=7)
+    release, thread = hold(gate)
+    try:
+        start = time.monotonic()
+        with pytest.raises(Overloaded) as error:
+            with gate.admit():
+                pass
+        assert time.monotonic() - start >= 0.1
+        assert (error.value.reason, error.value.retry_after) == ("queue timeout", 7)
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_limit_is_shared_through_the_lock_dir(tmp_path):
+    # Two gates on one lock_dir stand in for two worker processes.
+    first = AdmissionGate("shared", limit=1, lock_dir=str(tmp_path))
+    second = AdmissionGate("shared", limit=1, lock_dir=str(tmp_path))
+    release, thread = hold(first)
+    try:
+        with pytest.raises(Overloaded):
+            with second.admit():
+                pass
+    finally:
+        release.set()
+        thread.join()
+    with second.admit():
+        pass
+
+
+def test_zero_limit_disables_the_gate():
+    gate = AdmissionGate("test", limit=0)
+    with gate.admit(), gate.admit():
+        pass
+
+
+@pytest.fixture
+def busy_check_gate(monkeypatch):
+    from src.api import question_routes
+    gate = AdmissionGate("check", limit=1, queue_size=0, retry_after=3)
+    monkeypatch.setattr(question_routes, "check_gate", gate)
+    release, thread = hold(gate)
+    yield
+    release.set()
+    thread.join()
+
+
+def test_shed_request_gets_503_with_retry_after(client, auth, bank_server, fake_gemini, busy_check_gate):
+    bank_server.banks["/shed.json"] = [{"ID": 1, "Question": "What is a shed request?"}]
+    embedded = fake_gemini.calls["embedded_texts"]
+    response = client.post("/check-question", headers=auth,
+                           json={"questions_url": bank_server.url("/shed.json"), "question": "Is this shed?"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    # The bank is fetched to answer duplicates and cached responses, but not embedded.
+    assert fake_gemini.calls["embedded_texts"] == embedded
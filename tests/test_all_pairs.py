@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from src.utils import all_pairs
+from src.utils.all_pairs import all_pairs_neighbours, neighbour_pairs, row_tile_neighbours, tile_size_for_budget
+
+
+def normalized(n, dim=16, seed=0):
+    rows = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def brute_force(embeddings, threshold, k):
+    scores = embeddings @ embeddings.T
+    np.fill_diagonal(scores, -np.inf)
+    expected = []
+    for row in scores:
+        order = np.argsort(-row)[:k]
+        expected.append([(int(j), float(row[j])) for j in order if row[j] >= threshold])
+    return expected
+
+
+def assert_matches(graph, expected):
+    scores, indices = graph
+    for row, row_expected in enumerate(expected):
+        found = [(int(j), float(s)) for j, s in zip(indices[row], scores[row]) if j >= 0]
+        assert [j for j, _ in found] == [j for j, _ in row_expected]
+        assert np.allclose([s for _, s in found], [s for _, s in row_expected], atol=1e-5)
+        assert np.all(np.isneginf(scores[row][len(found):]))
+
+
+@pytest.mark.parametrize("threshold", [-1.0, 0.2, 0.5])
+@pytest.mark.parametrize("tile", [7, 64, 300])
+def test_tiled_scan_matches_brute_force(threshold, tile):
+    # A threshold of -1 takes the dense argpartition path, 0.5 the sparse merge.
+    embeddings = normalized(300)
+    assert_matches(row_tile_neighbours(embeddings, 0, len(embeddings), tile, threshold, 5),
+                   brute_force(embeddings, threshold, 5))
+
+
+def test_row_tiles_are_merged():
+    embeddings = normalized(500, seed=1)
+    # A budget just above the fixed cost forces the smallest tile.
+    budget = 500 * 16 * 4 + 500 * 4 * 12 + 4 * 2 ** 20
+    assert tile_size_for_budget(500, 16, 4, memory_budget=budget) < 500
+    assert_matches(all_pairs_neighbours(embeddings, 0.3, k=4, memory_budget=budget),
+                   brute_force(embeddings, 0.3, 4))
+
+
+def test_worker_processes_match_brute_force(monkeypatch):
+    monkeypatch.setattr(all_pairs, "ALL_PAIRS_PARALLEL_MIN_ROWS", 0)
+    embeddings = normalized(400, seed=2)
+    assert_matches(all_pairs_neighbours(embeddings, 0.3, k=3, workers=2),
+                   brute_force(embeddings, 0.3, 3))
+
+
+def test_budget_too_small_raises():
+    with pytest.raises(ValueError):
+        tile_size_for_budget(100_000, 768, 10, memory_budget=2 ** 20)
+
+
+def test_neighbour_pairs_are_unique_and_ordered():
+    scores = np.array([[0.9, 0.5], [0.9, -np.inf], [0.5, -np.inf]], dtype=np.float32)
+    indices = np.array([[1, 2], [0, -1], [0, -1]])
+    low, high, pair_scores = neighbour_pairs(scores, indices)
+    assert list(zip(low.tolist(), high.tolist())) == [(0, 1), (0, 2)]
+    assert np.allclose(pair_scores, [0.9, 0.5])
+
+
+def test_single_row_has_no_neighbours():
+    scores, indices = all_pairs_neighbours(normalized(1), 0.0, k=5)
+    assert indices.tolist() == [[-1]]
@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.utils.ann_index import IVFIndex, index_for_size, spherical_kmeans
+from src.utils.faiss_utils import SimpleVectorIndex
+
+
+def clustered(n, dim=32, topics=100, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim))
+    rows = centres[rng.integers(topics, size=n)] + 0.3 * rng.standard_normal((n, dim))
+    return rows.astype(np.float32), rng
+
+
+def recall(approximate, exact):
+    return np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate, exact)])
+
+
+def test_recall_against_exact_search():
+    embeddings, rng = clustered(5000)
+    queries = embeddings[rng.choice(len(embeddings), 50, replace=False)] + 0.1 * rng.standard_normal((50, 32))
+    exact = SimpleVectorIndex(embeddings).search(queries, k=10)[1]
+    index = IVFIndex.from_embeddings(embeddings, nprobe=16)
+    assert recall(index.search(queries, k=10)[1], exact) >= 0.95
+
+
+def test_probing_every_list_is_exact():
+    embeddings, rng = clustered(600)
+    queries = rng.standard_normal((5, 32))
+    exact_scores, exact = SimpleVectorIndex(embeddings).search(queries, k=7)
+    index = IVFIndex.from_embeddings(embeddings, nlist=12)
+    scores, rows = index.search(queries, k=7, nprobe=12)
+    np.testing.assert_array_equal(rows, exact)
+    np.testing.assert_allclose(scores, exact_scores, atol=1e-5)
+
+
+def test_every_row_is_in_one_list():
+    embeddings, _ = clustered(1000)
+    index = IVFIndex.from_embeddings(embeddings, nlist=20)
+    assert sorted(index.list_rows.tolist()) == list(range(1000))
+    assert index.list_offsets[-1] == 1000
+
+
+def test_small_lists_are_probed_until_k_rows():
+    embeddings, rng = clustered(200)
+    index = IVFIndex.from_embeddings(embeddings, nlist=100, nprobe=1)
+    scores, rows = index.search(rng.standard_normal(32), k=20)
+    assert rows.shape == (1, 20)
+    assert len(set(rows[0].tolist())) == 20
+
+
+def test_kmeans_centroids_are_normalized():
+    embeddings, _ = clustered(500)
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    centroids = spherical_kmeans(normalized, 8)
+    assert centroids.shape == (8, 32)
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1, atol=1e-5)
+
+
+def test_index_for_size_keeps_small_banks_exact():
+    embeddings, _ = clustered(300)
+    index = SimpleVectorIndex(embeddings)
+    assert index_for_size(index, min_size=301) is index
+    assert index_for_size(index, min_size=0) is index
+    ivf = index_for_size(index, min_size=300)
+    assert isinstance(ivf, IVFIndex)
+    assert ivf.normalized_embeddings is index.normalized_embeddings
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.bank_server import generate_bank, generate_queries
+from benchmarks.bench_e2e import compare
+from benchmarks.fake_gemini import FakeGemini
+from src.services.similarity_service import build_check_prompt, build_group_prompt, parse_groups
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_synthetic_bank_is_deterministic():
+    bank = generate_bank(100, seed=3)
+    assert bank == generate_bank(100, seed=3) != generate_bank(100, seed=4)
+    assert [q["ID"] for q in bank] == list(range(1, 101))
+    assert len(generate_queries(7)) == 7
+
+
+def test_fake_gemini_answers_the_app_prompts():
+    fake = FakeGemini(dim=8, embed_latency=0, generate_latency=0)
+    answer = fake.generate_content(build_check_prompt(
+        "How do I sort a python list?", ["What is a docker image?", "How do I sort a python list quickly?"])).text
+    assert answer == "2"
+    texts = ["How do I sort a python list?", "What is a docker image?", "How can I sort a python list?"]
+    assert parse_groups(fake.generate_content(build_group_prompt(texts)).text, 3) == [[0, 2]]
+    assert fake.calls["generate_content"] == 2
+    assert len(fake.embed_content("model", ["a", "b"])["embedding"]) == 2
+
+
+def test_baseline_comparison_flags_p95_regressions(capsys):
+    def run(check_p95, group_p95):
+        return [{"phase": "check", "overall": {"p95_ms": check_p95}},
+                {"phase": "group", "overall": {"p95_ms": group_p95}}]
+
+    assert compare(run(110, 100), {"phases": run(100, 100)}, tolerance=0.2) == []
+    assert compare(run(130, 100), {"phases": run(100, 100)}, tolerance=0.2) == ["check"]
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_end_to_end_benchmark_runs_offline(tmp_path):
+    output = tmp_path / "results.json"
+    env = {key: value for key, value in os.environ.items() if not key.endswith(("_DIR", "_PATH"))}
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_e2e", "--bank-size", "60", "--requests", "4",
+         "--group-requests", "1", "--dim", "32", "--embed-latency", "0", "--llm-latency", "0",
+         "--workdir", str(tmp_path / "work"), "--output", str(output)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
+    report = json.loads(output.read_text())
+    assert [phase["phase"] for phase in report["phases"]] == ["cold", "check", "group"]
+    assert all(set(phase["statuses"]) == {"200"} for phase in report["phases"])
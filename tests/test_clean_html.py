@@ -0,0 +1,35 @@
+import warnings
+
+import pytest
+from bs4 import MarkupResemblesLocatorWarning
+
+from benchmarks.bench_clean_html import FRAGMENTS, check_equivalence, generate_samples, legacy_clean_html
+from src.utils.text_utils import clean_html
+
+pytestmark = pytest.mark.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
+
+
+@pytest.mark.parametrize("fragment", FRAGMENTS)
+def test_fragment_matches_beautifulsoup(fragment):
+    assert clean_html(fragment) == legacy_clean_html(fragment)
+
+
+@pytest.mark.parametrize("text", [
+    None, "", "plain question", "<p>What is 2 &lt; 3?</p>", "<p>x&nbsp;<br/></p>",
+    "<script>var x = '<b>';</script>after", "a <b>bold</b> &amp; <i>italic</i> claim",
+])
+def test_examples_match_beautifulsoup(text):
+    assert clean_html(text) == legacy_clean_html(text)
+
+
+def test_generated_corpus_matches_beautifulsoup():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", MarkupResemblesLocatorWarning)
+        samples = generate_samples(3000, seed=1)
+        samples += [f"<p>{sample}&nbsp;<br/></p>" for sample in samples[:500]]
+        assert check_equivalence(samples) == []
+
+
+def test_memoized_result_is_stable():
+    text = "<p>Explain <b>loops</b> in Python</p>"
+    assert clean_html(text) == clean_html(text) == "Explain loops in Python"
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from src.utils.columnar import IdColumn, RecordColumn, StringColumn, is_mapped
+
+
+def test_string_column_round_trips():
+    values = ["", "plain", "naïve café", "emoji 🙂", "lone \udc80 surrogate"]
+    column = StringColumn(values)
+    assert len(column) == 5
+    assert list(column) == values
+    assert [column[i] for i in range(5)] == values
+    assert column[-1] == values[-1]
+    assert column[1:4] == values[1:4]
+    assert column[np.int64(2)] == values[2]
+    with pytest.raises(IndexError):
+        column[5]
+
+
+def test_string_column_is_one_buffer():
+    values = [f"question {i}" for i in range(1000)]
+    column = StringColumn(values)
+    assert column.nbytes == sum(len(value) for value in values) + 8 * 1001
+    assert list(StringColumn.from_encoded([StringColumn.encode(value) for value in values])) == values
+    assert len(StringColumn()) == 0 and list(StringColumn()) == []
+
+
+def test_record_column_returns_copies():
+    records = [{"ID": 1, "Question": "Was ist das?", "tags": ["a"]}, {"ID": "x"}, None]
+    column = RecordColumn(records)
+    assert list(column) == records
+    column[0]["tags"].append("b")
+    assert column[0] == records[0]
+
+
+@pytest.mark.parametrize("ids, stored", [
+    ([1, 2, 3], np.ndarray),
+    (["a", "b"], StringColumn),
+    ([1, "a", None], tuple),
+    ([2 ** 70], tuple),
+    ([True, 2], tuple),
+])
+def test_id_column_picks_the_compact_form(ids, stored):
+    column = IdColumn(ids)
+    assert isinstance(column._values, stored)
+    assert column.tolist() == ids
+    assert [type(value) for value in column.tolist()] == [type(value) for value in ids]
+    assert len(column) == len(ids) and column.nbytes > 0
+
+
+def test_is_mapped(tmp_path):
+    path = tmp_path / "rows.npy"
+    np.save(path, np.ones((4, 2), dtype=np.float32))
+    mapped = np.load(path, mmap_mode="r")
+    assert is_mapped(mapped) and is_mapped(mapped[1:3]) and is_mapped(np.asarray(mapped))
+    assert not is_mapped(np.ones(3)) and not is_mapped(np.array(mapped))
@@ -0,0 +1,74 @@
+import pytest
+
+from src.utils.dedup import LexicalIndex, canonical_text, jaccard, shingles
+
+
+@pytest.mark.parametrize("a, b", [
+    ("What is 2+2?", "what is 2 + 2"),
+    ("Explain   loops, in Python.", "explain loops in python"),
+    ("Is 3.5 > 1,000?", "is 3.5 > 1,000"),
+])
+def test_same_canonical_text(a, b):
+    assert canonical_text(a) == canonical_text(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("What is 2+2?", "What is 2*2?"),
+    ("What is 2+2?", "What is 7+9?"),
+    ("Is 3.5 > 2?", "Is 35 > 2?"),
+    ("Solve x^2 = 4", "Solve x = 4"),
+    ("Is a < b?", "Is a > b?"),
+])
+def test_different_canonical_text(a, b):
+    assert canonical_text(a) != canonical_text(b)
+
+
+def test_exact_duplicates_keep_math_apart():
+    index = LexicalIndex(["What is 2+2?", "What is 2*2?", "What is 7+9?", "what is 2 + 2"])
+    assert index.exact_duplicates_of("WHAT IS 2+2") == [0, 3]
+    assert index.groups() == [[0, 3]]
+
+
+NEAR = [
+    "How do I reverse a linked list in place without extra memory in Java?",
+    "How do I reverse a linked list in place without extra memory in Java",
+    "How do I reverse a linked list in place without any extra memory in Java?",
+    "What is the difference between a process and a thread?",
+    "",
+]
+
+
+def test_near_duplicates_are_found_and_exact_ones_excluded():
+    index = LexicalIndex(NEAR, threshold=0.7)
+    query = "How do I reverse a linked list in place without extra memory in Java 8?"
+    assert index.near_duplicates_of(query) == [0, 1, 2]
+    assert index.near_duplicates_of(NEAR[0]) == [2]
+    assert index.exact_duplicates_of(NEAR[0]) == [0, 1]
+    assert index.near_duplicates_of("What is a tuple?") == []
+    assert index.exact_duplicates_of("") == []
+
+
+def test_groups_merge_exact_and_near_duplicates():
+    index = LexicalIndex(NEAR, threshold=0.7)
+    assert index.groups() == [[0, 1, 2]]
+    assert index.groups(near=False) == [[0, 1]]
+
+
+def test_near_duplicate_pairs_match_brute_force():
+    texts = [f"How do I {verb} a {noun} in {lang}?" for verb in ("sort", "copy", "reverse")
+             for noun in ("list", "linked list", "hash map") for lang in ("Python", "Python 3", "Java")]
+    index = LexicalIndex(texts, threshold=0.6, num_perm=256, bands=64)
+    found = {tuple(sorted(pair)) for pair in index.near_duplicate_pairs()}
+    sets = [shingles(canonical_text(text)) for text in texts]
+    expected = {(a, b) for a in range(len(texts)) for b in range(a + 1, len(texts))
+                if jaccard(sets[a], sets[b]) >= 0.6}
+    assert found == expected
+
+
+def test_bank_checks_new_questions_lexically():
+    from src.services.question_bank import QuestionBank
+    bank = QuestionBank("http://bank", [{"ID": i} for i in range(len(NEAR))], NEAR, "hash")
+    assert bank.lexical_duplicates("<p>How do I reverse a linked list in place without extra memory in Java?</p>") \
+        == ("exact", [0, 1])
+    assert bank.lexical_duplicates("What is a tuple?") == (None, [])
+    assert bank.duplicate_groups() == [[0, 1, 2]]
@@ -0,0 +1,81 @@
+import threading
+
+import numpy as np
+import pytest
+
+from benchmarks.fake_gemini import FakeGemini
+from src.utils import faiss_utils
+from src.utils.embedding_cache import EmbeddingCache
+from src.utils.faiss_utils import EmbeddingError, embed_batches, embed_texts
+
+
+class FlakyEmbedder:
+    """
+    Stands in for genai.embed_content, failing the first failures calls.
+    """
+
+    def __init__(self, failures=0):
+        self.fake = FakeGemini(dim=8, embed_latency=0)
+        self.failures = failures
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, model, content, task_type=None):
+        with self._lock:
+            self.batches.append(list(content))
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("quota exceeded")
+        return {"embedding": [self.fake.embed_vector(text).tolist() for text in content]}
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    embedder = FlakyEmbedder()
+    monkeypatch.setattr(faiss_utils.genai, "embed_content", embedder)
+    monkeypatch.setattr(faiss_utils, "EMBEDDING_BATCH_SIZE", 3)
+    monkeypatch.setattr(faiss_utils, "EMBEDDING_RETRY_BACKOFF", 0)
+    monkeypatch.setattr(faiss_utils, "embedding_cache", EmbeddingCache())
+    return embedder
+
+
+def test_batches_keep_input_order(embedder):
+    texts = [f"question {i}" for i in range(10)]
+    embeddings = embed_batches(texts)
+    assert sorted(len(batch) for batch in embedder.batches) == [1, 3, 3, 3]
+    expected = np.array([embedder.fake.embed_vector(text) for text in texts])
+    np.testing.assert_array_equal(embeddings, expected)
+
+
+def test_failed_batch_is_retried(embedder):
+    embedder.failures = 2
+    embeddings = embed_batches(["a", "b"])
+    assert embeddings.shape == (2, 8)
+    assert len(embedder.batches) == 3
+
+
+def test_batch_fails_after_its_retries(embedder, monkeypatch):
+    monkeypatch.setattr(faiss_utils, "EMBEDDING_MAX_RETRIES", 1)
+    embedder.failures = 2
+    with pytest.raises(EmbeddingError):
+        embed_batches(["a", "b"])
+
+
+def test_wrong_number_of_embeddings_is_an_error(embedder, monkeypatch):
+    monkeypatch.setattr(faiss_utils, "EMBEDDING_MAX_RETRIES", 0)
+    monkeypatch.setattr(faiss_utils.genai, "embed_content", lambda **kwargs: {"embedding": [[1.0, 0.0]]})
+    with pytest.raises(EmbeddingError):
+        embed_batches(["a", "b"])
+
+
+def test_embed_texts_sends_only_unseen_unique_texts(embedder):
+    first = embed_texts(["a", "b", "a"])
+    np.testing.assert_array_equal(first[0], first[2])
+    second = embed_texts(["b", "c"])
+    np.testing.assert_array_equal(second[0], first[1])
+    assert [sorted(batch) for batch in embedder.batches] == [["a", "b"], ["c"]]
+
+
+def test_embed_texts_of_nothing_is_empty(embedder):
+    assert embed_texts([]).size == 0
+    assert embedder.batches == []
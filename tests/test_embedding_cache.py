@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+
+from src.utils.embedding_cache import EmbeddingCache
+
+
+def vector(seed):
+    return np.random.default_rng(seed).random(16, dtype=np.float32)
+
+
+def test_make_key_depends_on_model_task_and_text():
+    key = EmbeddingCache.make_key("model", "task", "text")
+    assert key == EmbeddingCache.make_key("model", "task", "text")
+    assert key != EmbeddingCache.make_key("model", "other", "text")
+    assert key != EmbeddingCache.make_key("other", "task", "text")
+    assert key != EmbeddingCache.make_key("model", "task", "text ")
+
+
+def test_memory_hits_and_misses_are_counted():
+    cache = EmbeddingCache(max_entries=10)
+    assert cache.get("a") is None
+    cache.set("a", vector(1))
+    np.testing.assert_array_equal(cache.get("a"), vector(1))
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 0, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    cache.set("a", vector(1))
+    cache.set("b", vector(2))
+    cache.get("a")
+    cache.set("c", vector(3))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    EmbeddingCache(cache_dir=str(tmp_path)).set("ab12", vector(1))
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(cache.get("ab12"), vector(1))
+    np.testing.assert_array_equal(cache.get("ab12"), vector(1))
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 0)
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith(".tmp")]
+
+
+def test_corrupt_disk_entry_is_a_miss(tmp_path):
+    cache = EmbeddingCache(cache_dir=str(tmp_path))
+    cache.set("ab12", vector(1))
+    with open(cache._path("ab12"), "wb") as f:
+        f.write(b"not an array")
+    assert EmbeddingCache(cache_dir=str(tmp_path)).get("ab12") is None
+
+
+def test_disk_tier_prunes_least_recently_used_files(tmp_path):
+    size = EmbeddingCache(cache_dir=str(tmp_path / "probe"))
+    size.set("probe", vector(0))
+    file_size = os.path.getsize(size._path("probe"))
+
+    cache = EmbeddingCache(cache_dir=str(tmp_path / "cache"), disk_max_bytes=file_size * 4)
+    keys = [f"{i:02d}key" for i in range(4)]
+    for age, key in enumerate(keys):
+        cache.set(key, vector(age))
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    # A disk hit marks the oldest file as recently used.
+    assert EmbeddingCache(cache_dir=cache.cache_dir).get(keys[0]) is not None
+    cache.set("99key", vector(9))
+
+    remaining = {key for key in keys + ["99key"] if os.path.exists(cache._path(key))}
+    assert keys[1] not in remaining
+    assert {keys[0], "99key"} <= remaining
+    stats = cache.stats()
+    assert stats["disk_evictions"] == 5 - len(remaining)
+    assert stats["disk_bytes"] <= file_size * 4 * 0.9
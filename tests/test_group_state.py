@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from src.services.group_state import GroupStateStore, text_hash
+
+IDS = [10, 11, 12, 13, 14, 15, 16, 17, 18, 19]
+TEXTS = [f"question {i}" for i in range(10)]
+GROUPS = [[0, 1], [2, 3, 4]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = GroupStateStore(str(tmp_path), max_change=0.2)
+    store.save("http://bank", IDS, [text_hash(text) for text in TEXTS], GROUPS)
+    return store
+
+
+def plan(store, ids=IDS, texts=TEXTS, url="http://bank"):
+    return store.plan(url, ids, [text_hash(text) for text in texts])
+
+
+def test_unchanged_bank_keeps_its_groups(store):
+    assert plan(store) == (GROUPS, [], 0)
+
+
+def test_unknown_bank_is_grouped_from_scratch(store):
+    assert plan(store, url="http://other") is None
+
+
+def test_changed_question_leaves_its_group(store):
+    texts = list(TEXTS)
+    texts[2] = "edited question"
+    assert plan(store, texts=texts) == ([[0, 1], [3, 4]], [2], 0)
+
+
+def test_added_question_is_changed(store):
+    assert plan(store, ids=IDS + [20], texts=TEXTS + ["new question"]) == (GROUPS, [10], 0)
+
+
+def test_removed_question_dissolves_a_pair(store):
+    ids, texts = IDS[1:], TEXTS[1:]
+    # Rows shift by one after the first question is removed.
+    assert plan(store, ids=ids, texts=texts) == ([[1, 2, 3]], [], 1)
+
+
+def test_reordered_bank_maps_groups_by_id(store):
+    ids, texts = IDS[::-1], TEXTS[::-1]
+    assert plan(store, ids=ids, texts=texts) == ([[8, 9], [5, 6, 7]], [], 0)
+
+
+def test_too_many_changes_regroup_from_scratch(store):
+    texts = ["edited"] * 3 + TEXTS[3:]
+    assert plan(store, texts=texts) is None
+
+
+@pytest.mark.parametrize("ids", [[None] * 10, IDS[:9] + [10], IDS[:9] + [1.5]])
+def test_ids_must_be_unique_ints_or_strings(store, ids):
+    assert plan(store, ids=ids) is None
+
+
+def test_changed_settings_regroup_from_scratch(store, tmp_path):
+    path = store._path("http://bank")
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    state["settings"]["threshold"] = 0.5
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    assert plan(store) is None
+
+
+def test_disabled_store_never_plans():
+    assert GroupStateStore(None).plan("http://bank", IDS, [text_hash(text) for text in TEXTS]) is None
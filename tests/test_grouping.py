@@ -0,0 +1,134 @@
+import itertools
+import re
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.services.grouping_service import group_questions, iter_incremental_group_events, split_cluster
+from src.utils.clustering import UnionFind
+from src.utils.faiss_utils import SimpleVectorIndex
+
+_PROMPT_LINE = re.compile(r"^(\d+)\. (.*)$", re.MULTILINE)
+
+
+class TopicLLM:
+    """
+    Answers grouping prompts by grouping the questions with the same text,
+    and records the questions shown in each prompt.
+    """
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        shown = _PROMPT_LINE.findall(prompt)
+        self.prompts.append([text for _, text in shown])
+        positions = {}
+        for number, text in shown:
+            positions.setdefault(text, []).append(number)
+        lines = [f"Group {i}: {', '.join(numbers)}"
+                 for i, numbers in enumerate((n for n in positions.values() if len(n) > 1), start=1)]
+        return SimpleNamespace(text="\n".join(lines))
+
+
+def chained_bank(pairs=30, dim=32, seed=0):
+    """
+    Builds a bank of pairs of identical questions whose embeddings drift
+    slowly, so every pair is linked to the next and all rows form one
+    candidate cluster.
+    """
+    rng = np.random.default_rng(seed)
+    vector = rng.normal(size=dim)
+    embeddings, texts = [], []
+    for pair in range(pairs):
+        vector = vector + 0.15 * rng.normal(size=dim)
+        for _ in range(2):
+            embeddings.append(vector + 0.001 * rng.normal(size=dim))
+            texts.append(f"question {pair}")
+    order = rng.permutation(len(texts))
+    return [texts[i] for i in order], SimpleVectorIndex(np.array(embeddings, dtype=np.float32)[order])
+
+
+def test_union_find_components():
+    union_find = UnionFind(6)
+    union_find.union(0, 3)
+    union_find.union(3, 5)
+    union_find.union(1, 2)
+    assert union_find.find(5) == union_find.find(0)
+    assert union_find.components() == [[0, 3, 5], [1, 2], [4]]
+    assert union_find.components(min_size=2) == [[0, 3, 5], [1, 2]]
+
+
+def test_small_cluster_is_one_prompt():
+    assert split_cluster([1, 4, 7], 5, {1: {4}, 4: {1, 7}, 7: {4}}) == [[1, 4, 7]]
+
+
+@pytest.mark.parametrize("max_size", [2, 3, 5, 8])
+def test_split_cluster_covers_every_edge(max_size):
+    rng = np.random.default_rng(max_size)
+    cluster = list(range(40))
+    neighbours = {row: set() for row in cluster}
+    # A chain plus random extra edges.
+    edges = {(row, row + 1) for row in range(39)}
+    edges |= {tuple(sorted(rng.choice(40, 2, replace=False).tolist())) for _ in range(60)}
+    for a, b in edges:
+        neighbours[a].add(b)
+        neighbours[b].add(a)
+
+    chunks = split_cluster(cluster, max_size, neighbours)
+    assert all(2 <= len(chunk) <= max_size for chunk in chunks)
+    covered = {pair for chunk in chunks for pair in itertools.combinations(sorted(chunk), 2)}
+    assert edges <= covered
+
+
+def test_groups_spanning_prompts_are_found():
+    texts, index = chained_bank()
+    llm = TopicLLM()
+    groups = group_questions(llm, texts, index, threshold=0.5, top_k=4, max_cluster_size=6)
+    assert len(llm.prompts) > 1
+    assert all(len(prompt) <= 6 for prompt in llm.prompts)
+    expected = sorted(sorted(rows) for rows in _rows_by_text(texts).values())
+    assert groups == expected
+
+
+def test_verdicts_are_merged_across_prompts():
+    texts = ["a", "b", "c", "d"]
+    # Rows 0-1, 1-2 and 2-3 are neighbours; each prompt holds one of those pairs.
+    index = SimpleVectorIndex(np.array([[1, 0, 0], [1, 1, 0], [0, 1, 1], [0, 0, 1]], dtype=np.float32))
+
+    class ChainLLM:
+        def generate_content(self, prompt):
+            return SimpleNamespace(text="Group 1: 1, 2")
+
+    groups = group_questions(ChainLLM(), texts, index, threshold=0.4, top_k=2, max_cluster_size=2)
+    assert groups == [[0, 1, 2, 3]]
+
+
+def test_duplicate_groups_are_grouped_without_llm():
+    texts = ["x", "x", "y"]
+    index = SimpleVectorIndex(np.array([[1, 0], [1, 0], [0, 1]], dtype=np.float32))
+    llm = TopicLLM()
+    groups = group_questions(llm, texts, index, threshold=0.9, top_k=2, duplicate_groups=[[0, 1]])
+    assert groups == [[0, 1]]
+    assert llm.prompts == []
+
+
+def test_incremental_grouping_only_prompts_for_changed_rows():
+    texts, index = chained_bank(pairs=10)
+    by_text = _rows_by_text(texts)
+    known = sorted(sorted(rows) for text, rows in by_text.items() if text != "question 3")
+    changed = by_text["question 3"]
+
+    llm = TopicLLM()
+    events = list(iter_incremental_group_events(llm, texts, index, known, changed, threshold=0.5, top_k=4))
+    groups = sorted(event["rows"] for event in events if event["event"] == "group")
+    assert groups == sorted(sorted(rows) for rows in by_text.values())
+    assert all("question 3" in prompt for prompt in llm.prompts)
+
+
+def _rows_by_text(texts):
+    rows = {}
+    for row, text in enumerate(texts):
+        rows.setdefault(text, []).append(row)
+    return rows
@@ -0,0 +1,20 @@
+from src.utils import http_client
+from src.utils.http_client import get_session
+
+
+def test_session_is_shared_within_a_process():
+    assert get_session() is get_session()
+
+
+def test_session_is_recreated_after_fork(monkeypatch):
+    session = get_session()
+    monkeypatch.setattr(http_client.os, "getpid", lambda: -1)
+    assert get_session() is not session
+
+
+def test_session_pools_connections_and_retries_gets():
+    adapter = http_client._create_session().get_adapter("https://example.com")
+    assert adapter._pool_maxsize == http_client.HTTP_POOL_MAXSIZE
+    assert adapter.max_retries.total == http_client.HTTP_MAX_RETRIES
+    assert "GET" in adapter.max_retries.allowed_methods
+    assert 503 in adapter.max_retries.status_forcelist
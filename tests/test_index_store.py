@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from src.utils.faiss_utils import EMBEDDING_MODEL, SimpleVectorIndex
+from src.utils.index_store import IndexStoreError, open_index_file, read_index_header, write_index_file
+
+
+def test_round_trip_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "bank.idx")
+    index = SimpleVectorIndex(np.random.default_rng(0).random((5, 7), dtype=np.float32))
+    index.save(path, ids=[1, 2, 3, 4, 5], url="http://bank", content_hash="abc")
+
+    loaded, header = SimpleVectorIndex.load(path)
+    assert isinstance(loaded.normalized_embeddings, np.memmap)
+    assert not loaded.normalized_embeddings.flags.writeable
+    np.testing.assert_array_equal(loaded.normalized_embeddings, index.normalized_embeddings)
+    assert header["ids"] == [1, 2, 3, 4, 5]
+    assert (header["url"], header["content_hash"], header["model"]) == ("http://bank", "abc", EMBEDDING_MODEL)
+    assert (header["count"], header["dim"]) == (5, 7)
+
+    query = index.normalized_embeddings[2]
+    assert loaded.search(query, k=1)[1].tolist() == [[2]]
+
+
+def test_data_is_aligned(tmp_path):
+    path = str(tmp_path / "bank.idx")
+    write_index_file(path, np.ones((2, 3)), {"note": "x" * 13})
+    _, offset = read_index_header(path)
+    assert offset % 64 == 0
+
+
+def test_empty_index_round_trips(tmp_path):
+    path = str(tmp_path / "empty.idx")
+    write_index_file(path, np.empty((0, 4)), {})
+    embeddings, header = open_index_file(path)
+    assert embeddings.shape == (0, 4)
+
+
+def test_rewrite_replaces_the_file_atomically(tmp_path):
+    path = str(tmp_path / "bank.idx")
+    write_index_file(path, np.zeros((1, 2)), {"version": 1})
+    write_index_file(path, np.ones((3, 2)), {"version": 2})
+    embeddings, header = open_index_file(path)
+    assert header["version"] == 2
+    assert embeddings.shape == (3, 2)
+    assert [p.name for p in tmp_path.iterdir()] == ["bank.idx"]
+
+
+def test_missing_file_is_an_error(tmp_path):
+    with pytest.raises(IndexStoreError):
+        open_index_file(str(tmp_path / "missing.idx"))
+
+
+def test_unknown_format_is_an_error(tmp_path):
+    path = tmp_path / "bad.idx"
+    path.write_bytes(b"NOPE" + bytes(64))
+    with pytest.raises(IndexStoreError):
+        open_index_file(str(path))
+
+
+def test_truncated_file_is_an_error(tmp_path):
+    path = tmp_path / "bank.idx"
+    write_index_file(str(path), np.ones((10, 8)), {})
+    path.write_bytes(path.read_bytes()[:-4])
+    with pytest.raises(IndexStoreError):
+        open_index_file(str(path))
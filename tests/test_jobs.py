@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from src.services.job_service import JobManager
+
+
+class BlockingBankCache:
+    """
+    Delegates to a bank cache once released, so jobs stay running until then.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.release = threading.Event()
+
+    def get(self, url):
+        assert self.release.wait(5)
+        return self.cache.get(url)
+
+
+def wait_for(manager, job_id, statuses=("succeeded", "failed", "cancelled"), timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} is still {job['status']}")
+
+
+@pytest.fixture
+def grouping_url(bank_server, request):
+    path = f"/{request.node.name}.json"
+    bank_server.banks[path] = [
+        {"ID": 1, "Question": "How do I sort a python list?"},
+        {"ID": 2, "Question": "How can you sort a python list?"},
+        {"ID": 3, "Question": f"Which port does the {request.node.name} service use?"},
+    ]
+    return bank_server.url(path)
+
+
+@pytest.fixture
+def manager(tmp_path, fake_gemini):
+    from src.services.question_bank import question_bank_cache
+    manager = JobManager(BlockingBankCache(question_bank_cache), str(tmp_path), heartbeat_interval=0.05)
+    manager.llm = fake_gemini
+    yield manager
+    manager.bank_cache.release.set()
+    manager.stop()
+
+
+def test_job_groups_the_bank(manager, grouping_url):
+    manager.bank_cache.release.set()
+    job, deduplicated = manager.submit_group(grouping_url, user_id="alice")
+    assert (job["status"], deduplicated) == ("queued", False)
+    job = wait_for(manager, job["id"])
+    assert job["status"] == "succeeded"
+    assert [[q["ID"] for q in group] for group in job["result"]["matched_groups"]] == [[1, 2]]
+    assert job["progress"]["groups"] == 1
+
+
+def test_active_jobs_are_shared_per_user(manager, grouping_url):
+    first, _ = manager.submit_group(grouping_url, user_id="alice")
+    again, deduplicated = manager.submit_group(grouping_url, user_id="alice")
+    assert (again["id"], deduplicated) == (first["id"], True)
+    other, deduplicated = manager.submit_group(grouping_url, user_id="bob")
+    assert other["id"] != first["id"] and not deduplicated
+    assert manager.owner(other["id"]) == "bob"
+
+    manager.bank_cache.release.set()
+    wait_for(manager, first["id"])
+    # A finished job is not joined.
+    later, deduplicated = manager.submit_group(grouping_url, user_id="alice")
+    assert later["id"] != first["id"] and not deduplicated
+    wait_for(manager, later["id"])
+
+
+def test_cancelled_job_stops_and_is_not_joined(manager, grouping_url):
+    job, _ = manager.submit_group(grouping_url, user_id="alice")
+    assert manager.cancel(job["id"])["cancel_requested"]
+    replacement, deduplicated = manager.submit_group(grouping_url, user_id="alice")
+    assert replacement["id"] != job["id"] and not deduplicated
+    manager.bank_cache.release.set()
+    assert wait_for(manager, job["id"])["status"] == "cancelled"
+    wait_for(manager, replacement["id"])
+
+
+def test_orphaned_job_is_taken_over(manager, grouping_url):
+    manager.bank_cache.release.set()
+    job, _ = manager.submit_group(grouping_url, user_id="alice")
+    wait_for(manager, job["id"])
+    # Make the job look like it was running on a worker that stopped heartbeating.
+    manager._update(job["id"], status="running", result=None, heartbeat_at=time.time() - 60)
+    manager._maintain()
+    job = wait_for(manager, job["id"])
+    assert job["status"] == "succeeded" and job["result"]["response"] == "yes"
+
+
+def test_unknown_job_ids(manager):
+    assert manager.get("../../etc/passwd") is None
+    assert manager.get("0" * 32) is None
+    assert manager.cancel("0" * 32) is None
+
+
+def test_job_routes(client, auth, app, grouping_url):
+    from flask_jwt_extended import create_access_token
+    response = client.post("/jobs/group", headers=auth, json={"questions_url": grouping_url})
+    assert response.status_code == 202
+    job_id = response.get_json()["id"]
+    assert response.headers["Location"] == f"/jobs/{job_id}"
+
+    deadline = time.monotonic() + 5
+    while client.get(f"/jobs/{job_id}", headers=auth).get_json()["status"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    job = client.get(f"/jobs/{job_id}", headers=auth).get_json()
+    assert job["status"] == "succeeded"
+
+    with app.app_context():
+        other = {"Authorization": f"Bearer {create_access_token(identity='mallory')}"}
+    assert client.get(f"/jobs/{job_id}", headers=other).status_code == 404
+    assert client.delete(f"/jobs/{job_id}", headers=other).status_code == 404
+    assert client.post("/jobs/group", headers=auth, json={}).status_code == 400
+    assert client.post("/jobs/group", headers=auth,
+                       json={"questions_url": "http://example.com/bank.json"}).status_code == 403
+
+
+def test_all_domains_are_allowed_when_unrestricted(monkeypatch, bank_server, fake_gemini):
+    from flask import Flask
+    from flask_jwt_extended import JWTManager, create_access_token
+    from src.api.question_routes import register_question_routes
+    monkeypatch.delenv("ALLOWED_DOMAINS")
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "test-secret-key-with-at-least-32-bytes"
+    app.config["llm"] = fake_gemini
+    JWTManager(app)
+    register_question_routes(app, None)
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity='alice')}"}
+    # localhost is not 127.0.0.1, so it passes only when every domain is allowed.
+    url = bank_server.url("/unrestricted.json").replace("127.0.0.1", "localhost")
+    bank_server.banks["/unrestricted.json"] = [{"ID": 1, "Question": "What is an unrestricted bank?"}]
+    response = app.test_client().post("/group_similar_questions", headers=headers, json={"questions_url": url})
+    assert response.status_code == 200
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from src.utils.json_stream import iter_json_array
+
+DOCUMENT = [
+    {"ID": 1, "Question": "What is 2+2?"},
+    {"ID": 2, "Question": "Café — über 中文 \U0001F600", "tags": ["a", "b"]},
+    12345, -0.5e-3, "text", None, True, [], {},
+]
+
+
+def chunked(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10 ** 6])
+def test_parses_any_chunking(size):
+    data = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+    assert list(iter_json_array(chunked(data, size))) == DOCUMENT
+
+
+def test_number_split_across_chunks():
+    assert list(iter_json_array([b"[12", b"34, 5.", b"25]"])) == [1234, 5.25]
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"[]", []),
+    (b"  [ ]  ", []),
+    (b"\xef\xbb\xbf[1]", [1]),
+    (b"\n[1,\n 2]\n", [1, 2]),
+])
+def test_edge_documents(data, expected):
+    assert list(iter_json_array(chunked(data, 1))) == expected
+
+
+@pytest.mark.parametrize("data", [b"", b"{}", b"[1, 2", b"[1 2]", b"[1,]", b"[1] x", b"[tru]"])
+def test_rejects_malformed_documents(data):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(data, 2)))
+
+
+def test_yields_before_the_document_ends():
+    def chunks():
+        yield b'[{"ID": 1}, '
+        raise AssertionError("read past the first element")
+
+    assert next(iter_json_array(chunks())) == {"ID": 1}
@@ -0,0 +1,86 @@
+import logging
+import queue
+import threading
+
+import pytest
+
+from src.utils.logger_config import (
+    SensitiveDataFilter, _BlockingQueueListener, _BoundedQueueHandler, _ChannelRouter
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def record(message, name="flask-rag-app", level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, message, None, None)
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Login with password: hunter2", "Login with password: [REDACTED]"),
+    ("API_KEY: abc: extra", "API_KEY: [REDACTED]: extra"),
+    ("Processing check-question request", "Processing check-question request"),
+    ("Fetching questions from: http://bank/q.json", "Fetching questions from: http://bank/q.json"),
+    ("token without a value", "token without a value"),
+])
+def test_sensitive_values_are_redacted(message, expected):
+    log_record = record(message)
+    assert SensitiveDataFilter().filter(log_record)
+    assert log_record.msg == expected
+
+
+def test_router_sends_records_to_their_channel():
+    access, app, errors = ListHandler(), ListHandler(), ListHandler(logging.ERROR)
+    router = _ChannelRouter(channels={"access": [access]}, default=[app, errors])
+    router.handle(record("request", name="access"))
+    router.handle(record("working"))
+    router.handle(record("failed", name="src.services.question_bank", level=logging.ERROR))
+    assert [r.msg for r in access.records] == ["request"]
+    assert [r.msg for r in app.records] == ["working", "failed"]
+    assert [r.msg for r in errors.records] == ["failed"]
+
+
+def test_listener_writes_every_record_in_order():
+    log_queue = queue.Queue(maxsize=4)
+    target = ListHandler()
+    listener = _BlockingQueueListener(log_queue, _ChannelRouter(channels={}, default=[target]))
+    handler = _BoundedQueueHandler(log_queue)
+    logger = logging.getLogger("tests.logging.listener")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        listener.start()
+        threads = [threading.Thread(target=lambda t=t: [logger.warning(f"{t}-{i}") for i in range(50)])
+                   for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+    messages = [r.getMessage() for r in target.records]
+    assert len(messages) == 200
+    for t in range(4):
+        assert [m for m in messages if m.startswith(f"{t}-")] == [f"{t}-{i}" for i in range(50)]
+
+
+def test_full_queue_waits_instead_of_dropping():
+    log_queue = queue.Queue(maxsize=1)
+    handler = _BoundedQueueHandler(log_queue)
+    waits = _BoundedQueueHandler.full_waits
+    handler.handle(record("first"))
+    writer = threading.Thread(target=handler.handle, args=(record("second"),))
+    writer.start()
+    writer.join(0.1)
+    assert writer.is_alive()
+    assert log_queue.get().getMessage() == "first"
+    writer.join(5)
+    assert log_queue.get().getMessage() == "second"
+    assert _BoundedQueueHandler.full_waits == waits + 1
@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.utils.metrics import MetricsRegistry, server_timing_header
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def worker(sync_dir, pid, run, requests, active):
+    """
+    Writes the snapshot of another worker with a requests counter and an active gauge.
+    """
+    snapshot = {"pid": pid, "run": f"{pid}-{run}", "families": {
+        "requests_total": {"kind": "counter", "documentation": "Requests.", "labelnames": [], "buckets": [],
+                           "samples": [[[], requests]]},
+        "active": {"kind": "gauge", "documentation": "Active.", "labelnames": [], "buckets": [],
+                   "samples": [[[], active]]},
+    }}
+    with open(os.path.join(sync_dir, f"{pid}-{run}.json"), "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+
+
+def registry(sync_dir=None, requests=1, active=1):
+    registry = MetricsRegistry(sync_dir=sync_dir)
+    registry.counter("requests_total", "Requests.").inc(requests)
+    registry.add_collector(lambda: [("active", "gauge", "Active.", {}, active)])
+    return registry
+
+
+def value(text, name):
+    return next(float(line.split()[-1]) for line in text.splitlines() if line.startswith(name + " "))
+
+
+def test_render_counters_and_histograms():
+    registry = MetricsRegistry()
+    registry.counter("calls_total", "Calls.", ["method"]).inc(2, method="embed")
+    histogram = registry.histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 5):
+        histogram.observe(seconds, stage="llm")
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{method="embed"} 2' in text
+    assert 'latency_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="llm",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{stage="llm",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{stage="llm"} 3' in text
+    assert 'latency_seconds_sum{stage="llm"} 5.55' in text
+
+
+def test_server_timing_header():
+    assert server_timing_header({"fetch": 0.0041, "llm": 0.5}, total=0.6) == \
+        "fetch;dur=4.1, llm;dur=500.0, total;dur=600.0"
+
+
+def test_render_merges_live_workers(tmp_path):
+    worker(str(tmp_path), os.getppid(), "abc", requests=5, active=2)
+    text = registry(str(tmp_path)).render()
+    assert value(text, "requests_total") == 6
+    assert value(text, "active") == 3
+
+
+def test_exited_workers_are_retired(tmp_path):
+    sync_dir = str(tmp_path)
+    worker(sync_dir, exited_pid(), "abc", requests=5, active=2)
+    own = registry(sync_dir)
+    text = own.render()
+    assert value(text, "requests_total") == 6
+    assert value(text, "active") == 1
+
+    files = sorted(name for name in os.listdir(sync_dir) if name.endswith(".json"))
+    assert files == sorted([f"{own._run()}.json", "retired.json"])
+    # Retiring a second worker adds to the retired totals.
+    worker(sync_dir, exited_pid(), "def", requests=4, active=2)
+    assert value(own.render(), "requests_total") == 10
+
+
+def test_reused_pid_does_not_overwrite_an_old_snapshot(tmp_path):
+    sync_dir = str(tmp_path)
+    # A snapshot left by an exited process that had this process's pid.
+    worker(sync_dir, os.getpid(), "old", requests=5, active=2)
+    text = registry(sync_dir).render()
+    assert value(text, "requests_total") == 6
+    assert value(text, "active") == 1
+    assert not os.path.exists(os.path.join(sync_dir, f"{os.getpid()}-old.json"))
+
+
+def test_run_id_changes_after_a_fork(monkeypatch):
+    registry = MetricsRegistry()
+    run = registry._run()
+    assert registry._run() == run
+    monkeypatch.setattr(os, "getpid", lambda: 1)
+    assert registry._run().startswith("1-")
+    assert registry._run() != run
+
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    from src.api import metrics_routes
+    monkeypatch.setattr(metrics_routes, "METRICS_TOKEN", "secret")
+
+
+def test_metrics_are_served_to_local_clients(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE qsimcheck_http_request_duration_seconds histogram" in response.get_data(as_text=True)
+
+
+def test_metrics_without_token_are_hidden_from_other_hosts(client):
+    response = client.get("/metrics", environ_base={"REMOTE_ADDR": "203.0.113.7"})
+    assert response.status_code == 403
+
+
+def test_metrics_token_is_required_when_set(client, metrics_token):
+    remote = {"REMOTE_ADDR": "203.0.113.7"}
+    assert client.get("/metrics", environ_base=remote).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", environ_base=remote, headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
@@ -0,0 +1,195 @@
+import numpy as np
+import pytest
+
+from benchmarks.fake_gemini import FakeGemini
+from src.services import question_bank
+from src.services.question_bank import QuestionBankCache
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """
+    Replaces the bank's embedding call and records every text it embeds.
+    """
+    fake = FakeGemini(dim=16)
+    texts = []
+
+    def embed_texts(batch):
+        texts.extend(batch)
+        return np.array([fake.embed_vector(text) for text in batch], dtype=np.float32)
+
+    monkeypatch.setattr(question_bank, "embed_texts", embed_texts)
+    return texts
+
+
+def bank(*questions):
+    return [{"ID": i + 1, "Question": text} for i, text in enumerate(questions)]
+
+
+def test_fetch_cleans_texts_and_builds_index(bank_server, embedded):
+    bank_server.banks["/build.json"] = bank("<p>How do I sort a list?</p>", "What is a tuple?")
+    cache = QuestionBankCache()
+    result = cache.get(bank_server.url("/build.json"))
+    assert list(result.texts) == ["How do I sort a list?", "What is a tuple?"]
+    assert result.ids() == [1, 2]
+    assert result.questions[0]["Question"] == "<p>How do I sort a list?</p>"
+    assert len(result.index) == 2
+    assert embedded == ["How do I sort a list?", "What is a tuple?"]
+
+
+def test_not_modified_reuses_the_bank(bank_server, embedded):
+    bank_server.banks["/etag.json"] = bank("How do I sort a list?", "What is a tuple?")
+    url = bank_server.url("/etag.json")
+    cache = QuestionBankCache()
+    first = cache.get(url)
+    second = cache.get(url)
+    assert second is first
+    assert bank_server.count("/etag.json", 304) == 1
+    assert cache.stats()["not_modified"] == 1
+    assert len(embedded) == 2
+
+
+def test_fetch_without_index_defers_embedding(bank_server, embedded):
+    bank_server.banks["/lazy.json"] = bank("How do I sort a list?")
+    url = bank_server.url("/lazy.json")
+    cache = QuestionBankCache()
+    assert cache.get(url, build_index=False).index is None
+    assert embedded == []
+    assert cache.get(url).index is not None
+    assert embedded == ["How do I sort a list?"]
+
+
+def test_changed_bank_re_embeds_only_changed_rows(bank_server, embedded):
+    bank_server.banks["/delta.json"] = bank("How do I sort a list?", "What is a tuple?", "Explain recursion.")
+    url = bank_server.url("/delta.json")
+    cache = QuestionBankCache()
+    first = cache.get(url)
+    embedded.clear()
+
+    # Row 2 changes its text, row 4 is new, and row 1 keeps its text under a new ID.
+    bank_server.banks["/delta.json"] = [
+        {"ID": 10, "Question": "How do I sort a list?"},
+        {"ID": 2, "Question": "What is a frozen set?"},
+        {"ID": 3, "Question": "Explain recursion."},
+        {"ID": 4, "Question": "What is a generator?"},
+    ]
+    second = cache.get(url)
+    assert second is not first
+    assert sorted(embedded) == ["How do I sort a list?", "What is a frozen set?", "What is a generator?"]
+    stats = cache.stats()
+    assert (stats["reused_embeddings"], stats["new_embeddings"]) == (1, 6)
+    np.testing.assert_array_equal(second.embeddings[2], first.embeddings[2])
+
+
+def test_unchanged_content_without_validators_keeps_the_bank(bank_server, embedded):
+    bank_server.banks["/same.json"] = bank("How do I sort a list?")
+    url = bank_server.url("/same.json")
+    cache = QuestionBankCache()
+    first = cache.get(url)
+    first.etag = None
+    assert cache.get(url) is first
+    assert cache.stats()["unchanged_content"] == 1
+    assert len(embedded) == 1
+
+
+def test_invalid_json_raises_request_exception(bank_server, embedded):
+    bank_server.banks["/broken.json"] = {"not": "a list"}
+    with pytest.raises(question_bank.requests.exceptions.RequestException):
+        QuestionBankCache().get(bank_server.url("/broken.json"))
+
+
+def test_stored_index_is_shared_between_caches(bank_server, embedded, tmp_path):
+    bank_server.banks["/shared.json"] = bank("How do I sort a list?", "What is a tuple?")
+    url = bank_server.url("/shared.json")
+    first = QuestionBankCache(index_dir=str(tmp_path)).get(url)
+    embedded.clear()
+
+    # A second worker loads the stored index for the same content instead of embedding.
+    other = QuestionBankCache(index_dir=str(tmp_path))
+    second = other.get(url)
+    assert embedded == []
+    assert other.stats()["stored_index_loads"] == 1
+    assert isinstance(second.embeddings, np.memmap)
+    np.testing.assert_array_equal(second.embeddings, first.embeddings)
+
+
+def test_stored_index_of_other_content_is_ignored(bank_server, embedded, tmp_path):
+    bank_server.banks["/stale.json"] = bank("How do I sort a list?")
+    url = bank_server.url("/stale.json")
+    QuestionBankCache(index_dir=str(tmp_path)).get(url)
+    bank_server.banks["/stale.json"] = bank("What is a tuple?")
+    embedded.clear()
+    other = QuestionBankCache(index_dir=str(tmp_path))
+    other.get(url)
+    assert embedded == ["What is a tuple?"]
+    assert other.stats()["stored_index_loads"] == 0
+
+
+def test_ensure_index_builds_without_refetching(bank_server, embedded):
+    bank_server.banks["/ensure.json"] = bank("How do I sort a list?", "What is a tuple?")
+    url = bank_server.url("/ensure.json")
+    cache = QuestionBankCache()
+    fetched = cache.get(url, build_index=False)
+    indexed = cache.ensure_index(fetched)
+    assert indexed is fetched and indexed.index is not None
+    assert bank_server.count("/ensure.json") == 1
+    assert cache.ensure_index(indexed) is indexed
+    assert len(embedded) == 2
+    assert cache.stats()["bytes"] >= indexed.embeddings.nbytes
+
+
+def test_concurrent_ensure_index_builds_once(bank_server, embedded):
+    import threading
+    bank_server.banks["/ensure-many.json"] = bank("How do I sort a list?", "What is a tuple?")
+    cache = QuestionBankCache()
+    fetched = cache.get(bank_server.url("/ensure-many.json"), build_index=False)
+    threads = [threading.Thread(target=cache.ensure_index, args=(fetched,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fetched.index is not None
+    assert len(embedded) == 2
+
+
+def test_memory_usage_counts_mapped_embeddings_apart(bank_server, embedded, tmp_path):
+    bank_server.banks["/usage.json"] = bank("How do I sort a list?", "What is a tuple?")
+    url = bank_server.url("/usage.json")
+    usage = QuestionBankCache().get(url).memory_usage()
+    assert usage["embeddings"] == 2 * 16 * 4 and usage["mapped"] == 0
+    assert usage["resident"] == sum(value for name, value in usage.items() if name not in ("mapped", "resident"))
+
+    usage = QuestionBankCache(index_dir=str(tmp_path)).get(url).memory_usage()
+    assert usage["embeddings"] == 0 and usage["mapped"] == 2 * 16 * 4
+
+
+def test_memory_budget_evicts_large_cold_banks_first(bank_server, embedded):
+    for name in ("small-1", "small-2", "small-3"):
+        bank_server.banks[f"/{name}.json"] = bank(f"What is {name}?")
+    bank_server.banks["/large.json"] = bank(*(f"Large bank question {i}?" for i in range(300)))
+    sizes = {name: QuestionBankCache().get(bank_server.url(f"/{name}.json"), build_index=False)
+             .memory_usage()["resident"] for name in ("small-1", "large")}
+    cache = QuestionBankCache(max_bytes=3 * sizes["small-1"] + sizes["large"] - 1)
+
+    for name in ("small-1", "small-2", "large", "small-3"):
+        cache.get(bank_server.url(f"/{name}.json"), build_index=False)
+    # The large bank was used more recently than small-1 but is worth less per byte.
+    assert cache.peek(bank_server.url("/large.json"), 60) is None
+    assert cache.peek(bank_server.url("/small-1.json"), 60) is not None
+    stats = cache.stats()
+    assert (stats["banks"], stats["evictions"]) == (3, 1)
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_memory_budget_keeps_pinned_banks(bank_server, embedded):
+    bank_server.banks["/pinned-large.json"] = bank(*(f"Pinned bank question {i}?" for i in range(300)))
+    bank_server.banks["/pinned-small.json"] = bank("What is a pinned bank?")
+    large, small = bank_server.url("/pinned-large.json"), bank_server.url("/pinned-small.json")
+    cache = QuestionBankCache(max_bytes=1)
+    cache.pin(large, 60)
+    cache.get(large, build_index=False)
+    cache.get(small, build_index=False)
+    assert cache.peek(large, 60) is not None
+    # Nothing can be evicted: the large bank is pinned and the small one was just stored.
+    assert cache.stats()["banks"] == 2
+    assert cache.stats()["evictions"] == 0
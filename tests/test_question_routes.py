@@ -0,0 +1,207 @@
+import pytest
+
+BANK = [
+    {"ID": 1, "Question": "<p>How do I sort a python list?</p>"},
+    {"ID": 2, "Question": "What is a docker image?"},
+    {"ID": 3, "Question": "How can you reverse a git branch safely?"},
+    {"ID": 4, "Question": "Explain how to monitor a cron job."},
+]
+
+
+@pytest.fixture
+def bank_url(bank_server, request):
+    path = f"/{request.node.name}.json"
+    bank_server.banks[path] = BANK
+    return bank_server.url(path)
+
+
+def test_check_questions_answers_each_question(client, auth, bank_url):
+    questions = ["How do I sort a python list?", "What is the best way to sort a python list?",
+                 "What is the capital of France?"]
+    response = client.post("/check-questions", headers=auth, json={"questions_url": bank_url, "questions": questions})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["question"] for result in results] == questions
+    assert [result["response"] for result in results] == ["yes", "yes", "no"]
+    assert results[0]["decision_path"] == "exact_duplicate"
+    assert results[1]["decision_path"] == "llm"
+    assert [q["ID"] for q in results[1]["matched_questions"]] == [1]
+
+
+@pytest.mark.parametrize("body", [
+    {"questions": ["a"]},
+    {"questions_url": "http://127.0.0.1/x.json"},
+    {"questions_url": "http://127.0.0.1/x.json", "questions": []},
+    {"questions_url": "http://127.0.0.1/x.json", "questions": ["a", " "]},
+    {"questions_url": "http://127.0.0.1/x.json", "questions": "a"},
+])
+def test_check_questions_rejects_invalid_bodies(client, auth, body):
+    assert client.post("/check-questions", headers=auth, json=body).status_code == 400
+
+
+def test_check_questions_rejects_oversized_batches(client, auth, bank_url, monkeypatch):
+    from src.api import question_routes
+    monkeypatch.setattr(question_routes, "MAX_BATCH_QUESTIONS", 2)
+    response = client.post("/check-questions", headers=auth,
+                           json={"questions_url": bank_url, "questions": ["a", "b", "c"]})
+    assert response.status_code == 400
+
+
+def test_check_questions_rejects_other_domains(client, auth):
+    response = client.post("/check-questions", headers=auth,
+                           json={"questions_url": "http://example.com/bank.json", "questions": ["a"]})
+    assert response.status_code == 403
+
+
+def test_group_similar_questions_returns_groups(client, auth, bank_server):
+    bank_server.banks["/grouping.json"] = BANK + [
+        {"ID": 5, "Question": "<b>How can you sort a python list?</b>"},
+        {"ID": 6, "Question": "What is a docker image?"},
+    ]
+    response = client.post("/group_similar_questions", headers=auth,
+                           json={"questions_url": bank_server.url("/grouping.json")})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["response"] == "yes"
+    assert [[q["ID"] for q in group] for group in body["matched_groups"]] == [[1, 5], [2, 6]]
+
+
+def test_clear_cut_candidates_skip_the_llm(client, auth, bank_url, fake_gemini, monkeypatch):
+    from src.services import similarity_service
+    monkeypatch.setattr(similarity_service, "SIMILARITY_MATCH_THRESHOLD", 0.95)
+    monkeypatch.setattr(similarity_service, "SIMILARITY_NO_MATCH_THRESHOLD", 0.3)
+    monkeypatch.setattr(similarity_service, "SIMILARITY_RELEVANCE_FLOOR", 0.3)
+    prompts = fake_gemini.calls["generate_content"]
+    response = client.post("/check-question", headers=auth,
+                           json={"questions_url": bank_url, "question": "Python list: how to sort it?"})
+    body = response.get_json()
+    assert body["decision_path"] == "similarity_match"
+    assert [q["ID"] for q in body["matched_questions"]] == [1]
+    assert fake_gemini.calls["generate_content"] == prompts
+
+
+def test_unchanged_answer_is_revalidated_with_etag(client, auth, bank_server, bank_url):
+    path = bank_url.rsplit("/", 1)[-1]
+    body = {"questions_url": bank_url, "question": "What is the capital of Peru?"}
+    first = client.post("/check-question", headers=auth, json=body)
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    etag = first.headers["ETag"]
+    requests = bank_server.count(f"/{path}")
+
+    # The bank was just revalidated, so the 304 is sent without asking the bank server.
+    second = client.post("/check-question", headers=dict(auth, **{"If-None-Match": etag}), json=body)
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert bank_server.count(f"/{path}") == requests
+
+
+def test_etag_is_revalidated_upstream_once_the_interval_passed(client, auth, bank_server, bank_url, monkeypatch):
+    from src.api import question_routes
+    path = f"/{bank_url.rsplit('/', 1)[-1]}"
+    body = {"questions_url": bank_url, "question": "What is the best way to sort a python list?"}
+    first = client.post("/check-question", headers=auth, json=body)
+    assert first.get_json()["response"] == "yes"
+    etag = first.headers["ETag"]
+    monkeypatch.setattr(question_routes, "BANK_REVALIDATE_INTERVAL", 0)
+
+    not_modified = bank_server.count(path, 304)
+    response = client.post("/check-question", headers=dict(auth, **{"If-None-Match": etag}), json=body)
+    assert response.status_code == 304
+    assert bank_server.count(path, 304) == not_modified + 1
+
+    # Once the bank changes, the answer is recomputed.
+    bank_server.banks[path] = BANK[1:]
+    response = client.post("/check-question", headers=dict(auth, **{"If-None-Match": etag}), json=body)
+    assert response.status_code == 200
+    assert response.get_json()["response"] == "no"
+    assert response.headers["ETag"] != etag
+
+
+def test_grouping_answer_is_revalidated_with_etag(client, auth, bank_server):
+    bank_server.banks["/etag-groups.json"] = BANK + [{"ID": 5, "Question": "How can you sort a python list?"}]
+    body = {"questions_url": bank_server.url("/etag-groups.json")}
+    etag = client.post("/group_similar_questions", headers=auth, json=body).headers["ETag"]
+    requests = bank_server.count("/etag-groups.json")
+    response = client.post("/group_similar_questions", headers=dict(auth, **{"If-None-Match": etag}), json=body)
+    assert response.status_code == 304
+    assert bank_server.count("/etag-groups.json") == requests
+
+
+def test_cold_check_fetches_the_bank_once(client, auth, bank_server):
+    bank_server.banks["/cold.json"] = BANK
+    response = client.post("/check-question", headers=auth,
+                           json={"questions_url": bank_server.url("/cold.json"), "question": "What is a cold start?"})
+    assert response.status_code == 200
+    assert bank_server.count("/cold.json") == 1
+
+
+def grouping_bank(topic):
+    # A distinct last question keeps each test's bank out of the response cache.
+    return BANK + [
+        {"ID": 5, "Question": "<b>How can you sort a python list?</b>"},
+        {"ID": 6, "Question": "What is a docker image?"},
+        {"ID": 7, "Question": f"Who maintains the {topic} release notes?"},
+    ]
+
+
+def test_grouping_streams_ndjson_events(client, auth, bank_server):
+    import json
+    bank_server.banks["/stream.json"] = grouping_bank("ndjson")
+    response = client.post("/group_similar_questions?stream=ndjson", headers=auth,
+                           json={"questions_url": bank_server.url("/stream.json")})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[0] == {"event": "progress", "stage": "fetch", "status": "started"}
+    groups = sorted([q["ID"] for q in event["questions"]] for event in events if event["event"] == "group")
+    assert groups == [[1, 5], [2, 6]]
+    summary = events[-1]
+    assert (summary["event"], summary["groups"], summary["questions"], summary["cached"]) == ("summary", 2, 7, False)
+
+    # The stream's result answers the next request from the response cache.
+    response = client.post("/group_similar_questions", headers=auth,
+                           json={"questions_url": bank_server.url("/stream.json")})
+    assert [[q["ID"] for q in group] for group in response.get_json()["matched_groups"]] == [[1, 5], [2, 6]]
+
+
+def test_grouping_streams_server_sent_events(client, auth, bank_server):
+    import json
+    bank_server.banks["/stream-sse.json"] = grouping_bank("sse")
+    response = client.post("/group_similar_questions", headers=dict(auth, Accept="text/event-stream"),
+                           json={"questions_url": bank_server.url("/stream-sse.json")})
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    messages = response.get_data(as_text=True).strip().split("\n\n")
+    for message in messages:
+        name, data = message.split("\n")
+        assert name.startswith("event: ") and data.startswith("data: ")
+        assert json.loads(data[len("data: "):])["event"] == name[len("event: "):]
+    assert messages[-1].startswith("event: summary\n")
+
+
+def test_grouping_stream_reports_errors_as_events(client, auth, bank_server):
+    import json
+    bank_server.banks["/stream-empty.json"] = []
+    response = client.post("/group_similar_questions?stream=ndjson", headers=auth,
+                           json={"questions_url": bank_server.url("/stream-empty.json")})
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[-1] == {"event": "error", "error": "No questions found"}
+
+
+def test_changed_bank_is_regrouped_incrementally(client, auth, bank_server):
+    import json
+    bank = grouping_bank("incremental")
+    bank_server.banks["/incremental.json"] = bank
+    url = bank_server.url("/incremental.json")
+
+    def cluster_progress():
+        response = client.post("/group_similar_questions?stream=ndjson", headers=auth, json={"questions_url": url})
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        return next(event for event in events if event.get("stage") == "cluster" and event["status"] == "done")
+
+    assert cluster_progress()["mode"] == "full"
+    bank_server.banks["/incremental.json"] = bank + [{"ID": 8, "Question": "Is a docker image a container?"}]
+    progress = cluster_progress()
+    assert (progress["mode"], progress["changed"], progress["removed"]) == ("incremental", 1, 0)
@@ -0,0 +1,63 @@
+import time
+
+from src.services.response_cache import _ENTRY_OVERHEAD, ResponseCache
+
+
+def test_round_trip_with_stable_etag():
+    cache = ResponseCache()
+    key = cache.make_key("check_question", "hash", ["What is a tuple?"])
+    etag = cache.set(key, {"response": "no", "decision_path": "llm"})
+    assert cache.get(key) == ({"response": "no", "decision_path": "llm"}, etag)
+    assert ResponseCache().set(key, {"decision_path": "llm", "response": "no"}) == etag
+
+
+def test_keys_normalize_questions_and_track_content_and_models():
+    cache = ResponseCache()
+    key = cache.make_key("check_question", "hash", ["What is a  Tuple?"])
+    assert key == cache.make_key("check_question", "hash", ["what is a tuple?"])
+    assert key != cache.make_key("check_question", "other", ["what is a tuple?"])
+    assert key != cache.make_key("group_similar_questions", "hash", ["what is a tuple?"])
+    assert key != ResponseCache(models=("other",)).make_key("check_question", "hash", ["what is a tuple?"])
+
+
+def test_expired_responses_are_misses(monkeypatch):
+    cache = ResponseCache(ttl=10)
+    cache.set("a", {"response": "no"})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_byte_budget_evicts_least_recently_used():
+    body = {"matched_groups": ["x" * 1000]}
+    size = len('{"matched_groups":["' + "x" * 1000 + '"]}') + _ENTRY_OVERHEAD
+    cache = ResponseCache(max_bytes=size * 2)
+    cache.set("a", body)
+    cache.set("b", body)
+    cache.get("a")
+    cache.set("c", body)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == size * 2
+
+
+def test_oversized_bodies_are_not_stored():
+    cache = ResponseCache(max_bytes=1000)
+    etag = cache.set("a", {"matched_groups": ["x" * 1000]})
+    assert etag
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_replacing_a_body_updates_the_bytes():
+    cache = ResponseCache()
+    cache.set("a", {"response": "x" * 100})
+    cache.set("a", {"response": "no"})
+    assert cache.stats()["bytes"] == len('{"response":"no"}') + _ENTRY_OVERHEAD
+
+
+def test_zero_entries_disables_the_cache():
+    cache = ResponseCache(max_entries=0)
+    assert cache.set("a", {"response": "no"})
+    assert cache.get("a") is None
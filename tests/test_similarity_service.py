@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from src.services import similarity_service
+from src.services.similarity_service import (
+    decision_path, parse_batch_matches, parse_groups, parse_match_numbers, triage_candidates
+)
+from src.utils.calibration import NEVER_MATCH, NEVER_REJECT, evaluate_thresholds, fit_thresholds
+
+
+def test_triage_decides_clear_cut_candidates():
+    assert triage_candidates([0.99, 0.85, 0.5], 0.97, 0.7, 0.7) == [True, None, False]
+
+
+def test_triage_rejects_all_when_best_is_below_no_match():
+    assert triage_candidates([0.6, 0.4], 0.97, 0.7, 0.7) == [False, False]
+
+
+def test_triage_of_no_candidates():
+    assert triage_candidates([], 0.97, 0.7, 0.7) == []
+
+
+def test_triage_bands_are_disabled():
+    scores = [1.0, 0.5, -0.5]
+    assert triage_candidates(scores, NEVER_MATCH, NEVER_REJECT, NEVER_REJECT) == [None, None, None]
+
+
+def test_triage_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(similarity_service, "SIMILARITY_MATCH_THRESHOLD", NEVER_MATCH)
+    monkeypatch.setattr(similarity_service, "SIMILARITY_NO_MATCH_THRESHOLD", NEVER_REJECT)
+    monkeypatch.setattr(similarity_service, "SIMILARITY_RELEVANCE_FLOOR", NEVER_REJECT)
+    assert triage_candidates([0.999, 0.1]) == [None, None]
+
+
+@pytest.mark.parametrize("triaged, verdicts, llm_called, duplicate, expected", [
+    ([], [], False, "exact", "exact_duplicate"),
+    ([], [], False, "near", "near_duplicate"),
+    ([None, False], [True, False], True, None, "llm"),
+    ([None, False], [True, False], False, None, "verdict_cache"),
+    ([True, False], [True, False], False, None, "similarity_match"),
+    ([False, False], [False, False], False, None, "similarity_no_match"),
+])
+def test_decision_path(triaged, verdicts, llm_called, duplicate, expected):
+    assert decision_path(triaged, verdicts, llm_called, duplicate=duplicate) == expected
+
+
+def test_fitted_thresholds_reach_the_target_precision():
+    rng = np.random.default_rng(0)
+    scores = np.concatenate([rng.uniform(0.9, 1.0, 200), rng.uniform(0.6, 0.95, 400), rng.uniform(0.2, 0.7, 400)])
+    labels = np.concatenate([np.ones(200), rng.random(400) < 0.5, np.zeros(400)]).astype(bool)
+    match, no_match = fit_thresholds(scores, labels, target_precision=0.99)
+    assert NEVER_REJECT < no_match <= match < NEVER_MATCH
+    report = evaluate_thresholds(scores, labels, match, no_match)
+    assert report["auto_match_precision"] >= 0.99
+    assert report["auto_reject_precision"] >= 0.99
+    assert report["llm"] < len(scores)
+
+
+def test_unreachable_precision_disables_the_bands():
+    scores = np.linspace(0, 1, 100)
+    labels = np.arange(100) % 2 == 0
+    assert fit_thresholds(scores, labels, target_precision=0.99) == (NEVER_MATCH, NEVER_REJECT)
+
+
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1, 3", [0, 2]),
+    (" 2 ,2, 1 ", [1, 0]),
+    ("0, 4, 6", [3]),
+    ("one, 2", [1]),
+    ("", []),
+    (None, []),
+])
+def test_parse_match_numbers(text, expected):
+    assert parse_match_numbers(text, 5) == expected
+
+
+def test_parse_batch_matches():
+    text = "Q1: 1, 3\nq2: none\n**Q3**: 2\nQ9: 1\nnoise"
+    assert parse_batch_matches(text, [3, 2, 2]) == [[0, 2], [], [1]]
+
+
+def test_parse_batch_matches_of_empty_answer():
+    assert parse_batch_matches("", [2, 2]) == [[], []]
+
+
+def test_parse_groups():
+    text = "Group 1: 1, 4, 7\nGroup 2: 2, 5\nGroup 3: 3\nGroup 4: 6, 6, 9\nNo groups here"
+    assert parse_groups(text, 8) == [[0, 3, 6], [1, 4]]
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.single_flight import SingleFlight, file_lock
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+    start = threading.Barrier(count)
+
+    def run(i):
+        start.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def build():
+        calls.append(1)
+        release.wait(5)
+        return "bank"
+
+    def call():
+        return flights.do("url", build)
+
+    threading.Timer(0.2, release.set).start()
+    results = run_concurrently(8, call)
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["bank"] * 8
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert flights.in_flight() == 0
+
+
+def test_waiters_receive_the_leaders_error():
+    flights = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("bank server down")
+
+    results = run_concurrently(4, lambda: flights.do("url", fail))
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_later_calls_run_again():
+    flights = SingleFlight()
+    assert flights.do("url", lambda: 1) == (1, False)
+    assert flights.do("url", lambda: 2) == (2, False)
+
+
+def test_keys_do_not_coalesce():
+    flights = SingleFlight()
+    release = threading.Event()
+    threading.Timer(0.2, release.set).start()
+    results = run_concurrently(2, lambda: flights.do(threading.current_thread().name, lambda: release.wait(5)))
+    assert [shared for _, shared in results] == [False, False]
+
+
+def test_file_lock_excludes_other_holders(tmp_path):
+    path = str(tmp_path / "bank.lock")
+    holding = []
+    overlaps = []
+
+    def hold():
+        with file_lock(path) as locked:
+            holding.append(locked)
+            overlaps.append(len(holding))
+            time.sleep(0.05)
+            holding.pop()
+
+    run_concurrently(4, hold)
+    assert overlaps == [1, 1, 1, 1]
+
+
+def test_file_lock_times_out_without_failing(tmp_path):
+    path = str(tmp_path / "bank.lock")
+    with file_lock(path) as first:
+        with file_lock(path, timeout=0.1) as second:
+            assert (first, second) == (True, False)
+
+
+@pytest.fixture
+def slow_bank(bank_server, monkeypatch):
+    from src.services import question_bank
+    bank_server.banks["/coalesced.json"] = [{"ID": 1, "Question": "What is a tuple?"}]
+
+    def embed_texts(texts):
+        time.sleep(0.2)
+        return question_bank.np.ones((len(texts), 4), dtype=question_bank.np.float32)
+
+    monkeypatch.setattr(question_bank, "embed_texts", embed_texts)
+    return bank_server.url("/coalesced.json")
+
+
+def test_concurrent_bank_requests_fetch_once(bank_server, slow_bank):
+    from src.services.question_bank import QuestionBankCache
+    cache = QuestionBankCache()
+    banks = run_concurrently(6, lambda: cache.get(slow_bank))
+    assert all(bank is banks[0] for bank in banks)
+    assert bank_server.count("/coalesced.json") == 1
+    assert cache.stats()["coalesced"] == 5
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from src.utils.faiss_utils import SimpleVectorIndex, top_k
+
+
+def brute_force(embeddings, queries, k):
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ normalized.T
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, order, axis=1), order
+
+
+@pytest.mark.parametrize("k", [1, 5, 200, 500])
+def test_search_matches_brute_force(k):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((200, 32)).astype(np.float32)
+    queries = rng.standard_normal((7, 32)).astype(np.float32)
+    scores, rows = SimpleVectorIndex(embeddings).search(queries, k=k)
+    expected_scores, expected_rows = brute_force(embeddings, queries, k)
+    assert scores.shape == rows.shape == (7, min(k, 200))
+    np.testing.assert_allclose(scores, expected_scores, atol=1e-5)
+    np.testing.assert_array_equal(rows, expected_rows)
+
+
+def test_single_query_returns_one_row():
+    embeddings = np.eye(4, dtype=np.float32)
+    scores, rows = SimpleVectorIndex(embeddings).search(np.array([0, 0, 2, 0.1]), k=2)
+    assert rows.tolist() == [[2, 3]]
+    assert scores[0, 0] == pytest.approx(0.99875, abs=1e-4)
+
+
+def test_zero_vector_does_not_produce_nan():
+    index = SimpleVectorIndex(np.array([[0, 0], [1, 0]], dtype=np.float32))
+    scores, _ = index.search(np.array([[0, 0]]), k=2)
+    assert not np.isnan(scores).any()
+
+
+def test_top_k_sorts_partial_selection():
+    similarities = np.array([[0.1, 0.9, 0.5, 0.7], [0.3, 0.2, 0.8, 0.0]])
+    scores, rows = top_k(similarities, 2)
+    assert rows.tolist() == [[1, 3], [2, 0]]
+    np.testing.assert_array_equal(scores, [[0.9, 0.7], [0.8, 0.3]])
+    assert top_k(similarities, 0)[1].shape == (2, 0)
@@ -0,0 +1,90 @@
+import json
+import time
+
+from src.services.verdict_cache import VerdictCache
+
+
+def test_record_and_lookup_are_normalized():
+    cache = VerdictCache()
+    cache.record("How do I  sort a list?", ["Sorting a list", "What is a tuple?"], [0])
+    assert cache.lookup("how do i sort a LIST?", ["sorting a  list", "what is a tuple?", "other"]) == [True, False, None]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_keys_depend_on_the_model():
+    assert VerdictCache(model="a").make_key("q", "c") != VerdictCache(model="b").make_key("q", "c")
+
+
+def test_expired_verdicts_are_misses(monkeypatch):
+    cache = VerdictCache(ttl=10)
+    key = cache.make_key("q", "c")
+    cache.set(key, True)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get(key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_verdicts_are_evicted():
+    cache = VerdictCache(max_entries=2)
+    cache.set("a", True)
+    cache.set("b", False)
+    cache.get("a")
+    cache.set("c", True)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (True, None, True)
+
+
+def test_save_merges_verdicts_of_other_workers(tmp_path):
+    path = str(tmp_path / "verdicts.json")
+    first, second = VerdictCache(path=path), VerdictCache(path=path)
+    first.set("a", True)
+    second.set("b", False)
+    first.save()
+    second.save()
+    with open(path, encoding="utf-8") as f:
+        assert set(json.load(f)) == {"a", "b"}
+    assert VerdictCache(path=path).get("a") is True
+    assert list(tmp_path.iterdir()) == [tmp_path / "verdicts.json"]
+
+
+def test_save_keeps_the_newest_verdict(tmp_path):
+    path = str(tmp_path / "verdicts.json")
+    first, second = VerdictCache(path=path), VerdictCache(path=path)
+    first.set("a", True)
+    first.save()
+    second.set("a", False)
+    second.save()
+    first.save()
+    assert first.get("a") is False
+
+
+def test_expired_verdicts_are_not_loaded(tmp_path):
+    path = tmp_path / "verdicts.json"
+    path.write_text(json.dumps({"old": [True, time.time() - 100], "new": [False, time.time()]}))
+    cache = VerdictCache(ttl=50, path=str(path))
+    assert (cache.get("old"), cache.get("new")) == (None, False)
+
+
+def test_flush_saves_only_when_dirty(tmp_path):
+    path = tmp_path / "verdicts.json"
+    cache = VerdictCache(path=str(path))
+    cache.flush()
+    assert not path.exists()
+    cache.set("a", True)
+    cache.flush()
+    assert json.loads(path.read_text())["a"][0] is True
+
+
+def test_flusher_saves_in_the_background(tmp_path):
+    path = tmp_path / "verdicts.json"
+    cache = VerdictCache(path=str(path), save_interval=0.01)
+    cache.start()
+    try:
+        cache.set("a", True)
+        deadline = time.time() + 5
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.01)
+        assert path.exists()
+    finally:
+        cache.stop()
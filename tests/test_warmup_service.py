@@ -0,0 +1,101 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.warmup_service import BankWarmer
+
+
+class FakeBankCache:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.fetched = []
+        self.pinned = {}
+
+    def get(self, url, refresh=False):
+        self.fetched.append(url)
+        if url in self.fail:
+            raise RuntimeError("bank server down")
+        return SimpleNamespace(questions=[{"ID": 1}, {"ID": 2}])
+
+    def pin(self, url, max_age):
+        self.pinned[url] = max_age
+
+    def unpin(self, url):
+        self.pinned.pop(url, None)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def bank_cache():
+    return FakeBankCache(fail={"http://bank/down.json"})
+
+
+def test_register_warms_and_pins_the_bank(bank_cache):
+    warmer = BankWarmer(bank_cache, refresh_interval=100)
+    warmer.register("http://bank/a.json")
+    wait_for(lambda: warmer.status("http://bank/a.json")["status"] == "warm")
+    assert warmer.status("http://bank/a.json")["questions"] == 2
+    assert bank_cache.pinned == {"http://bank/a.json": 150}
+
+
+def test_failed_warm_up_is_reported(bank_cache):
+    warmer = BankWarmer(bank_cache)
+    warmer.register("http://bank/down.json")
+    wait_for(lambda: warmer.status("http://bank/down.json")["status"] == "error")
+    assert warmer.status("http://bank/down.json")["last_error"] == "bank server down"
+
+
+def test_unregister_unpins_the_bank(bank_cache):
+    warmer = BankWarmer(bank_cache)
+    warmer.register("http://bank/a.json")
+    assert warmer.unregister("http://bank/a.json")
+    assert not warmer.unregister("http://bank/a.json")
+    assert bank_cache.pinned == {}
+    assert warmer.status() == []
+
+
+def test_registry_is_shared_between_workers(bank_cache, tmp_path):
+    first = BankWarmer(bank_cache, registry_dir=str(tmp_path))
+    second_cache = FakeBankCache()
+    second = BankWarmer(second_cache, registry_dir=str(tmp_path))
+
+    first.register("http://bank/a.json")
+    wait_for(lambda: second.status("http://bank/a.json")["status"] == "warm")
+    second.sync()
+    wait_for(lambda: second_cache.fetched == ["http://bank/a.json"])
+    assert "http://bank/a.json" in second_cache.pinned
+
+    first.unregister("http://bank/a.json")
+    second.sync()
+    assert second_cache.pinned == {}
+    assert second.status() == []
+
+
+def test_registry_survives_a_restart(bank_cache, tmp_path):
+    BankWarmer(bank_cache, registry_dir=str(tmp_path)).register("http://bank/a.json")
+    restarted = BankWarmer(FakeBankCache(), registry_dir=str(tmp_path))
+    restarted.start()
+    try:
+        assert [entry["questions_url"] for entry in restarted.status()] == ["http://bank/a.json"]
+        wait_for(lambda: "http://bank/a.json" in restarted.bank_cache.pinned)
+    finally:
+        restarted.stop()
+
+
+def test_pinned_bank_is_served_without_revalidation(bank_server):
+    from src.services.question_bank import QuestionBankCache
+    bank_server.banks["/pinned.json"] = [{"ID": 1, "Question": "What is a tuple?"}]
+    url = bank_server.url("/pinned.json")
+    cache = QuestionBankCache()
+    cache.pin(url, 60)
+    cache.get(url, build_index=False)
+    cache.get(url, build_index=False)
+    assert bank_server.count("/pinned.json") == 1
+    assert cache.stats()["warm_hits"] == 1
@@ -0,0 +1,93 @@
+"""
+Fits the similarity thresholds used to skip the LLM on clear-cut candidates.
+
+Input is a labelled set of (new question, candidate) pairs, as JSON Lines
+or a JSON array:
+
+    {"question": "How do I check my Python version?",
+     "candidate": "What is the command to see the installed Python version?",
+     "match": true}
+
+Pairs may carry a precomputed "score" (cosine similarity); otherwise both
+texts are cleaned and embedded with the same model the service uses, which
+needs GEMINI_API_KEY. The best labelled sets are real candidates from the
+service's top 5 with the LLM's (or a reviewer's) verdict.
+
+The fitted values are printed as .env lines together with how many pairs
+each band would have decided and with what precision.
+
+Usage:
+    python -m tools.calibrate_thresholds labelled_pairs.jsonl --target-precision 0.99
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.utils import clean_html, embed_texts
+from src.utils.calibration import fit_thresholds, evaluate_thresholds
+
+
+def load_pairs(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def score_pairs(pairs):
+    """
+    Returns the cosine similarity of every pair, embedding the ones without a score.
+    """
+    scores = np.array([pair.get("score", np.nan) for pair in pairs], dtype=np.float64)
+    missing = [i for i, score in enumerate(scores) if np.isnan(score)]
+    if missing:
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        questions = embed_texts([clean_html(pairs[i]["question"]) for i in missing])
+        candidates = embed_texts([clean_html(pairs[i]["candidate"]) for i in missing])
+        questions /= np.linalg.norm(questions, axis=1, keepdims=True) + 1e-8
+        candidates /= np.linalg.norm(candidates, axis=1, keepdims=True) + 1e-8
+        scores[missing] = np.sum(questions * candidates, axis=1)
+    return scores
+
+
+def format_precision(value):
+    return "n/a" if value is None else f"{value:.4f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pairs", help="labelled pairs (.jsonl or .json)")
+    parser.add_argument("--target-precision", type=float, default=0.99,
+                        help="required precision of automatic yes and no answers")
+    parser.add_argument("--min-support", type=int, default=20,
+                        help="minimum labelled pairs an automatic band must cover")
+    args = parser.parse_args()
+    load_dotenv()
+
+    pairs = load_pairs(args.pairs)
+    labels = np.array([bool(pair["match"]) for pair in pairs])
+    if labels.all() or not labels.any():
+        sys.exit("The labelled set needs both matching and non-matching pairs.")
+    scores = score_pairs(pairs)
+
+    match_threshold, no_match_threshold = fit_thresholds(scores, labels, args.target_precision, args.min_support)
+    report = evaluate_thresholds(scores, labels, match_threshold, no_match_threshold)
+
+    print(f"{report['pairs']} labelled pairs, {report['matches']} matches")
+    print(f"auto yes: {report['auto_match']} pairs, precision {format_precision(report['auto_match_precision'])}")
+    print(f"auto no:  {report['auto_reject']} pairs, precision {format_precision(report['auto_reject_precision'])}")
+    print(f"LLM:      {report['llm']} pairs ({1 - report['decided_without_llm']:.1%})")
+    print()
+    print(f"SIMILARITY_MATCH_THRESHOLD={match_threshold:.4f}")
+    print(f"SIMILARITY_NO_MATCH_THRESHOLD={no_match_threshold:.4f}")
+    print(f"SIMILARITY_RELEVANCE_FLOOR={no_match_threshold:.4f}")
+
+
+if __name__ == "__main__":
+    main()
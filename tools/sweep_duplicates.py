@@ -0,0 +1,102 @@
+"""
+Finds near-duplicate questions across the question banks in the index store.
+
+Every stored index (one .idx file per questions_url, written by the
+service) is memory-mapped and all rows are compared with each other using
+the tiled all-pairs search, so peak memory stays within
+ALL_PAIRS_MEMORY_BUDGET_MB however many banks are swept. Pairs are
+printed as JSON Lines, best first:
+
+    {"score": 0.97, "a": {"url": "...", "id": 12}, "b": {"url": "...", "id": 40}}
+
+By default only pairs from different banks are reported. No Gemini call
+is made; banks the service has not indexed yet are not included.
+
+Usage:
+    python -m tools.sweep_duplicates --threshold 0.92 --workers 4 > duplicates.jsonl
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.utils.all_pairs import all_pairs_neighbours, neighbour_pairs
+from src.utils.index_store import IndexStoreError, open_index_file
+
+
+def load_banks(paths):
+    """
+    Memory-maps the index files, skipping unreadable ones and those built
+    with another embedding model or dimension than the first.
+
+    Returns:
+        A list of (header, embeddings) pairs.
+    """
+    banks = []
+    for path in paths:
+        try:
+            embeddings, header = open_index_file(path)
+        except IndexStoreError as e:
+            print(f"skipping {path}: {e}", file=sys.stderr)
+            continue
+        if banks and (header.get("model"), header["dim"]) != (banks[0][0].get("model"), banks[0][0]["dim"]):
+            print(f"skipping {path}: built with {header.get('model')}, dim {header['dim']}", file=sys.stderr)
+            continue
+        if len(embeddings):
+            banks.append((header, embeddings))
+    return banks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="index files (default: every .idx file in INDEX_STORE_DIR)")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="minimum cosine similarity (default: GROUP_SIMILARITY_THRESHOLD)")
+    parser.add_argument("-k", type=int, default=10, help="neighbours kept per question")
+    parser.add_argument("--memory-mb", type=float, default=None,
+                        help="peak memory budget (default: ALL_PAIRS_MEMORY_BUDGET_MB)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: ALL_PAIRS_WORKERS, or one per CPU)")
+    parser.add_argument("--include-within", action="store_true", help="also report pairs inside one bank")
+    args = parser.parse_args()
+    load_dotenv()
+
+    threshold = args.threshold if args.threshold is not None else float(os.getenv("GROUP_SIMILARITY_THRESHOLD", "0.8"))
+    paths = args.paths or sorted(glob.glob(os.path.join(os.getenv("INDEX_STORE_DIR", "cache/indexes"), "*.idx")))
+    banks = load_banks(paths)
+    if not banks:
+        sys.exit("No index files to sweep.")
+
+    headers = [header for header, _ in banks]
+    sizes = np.array([len(embeddings) for _, embeddings in banks])
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    embeddings = np.concatenate([embeddings for _, embeddings in banks])
+    print(f"sweeping {len(embeddings)} questions from {len(banks)} banks", file=sys.stderr)
+
+    start = time.perf_counter()
+    graph = all_pairs_neighbours(embeddings, threshold, k=args.k,
+                                 memory_budget=args.memory_mb and args.memory_mb * 2 ** 20, workers=args.workers)
+    rows, neighbours, scores = neighbour_pairs(*graph)
+    bank_of_row = np.repeat(np.arange(len(banks)), sizes)
+    if not args.include_within:
+        cross = bank_of_row[rows] != bank_of_row[neighbours]
+        rows, neighbours, scores = rows[cross], neighbours[cross], scores[cross]
+
+    def describe(row):
+        bank = bank_of_row[row]
+        position = int(row - offsets[bank])
+        ids = headers[bank].get("ids") or []
+        return {"url": headers[bank].get("url"), "id": ids[position] if position < len(ids) else None}
+
+    for i in np.argsort(-scores, kind="stable"):
+        print(json.dumps({"score": round(float(scores[i]), 4), "a": describe(rows[i]), "b": describe(neighbours[i])}))
+    print(f"{len(scores)} pairs in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()